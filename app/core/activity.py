@@ -0,0 +1,181 @@
+"""Activity log: who changed what, recorded without a write per request.
+
+Services call record_activity() once a change has committed. The entry goes
+into an in-process buffer. A background thread writes it in batches, with one
+multi-row INSERT per shard into `activity_log`. It writes as soon as
+ACTIVITY_BATCH_SIZE entries are waiting, or every ACTIVITY_FLUSH_SECONDS.
+Entries therefore show up in the log within that interval.
+
+Durability:
+- Entries of a batch that fails are put back and retried on the next flush.
+- A buffer grown past ACTIVITY_BUFFER_MAX (the database is down) is appended
+  to ACTIVITY_SPILL_FILE instead of growing memory.
+- The app's shutdown (and atexit, for scripts and job workers) flushes what is
+  left, spilling it if the database is unreachable.
+- The next process to start replays the spill file.
+- Only a hard kill loses entries: at most the last interval.
+"""
+import atexit
+import json
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.core.database import shards
+from app.core.sharding import shard_map
+from app.db.repository.activity import ActivityRepository
+
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "500"))
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", "1"))
+ACTIVITY_BUFFER_MAX = int(os.getenv("ACTIVITY_BUFFER_MAX", "50000"))
+ACTIVITY_SPILL_FILE = os.getenv("ACTIVITY_SPILL_FILE", "activity_spill.jsonl")
+
+
+def write_entries(entries: List[dict]) -> List[dict]:
+    """Insert entries on their organizations' shards, returns those not written.
+
+    Entries of a tenant being moved between shards are held back until the
+    move is over, and so are those of a shard that fails.
+    """
+    by_shard, pending = defaultdict(list), []
+    for entry in entries:
+        shard, read_only = shard_map.lookup(entry["org_id"])
+        (pending if read_only else by_shard[shard]).append(entry)
+
+    for shard, batch in by_shard.items():
+        try:
+            with Session(shards[shard].primary) as db:
+                ActivityRepository(db).insert_many(batch)
+        except Exception as exc:
+            print(f"Activity log: writing {len(batch)} entries to shard {shard} failed, will retry: {exc}")
+            pending += batch
+    return pending
+
+
+class ActivityBuffer:
+    """Entries waiting to be written, and the thread writing them"""
+
+    def __init__(
+        self,
+        batch_size: int = ACTIVITY_BATCH_SIZE,
+        interval: float = ACTIVITY_FLUSH_SECONDS,
+        max_size: int = ACTIVITY_BUFFER_MAX,
+        spill_file: str = ACTIVITY_SPILL_FILE
+    ):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_size = max_size
+        self.spill_file = spill_file
+        self._entries = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = True
+
+    def start(self):
+        """Start the flusher thread and replay what a previous process spilled"""
+        self._running = True
+        self.replay_spill()
+        self._ensure_thread()
+
+    def record(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+            size = len(self._entries)
+        if size >= self.max_size:
+            # the writer cannot keep up, move the backlog to disk
+            with self._lock:
+                backlog, self._entries = self._entries, []
+            self.spill(backlog)
+        elif size >= self.batch_size:
+            self._wakeup.set()
+        if self._running:
+            self._ensure_thread()
+
+    def _ensure_thread(self):
+        # a forked worker inherits the buffer but not its thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="activity-flusher")
+                self._thread.start()
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything buffered now, returns how many entries were written"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries = self._entries, []
+            if not entries:
+                return 0
+            try:
+                pending = write_entries(entries)
+            except Exception as exc:
+                # e.g. the shard map could not be read
+                print(f"Activity log: flush failed, will retry: {exc}")
+                pending = entries
+            if pending:
+                with self._lock:
+                    self._entries[:0] = pending
+            return len(entries) - len(pending)
+
+    def close(self):
+        """Stop the thread and write what is left, spilling it when the database is unreachable"""
+        self._running = False
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+        with self._lock:
+            left, self._entries = self._entries, []
+        self.spill(left)
+
+    def spill(self, entries: List[dict]):
+        if not entries:
+            return
+        with open(self.spill_file, "a") as spill:
+            for entry in entries:
+                spill.write(json.dumps({**entry, "created_at": entry["created_at"].isoformat()}) + "\n")
+        print(f"Activity log: {len(entries)} entries spilled to {self.spill_file}")
+
+    def replay_spill(self):
+        """Buffer the entries of the spill file again (once, whichever process gets there first)"""
+        claimed = f"{self.spill_file}.{os.getpid()}"
+        try:
+            os.rename(self.spill_file, claimed)
+        except FileNotFoundError:
+            return
+        with open(claimed) as spill:
+            entries = [json.loads(line) for line in spill if line.strip()]
+        for entry in entries:
+            entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+        with self._lock:
+            self._entries[:0] = entries
+        os.remove(claimed)
+        self._wakeup.set()
+
+
+activity_log = ActivityBuffer()
+atexit.register(activity_log.close)
+
+
+def record_activity(org_id: int, actor_id: Optional[int], action: str, entity: str, entity_id: int, data: dict = None):
+    """Add an entry to the organization's activity log (written shortly after, never blocks)"""
+    activity_log.record({
+        "org_id": org_id,
+        "actor_id": actor_id,
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "data": data or {},
+        "created_at": datetime.now(timezone.utc),
+    })
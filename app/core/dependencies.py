@@ -1,28 +1,32 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status, Query, Header
+from typing import Optional, List
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt , JWTError
-from app.core.security import SECRET_KEY, ALGORITHM
+from app.core.security import decode_access_token
 from app.db.repository.user import UserRepository
 from app.core.database import get_db
+from app.core.sharding import bind_tenant
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# multi-get endpoints resolve at most this many ids with one IN query
+MAX_IDS_PER_REQUEST = 100
+
 # a function to get the user , it takes the token and the database as paramters
 def get_current_user(token : str = Depends(oauth2_scheme) , db=Depends(get_db)):
-    try:
-        payload = jwt.decode(token , SECRET_KEY , algorithms=ALGORITHM)
-        user_id = payload.get("user_id")
-        if user_id is None : 
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token payload"
-            )
-        
-    except JWTError:
+    payload = decode_access_token(token)
+    if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
+    user_id = payload.get("user_id")
+    if user_id is None : 
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+    # lets the session keep this user's reads on the primary right after they write
+    db.info["user_id"] = user_id
     user_repo = UserRepository(db)
     user = user_repo.get_by_id(user_id)
     if not user:
@@ -30,6 +34,9 @@ def get_current_user(token : str = Depends(oauth2_scheme) , db=Depends(get_db)):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+
+    # org-scoped tables of this request now go to the organization's shard
+    bind_tenant(db, user.org_id)
     
     return user
 
@@ -42,4 +49,40 @@ def require_role(allowed_roles:list):
                 detail="Not allowed"
             )
         return user
-    return role_checker
\ No newline at end of file
+    return role_checker
+
+
+def parse_ids(ids: Optional[str] = Query(None, description="Comma separated ids to fetch in one query")) -> Optional[List[int]]:
+    """Parse ?ids=1,2,3 for the multi-get variants of the list endpoints"""
+    if ids is None:
+        return None
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma separated list of integers"
+        )
+    parsed = list(dict.fromkeys(parsed))
+    if len(parsed) > MAX_IDS_PER_REQUEST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_IDS_PER_REQUEST} ids per request"
+        )
+    return parsed
+
+
+def parse_if_match(if_match: Optional[str] = Header(None, description='Version the change applies to, as returned in ETag ("3")')) -> Optional[int]:
+    """Parse If-Match into the expected row version, None when absent or *"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    try:
+        return int(tag.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='If-Match must be a single version, e.g. "3"'
+        )
@@ -0,0 +1,250 @@
+"""Live organization events over Server-Sent Events.
+
+Services call publish() in the transaction of the change: the event is
+stored in the `events` table of the tenant's shard and announced with NOTIFY,
+both only when that transaction commits. Every API process keeps one LISTEN
+connection per shard (EventBroker) and fans the events out to the SSE
+connections of that organization, so any number of processes can serve
+streams.
+
+Each connection has a bounded queue. A client too slow to drain it is not
+allowed to grow memory: it is switched to catch-up mode and replays what it
+missed from the events table, which is also how Last-Event-ID resume works.
+
+Event ids are drawn at INSERT but become visible at COMMIT, so they do not
+tell what was missed: id 10 can commit after id 11. A stream's position (the
+SSE `id:`) is instead a transaction horizon, every event written by a
+transaction below it has been sent. Events of newer transactions sent ahead of
+it are remembered by id, a replay sends the rest. Resuming from a position
+may repeat a few events, never skips one; the event id in the payload tells
+them apart.
+"""
+import asyncio
+import os
+import select
+import threading
+import time
+import orjson
+from typing import Dict, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.database import shards
+from app.core.sharding import shard_map
+from app.db.repository.event import EventRepository, EVENTS_CHANNEL
+
+# events buffered per SSE connection before it falls back to catch-up reads
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+# comment line sent on idle streams so proxies keep them open
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# events read per query when replaying
+SSE_CATCHUP_BATCH = int(os.getenv("SSE_CATCHUP_BATCH", "500"))
+
+
+def task_event_data(task) -> dict:
+    """What a task event carries, enough to move a card on a board"""
+    return {"id": task.id, "project_id": task.project_id, "title": task.title, "status": task.status, "rank": task.rank, "assignee_id": task.assignee_id, "version": task.version}
+
+
+def project_event_data(project) -> dict:
+    return {
+        "id": project.id,
+        "name": project.name,
+        "is_archived": project.is_archived,
+        "deadline": project.deadline.isoformat() if project.deadline else None,
+        "version": project.version
+    }
+
+
+def publish(db: Session, org_id: int, type: str, data: dict):
+    """Record an event for the organization's live streams, sent when the caller commits"""
+    EventRepository(db).create(org_id, type, data)
+
+
+def format_event(event) -> bytes:
+    """An event as an SSE message (without `id:`, the position is per stream)"""
+    body = orjson.dumps({"id": event.id, "type": event.type, "data": event.data})
+    return b"event: %s\ndata: %s\n\n" % (event.type.encode(), body)
+
+
+def format_position(position: int) -> bytes:
+    """An `id:` only message, the browser resumes from it with Last-Event-ID"""
+    return b"id: %d\n\n" % position
+
+
+class Subscription:
+    """One SSE connection: a bounded queue filled from the listener threads"""
+
+    def __init__(self, org_id: int, loop: asyncio.AbstractEventLoop, size: int = SSE_QUEUE_SIZE):
+        self.org_id = org_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+        self.overflowed = False
+
+    def push(self, event_id: int, txid: int, message: bytes):
+        # runs on the event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait((event_id, txid, message))
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def reset(self):
+        """Drop what is buffered, the caller replays it from the database"""
+        self.overflowed = False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class EventBroker:
+    """Per-process fan-out of NOTIFY events to the local SSE connections"""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._listeners = {}
+
+    # ----- subscriptions ----- #
+
+    def subscribe(self, org_id: int) -> Subscription:
+        self._start_listeners()
+        subscription = Subscription(org_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(org_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.org_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.org_id]
+
+    # ----- listening ----- #
+
+    def _start_listeners(self):
+        with self._lock:
+            for index in range(len(shards)):
+                thread = self._listeners.get(index)
+                if thread is None or not thread.is_alive():
+                    thread = threading.Thread(target=self._listen, args=(index,), daemon=True, name=f"events-listener-{index}")
+                    thread.start()
+                    self._listeners[index] = thread
+
+    def _listen(self, shard: int):
+        """Hold one LISTEN connection on the shard's primary, reconnecting on failure"""
+        while True:
+            try:
+                with shards[shard].primary.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    conn.execute(text(f"LISTEN {EVENTS_CHANNEL}"))
+                    # notifications sent while we were disconnected are gone, make streams replay
+                    self._overflow_all()
+                    driver_connection = conn.connection.driver_connection
+                    while True:
+                        if select.select([driver_connection], [], [], SSE_KEEPALIVE_SECONDS) == ([], [], []):
+                            continue
+                        driver_connection.poll()
+                        notified = []
+                        while driver_connection.notifies:
+                            org_id, event_id = driver_connection.notifies.pop(0).payload.split(":")
+                            notified.append((int(org_id), int(event_id)))
+                        self._dispatch(shard, notified)
+            except Exception as exc:
+                print(f"Event listener on shard {shard} failed: {exc}, reconnecting")
+                time.sleep(1)
+
+    def _dispatch(self, shard: int, notified: list):
+        with self._lock:
+            wanted = [event_id for org_id, event_id in notified if org_id in self._subscribers]
+        if not wanted:
+            return
+
+        # one read per batch of notifications, shared by every local connection
+        with Session(shards[shard].primary) as db:
+            events = EventRepository(db).get_by_ids(wanted)
+        for event in events:
+            message = format_event(event)
+            with self._lock:
+                subscribers = list(self._subscribers.get(event.org_id, ()))
+            for subscription in subscribers:
+                subscription.loop.call_soon_threadsafe(subscription.push, event.id, event.txid, message)
+
+    def _overflow_all(self):
+        with self._lock:
+            subscribers = [subscription for group in self._subscribers.values() for subscription in group]
+        for subscription in subscribers:
+            subscription.loop.call_soon_threadsafe(setattr, subscription, "overflowed", True)
+
+    # ----- streaming ----- #
+
+    async def stream(self, org_id: int, position: Optional[int] = None):
+        """Async generator of SSE messages for one connection, from a position (Last-Event-ID)"""
+        shard, _ = shard_map.lookup(org_id)
+        subscription = self.subscribe(org_id)
+        try:
+            if position is None:
+                # only what commits from now on, the events already there count as sent
+                position, sent = await run_in_threadpool(_start, shard, org_id)
+            else:
+                sent = {}
+                subscription.overflowed = True
+            yield b"retry: 3000\n\n"
+
+            while True:
+                if subscription.overflowed:
+                    subscription.reset()
+                    horizon, after = None, None
+                    while True:
+                        batch_horizon, events = await run_in_threadpool(_events_since, shard, org_id, position, after)
+                        # the first horizon: every transaction below it ended before the first read
+                        horizon = batch_horizon if horizon is None else horizon
+                        for event in events:
+                            after = (event.txid, event.id)
+                            if event.id not in sent:
+                                sent[event.id] = event.txid
+                                yield format_event(event)
+                        if len(events) < SSE_CATCHUP_BATCH:
+                            break
+                    if horizon > position:
+                        position = horizon
+                        sent = {event_id: txid for event_id, txid in sent.items() if txid >= position}
+                        yield format_position(position)
+                    continue
+
+                try:
+                    event_id, txid, message = await asyncio.wait_for(subscription.queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    # move the position past what was sent live, so a reconnect repeats little
+                    subscription.overflowed = bool(sent)
+                    continue
+                if event_id in sent:
+                    # already sent while replaying
+                    continue
+                sent[event_id] = txid
+                yield message
+                if len(sent) % SSE_CATCHUP_BATCH == 0:
+                    subscription.overflowed = True
+        finally:
+            self.unsubscribe(subscription)
+
+
+def _start(shard: int, org_id: int) -> tuple:
+    with Session(shards[shard].primary) as db:
+        event_repo = EventRepository(db)
+        horizon = event_repo.get_horizon()
+        return horizon, dict(event_repo.get_pending(org_id, horizon))
+
+
+def _events_since(shard: int, org_id: int, position: int, after: Optional[tuple]) -> tuple:
+    # replay from the primary, a lagging replica could skip events that were already notified
+    with Session(shards[shard].primary) as db:
+        event_repo = EventRepository(db)
+        # the horizon is read first: the transactions below it have ended, the page query sees them all
+        horizon = event_repo.get_horizon()
+        return horizon, event_repo.get_since(org_id, position, after, SSE_CATCHUP_BATCH)
+
+
+broker = EventBroker()
@@ -0,0 +1,124 @@
+"""Flow metrics over task status history, vectorized with NumPy.
+
+Transitions come in as columns (task id, from status, to status, epoch
+seconds) in time order, statuses encoded as their index in TASK_STATUSES,
+-1 for no status (before creation, after deletion) and -2 as the from status
+of a task seeded with its status when the history began, see
+TaskStatusHistoryRepository.iter_columns. Every metric is a handful of
+whole-array operations (cumsum, argsort, searchsorted), with no Python loop
+over the transitions.
+"""
+from itertools import chain
+from typing import Iterable, NamedTuple, Optional, Sequence
+import numpy as np
+from app.db.models.task import TASK_STATUSES
+from app.db.repository.task_status_history import BEFORE_HISTORY
+
+START_STATUS = TASK_STATUSES.index("in_progress")
+DONE_STATUS = TASK_STATUSES.index("done")
+PERCENTILES = (50, 75, 85, 95)
+
+
+class Transitions(NamedTuple):
+    task_id: np.ndarray  # int64
+    from_status: np.ndarray  # int8, -1 for no status (the task was created), -2 seeded
+    to_status: np.ndarray  # int8, -1 for no status (the task was deleted)
+    at: np.ndarray  # float64 epoch seconds, ascending
+
+
+def to_columns(chunks: Iterable[Sequence[tuple]]) -> Transitions:
+    """Columnar arrays from chunks of (task_id, from, to, epoch) rows in time order"""
+    parts = [
+        np.fromiter(chain.from_iterable(chunk), dtype=np.float64, count=4 * len(chunk)).reshape(-1, 4)
+        for chunk in chunks
+    ]
+    rows = np.concatenate(parts) if parts else np.empty((0, 4))
+    return Transitions(
+        task_id=rows[:, 0].astype(np.int64),
+        from_status=rows[:, 1].astype(np.int8),
+        to_status=rows[:, 2].astype(np.int8),
+        at=rows[:, 3].copy()
+    )
+
+
+def time_edges(since: float, until: float, points: int) -> np.ndarray:
+    """`points` evenly spaced instants from since to until, both included"""
+    return np.linspace(since, until, points)
+
+
+def cumulative_flow(transitions: Transitions, edges: np.ndarray) -> np.ndarray:
+    """Number of tasks in each status at each edge, shape (len(TASK_STATUSES), len(edges)).
+
+    A status count changes by +1 for each transition into it and -1 for each
+    one out of it, so the running sum of those steps is its count after every
+    transition, and the count at an edge is the running sum at the last
+    transition before it.
+    """
+    seen = np.searchsorted(transitions.at, edges, side="right")
+    flow = np.empty((len(TASK_STATUSES), len(edges)), dtype=np.int64)
+    for code in range(len(TASK_STATUSES)):
+        steps = (transitions.to_status == code).astype(np.int64) - (transitions.from_status == code)
+        flow[code] = np.concatenate(([0], np.cumsum(steps)))[seen]
+    return flow
+
+
+def burndown(flow: np.ndarray) -> dict:
+    """Remaining (not done), done and total tasks at each edge, from the cumulative flow"""
+    scope = flow.sum(axis=0)
+    done = flow[DONE_STATUS]
+    return {"remaining": scope - done, "done": done, "scope": scope}
+
+
+def _up_to(transitions: Transitions, until: float) -> Transitions:
+    return Transitions(*(column[:np.searchsorted(transitions.at, until, side="right")] for column in transitions))
+
+
+def _first_of_each(task_id: np.ndarray) -> np.ndarray:
+    """Mask of the first element of each run of equal task ids"""
+    return np.concatenate(([True], task_id[1:] != task_id[:-1])) if len(task_id) else np.empty(0, dtype=bool)
+
+
+def completion_times(transitions: Transitions, since: float, until: float, start_status: Optional[int] = START_STATUS) -> np.ndarray:
+    """Seconds from start to done of the tasks finished between since and until.
+
+    A task is finished when its latest transition up to `until` moved it to
+    done, at a time after `since`. It started the first time it entered
+    start_status (cycle time), or at its first transition, its creation, with
+    start_status None (lead time). Tasks that never reached start_status are
+    left out, and so are those already there when the history began (seeded),
+    whose start is unknown.
+    """
+    transitions = _up_to(transitions, until)
+    # group by task; a stable sort keeps each task's transitions in time order
+    order = np.argsort(transitions.task_id, kind="stable")
+    task_id, from_status, to_status, at = (column[order] for column in (transitions.task_id, transitions.from_status, transitions.to_status, transitions.at))
+    first = _first_of_each(task_id)
+    last = np.roll(first, -1)
+
+    finished = np.flatnonzero(last & (to_status == DONE_STATUS) & (at > since))
+    if start_status is None:
+        started = np.flatnonzero(first)
+    else:
+        entered = np.flatnonzero(to_status == start_status)
+        started = entered[_first_of_each(task_id[entered])]
+    started = started[from_status[started] != BEFORE_HISTORY]
+
+    # both are sorted by task id with one entry per task, match them by binary search
+    started_tasks = task_id[started]
+    position = np.searchsorted(started_tasks, task_id[finished])
+    position[position == len(started_tasks)] = 0
+    matched = (started_tasks[position] == task_id[finished]) if len(started_tasks) else np.zeros(len(finished), dtype=bool)
+    return at[finished[matched]] - at[started[position[matched]]]
+
+
+def summarize(seconds: np.ndarray) -> dict:
+    """Count, mean and percentiles of durations, in hours (None when there are none)"""
+    if len(seconds) == 0:
+        return {"count": 0, "mean": None, **{f"p{q}": None for q in PERCENTILES}}
+    hours = seconds / 3600.0
+    values = np.percentile(hours, PERCENTILES)
+    return {
+        "count": int(len(hours)),
+        "mean": float(hours.mean()),
+        **{f"p{q}": float(value) for q, value in zip(PERCENTILES, values)}
+    }
@@ -0,0 +1,181 @@
+"""Idempotency-Key support for mutating requests.
+
+A client that retries a POST/PUT/PATCH/DELETE with the same Idempotency-Key
+header gets the first response back instead of running the request again.
+Keys are scoped by (user, key, method + path) and live for
+IDEMPOTENCY_TTL_HOURS:
+
+- first request: the key is claimed (a unique row in `idempotency_keys`), the
+  request runs and its response is stored
+- retry after completion: the stored response (status, headers and body) is
+  replayed with `Idempotent-Replayed: true`, without touching the endpoint
+- retry while the first one is still running: waits for it, polling every
+  IDEMPOTENCY_POLL_SECONDS for up to IDEMPOTENCY_WAIT_SECONDS, then `409`
+  with Retry-After
+- same key with a different body: `422`
+- 5xx responses and exceptions are not stored, the key is released so the
+  retry runs again
+
+Requests without the header, or without a valid bearer token, pass through
+untouched. Expired keys are deleted in bulk by the `prune_idempotency_keys` job.
+"""
+import asyncio
+import hashlib
+import os
+from datetime import timedelta
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from app.core.database import engine
+from app.core.security import decode_access_token
+from app.db.repository.idempotency_key import IdempotencyKeyRepository
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_POLL_SECONDS = float(os.getenv("IDEMPOTENCY_POLL_SECONDS", "0.1"))
+# a request still "in progress" after this long is taken to be lost with its process
+IDEMPOTENCY_STALE_SECONDS = float(os.getenv("IDEMPOTENCY_STALE_SECONDS", "300"))
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+
+
+def _user_id(authorization: str):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    return payload.get("user_id") if payload else None
+
+
+# the keys table is in the directory and always used on its primary, a replica may lag behind a claim
+
+def _claim(user_id: int, key: str, route: str, request_hash: str):
+    """Claim the key, taking it over when its holder expired or died; returns (record, claimed)"""
+    with Session(engine) as db:
+        repo = IdempotencyKeyRepository(db)
+        record, claimed = repo.claim(user_id, key, route, request_hash, timedelta(hours=IDEMPOTENCY_TTL_HOURS))
+        if not claimed and record is not None and repo.release_if_abandoned(record.id, timedelta(seconds=IDEMPOTENCY_STALE_SECONDS)):
+            record, claimed = repo.claim(user_id, key, route, request_hash, timedelta(hours=IDEMPOTENCY_TTL_HOURS))
+        # read again after the commits above, the caller only reads it once the session is closed
+        record = repo.get(user_id, key, route)
+        if record is not None:
+            db.expunge(record)
+        return record, claimed
+
+
+def _lookup(user_id: int, key: str, route: str):
+    with Session(engine) as db:
+        record = IdempotencyKeyRepository(db).get(user_id, key, route)
+        if record is not None:
+            db.expunge(record)
+        return record
+
+
+def _complete(record_id: int, status_code: int, content_type: str, headers: list, body: bytes):
+    with Session(engine) as db:
+        IdempotencyKeyRepository(db).complete(record_id, status_code, content_type, headers, body)
+
+
+def _release(record_id: int):
+    with Session(engine) as db:
+        IdempotencyKeyRepository(db).release(record_id)
+
+
+def _replay(record) -> Response:
+    if record.response_headers is None:
+        # stored before headers were kept
+        return Response(
+            content=record.response_body,
+            status_code=record.response_status,
+            media_type=record.response_content_type,
+            headers={"Idempotent-Replayed": "true"}
+        )
+    response = Response(content=record.response_body, status_code=record.response_status)
+    # raw pairs, a header may repeat (Set-Cookie)
+    response.raw_headers.extend((name.encode("latin-1"), value.encode("latin-1")) for name, value in record.response_headers)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware, see the module docstring"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in MUTATING_METHODS:
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        user_id = _user_id(headers.get("authorization")) if key else None
+        if user_id is None:
+            return await self.app(scope, receive, send)
+        if len(key) > MAX_KEY_LENGTH:
+            return await JSONResponse({"detail": f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters."}, status_code=400)(scope, receive, send)
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        route = f"{scope['method']} {scope['path']}"
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+        record, claimed = await run_in_threadpool(_claim, user_id, key, route, request_hash)
+        while not claimed:
+            if record is not None and record.request_hash != request_hash:
+                return await JSONResponse({"detail": "Idempotency-Key was already used with a different request."}, status_code=422)(scope, receive, send)
+            if record is not None and record.status == "completed":
+                return await _replay(record)(scope, receive, send)
+            # in flight on this or another process (or released just now), wait for it
+            if loop.time() >= deadline:
+                return await JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress."},
+                    status_code=409,
+                    headers={"Retry-After": "1"}
+                )(scope, receive, send)
+            await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+            record = await run_in_threadpool(_lookup, user_id, key, route)
+            if record is None:
+                # released after a failure, this retry runs the request itself
+                record, claimed = await run_in_threadpool(_claim, user_id, key, route, request_hash)
+
+        # run the request with the body read above, keeping a copy of the response
+        delivered = False
+
+        async def replay_body():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "content_type": None, "headers": [], "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                raw = message.get("headers", [])
+                response["status"] = message["status"]
+                response["content_type"] = Headers(raw=raw).get("content-type")
+                # the replay computes its own length
+                response["headers"] = [[name.decode("latin-1"), value.decode("latin-1")] for name, value in raw if name.lower() != b"content-length"]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except BaseException:
+            # also on cancellation (client gone), where nothing can be awaited anymore
+            _release(record.id)
+            raise
+        if response["status"] >= 500:
+            await run_in_threadpool(_release, record.id)
+        else:
+            await run_in_threadpool(_complete, record.id, response["status"], response["content_type"], response["headers"], b"".join(response["body"]))
@@ -0,0 +1,62 @@
+"""Fractional rank keys ordering the cards of a board column.
+
+A rank is a base-62 string compared byte by byte (the column uses the "C"
+collation), read as the digits of a fraction in [0, 1). Between any two ranks
+there is always another one, so moving a card only rewrites that card's rank.
+Keys never end in "0", which keeps a key strictly between any two neighbours
+possible. Repeated moves into the same gap make keys grow by about one digit
+every six moves; past RANK_REBALANCE_LENGTH the column is respaced by the
+"rebalance_ranks" job.
+"""
+import os
+from typing import List, Optional
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# a rank longer than this queues a rebalance of its column
+RANK_REBALANCE_LENGTH = int(os.getenv("RANK_REBALANCE_LENGTH", "24"))
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    # low < high, both without trailing zeros, None is the end of the range
+    if high is not None:
+        common = 0
+        while common < len(high) and (low[common] if common < len(low) else "0") == high[common]:
+            common += 1
+        if common:
+            return high[:common] + _midpoint(low[common:], high[common:])
+
+    digit_low = DIGITS.index(low[0]) if low else 0
+    digit_high = DIGITS.index(high[0]) if high is not None else BASE
+    if digit_high - digit_low > 1:
+        return DIGITS[(digit_low + digit_high) // 2]
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[digit_low] + _midpoint(low[1:], None)
+
+
+def rank_between(before: Optional[str], after: Optional[str]) -> str:
+    """A rank sorting after `before` and before `after` (None = start / end of the column)"""
+    low = before or ""
+    if after is not None and after <= low:
+        raise ValueError(f"rank {before!r} does not sort before {after!r}")
+    return _midpoint(low, after)
+
+
+def spread_ranks(count: int) -> List[str]:
+    """`count` evenly spaced ranks, as short as possible with room left between them"""
+    width = 1
+    # keep about BASE free keys around each one so moves stay short after a rebalance
+    while BASE ** width < (count + 1) * BASE:
+        width += 1
+    step = BASE ** width // (count + 1)
+    ranks = []
+    for position in range(1, count + 1):
+        value = position * step
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
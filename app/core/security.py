@@ -1,28 +1,103 @@
-from passlib.context import CryptContext
-from jose import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from hashlib import sha256
+from typing import Optional
 import os
+import threading
+import time
 
-# this function manage the hashing algorithms 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib and jose are imported on first use, they add noticeably to process
+# start-up and job workers / CLI tools never hash or sign anything
+
+@lru_cache(maxsize=None)
+def _pwd_context():
+    # this function manage the hashing algorithms 
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # helper functions
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return _pwd_context().verify(plain_password, hashed_password)
 
 # Get from environment variables (fallback for development only)
 SECRET_KEY = os.getenv("SECRET_KEY", "super-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
+# verified tokens remembered per process (0 disables the cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 # main function of the JWT token 
 
 def create_access_token(data: dict):
+    from jose import jwt
     to_encode = data.copy()
     expiration = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({'exp': expiration})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+class TokenCache:
+    """Bounded LRU of verified claims, keyed by the SHA-256 of the token.
+
+    A client sends the same token on every request of its lifetime, so the
+    signature check and claims parsing only run on its first one. Entries
+    expire at the token's exp, like the token itself. Only valid tokens are
+    stored, and raw tokens are never kept.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # digest -> (claims, exp), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        if not self.maxsize:
+            return None
+        key = sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # a copy, callers may change what they get
+        return dict(claims)
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        # a token without exp never expires, it is not worth pinning
+        if not self.maxsize or not isinstance(exp, (int, float)):
+            return
+        key = sha256(token.encode()).digest()
+        with self._lock:
+            self._entries[key] = (dict(claims), exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Claims of a valid token, None when it is malformed, expired or badly signed"""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    from jose import jwt, JWTError
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=ALGORITHM)
+    except JWTError:
+        return None
+    token_cache.put(token, claims)
+    return claims
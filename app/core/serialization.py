@@ -0,0 +1,86 @@
+from fastapi import Response, Query, HTTPException, status
+from pydantic import TypeAdapter, BaseModel, ConfigDict, create_model
+from typing import Optional, Tuple
+import threading
+from app.db.schema import TaskResponse, ProjectResponse, UserResponse, SyncResponse, DeadlineDigestResponse
+
+# adapters are built once at import (app startup) instead of on every request
+TaskAdapter = TypeAdapter(TaskResponse)
+TaskListAdapter = TypeAdapter(list[TaskResponse])
+ProjectAdapter = TypeAdapter(ProjectResponse)
+ProjectListAdapter = TypeAdapter(list[ProjectResponse])
+UserAdapter = TypeAdapter(UserResponse)
+UserListAdapter = TypeAdapter(list[UserResponse])
+SyncAdapter = TypeAdapter(SyncResponse)
+DeadlineDigestAdapter = TypeAdapter(DeadlineDigestResponse)
+
+
+def render(adapter: TypeAdapter, data, status_code: int = 200) -> Response:
+    """Validate ORM objects once and encode them straight to JSON bytes.
+
+    Returning a Response makes FastAPI skip its own response_model validation
+    and jsonable_encoder pass, so each row is only converted a single time.
+    """
+    validated = adapter.validate_python(data, from_attributes=True)
+    return Response(
+        content=adapter.dump_json(validated),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+
+class FieldSet:
+    """Sparse fieldsets (?fields=id,title,status) of a list response.
+
+    Columns listed in `large` are left out unless asked for, so list endpoints
+    neither load nor serialize unbounded text by default. parse() returns the
+    fields in schema order so every spelling of a field set shares one trimmed
+    model and adapter, built on first use and cached.
+    """
+
+    def __init__(self, schema, large: Tuple[str, ...] = ()):
+        self.schema = schema
+        self.all = tuple(schema.model_fields)
+        self.default = tuple(name for name in self.all if name not in large)
+        self._adapters = {self.all: TypeAdapter(list[schema])}
+        self._lock = threading.Lock()
+
+    def parse(self, fields: Optional[str]) -> Tuple[str, ...]:
+        if fields is None:
+            return self.default
+        if fields == "all":
+            return self.all
+        wanted = {name.strip() for name in fields.split(",") if name.strip()} | {"id"}
+        unknown = wanted - set(self.all)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(self.all)}"
+            )
+        return tuple(name for name in self.all if name in wanted)
+
+    def query(self, fields: Optional[str] = Query(None, description="Comma separated fields to return, or 'all'")) -> Tuple[str, ...]:
+        """FastAPI dependency parsing ?fields="""
+        return self.parse(fields)
+
+    def list_adapter(self, fields: Tuple[str, ...], extra: Optional[type] = None) -> TypeAdapter:
+        """Adapter for the field set, plus the fields of `extra` (a model) when given"""
+        key = fields if extra is None else (fields, extra)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            with self._lock:
+                definitions = {name: (self.schema.model_fields[name].annotation, self.schema.model_fields[name]) for name in fields}
+                if extra is not None:
+                    definitions.update({name: (field.annotation, field) for name, field in extra.model_fields.items()})
+                model = create_model(
+                    f"{self.schema.__name__}_{'_'.join(fields)}" + (f"_{extra.__name__}" if extra else ""),
+                    __config__=ConfigDict(from_attributes=True),
+                    **definitions
+                )
+                adapter = self._adapters.setdefault(key, TypeAdapter(list[model]))
+        return adapter
+
+
+TaskFields = FieldSet(TaskResponse, large=("content",))
+ProjectFields = FieldSet(ProjectResponse, large=("description",))
+UserFields = FieldSet(UserResponse)
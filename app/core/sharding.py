@@ -0,0 +1,76 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import sort_tables
+from typing import Optional, Tuple
+import os
+import threading
+import time
+from app.core.database import Base, engine, shards
+from app.db.repository.tenant_shard import TenantShardRepository
+
+# how long a process trusts its cached org -> shard entries
+SHARD_MAP_TTL_SECONDS = float(os.getenv("SHARD_MAP_TTL_SECONDS", "30"))
+
+# shard that receives new organizations, least loaded shard when unset
+NEW_TENANT_SHARD = os.getenv("NEW_TENANT_SHARD")
+
+
+def sharded_tables() -> list:
+    """Tables flagged info={"sharded": True}, parents first"""
+    return sort_tables([table for table in Base.metadata.tables.values() if table.info.get("sharded")])
+
+
+class ShardMap:
+    """Cached view of the tenant_shards directory table (org_id -> shard)"""
+
+    def __init__(self, ttl: float = SHARD_MAP_TTL_SECONDS):
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, org_id: int) -> Tuple[int, bool]:
+        """Return (shard, read_only) for an organization"""
+        if len(shards) == 1:
+            return 0, False
+
+        cached = self._cache.get(org_id)
+        if cached is not None and cached[2] > time.monotonic():
+            return cached[0], cached[1]
+
+        # always read the map from the primary, a lagging replica could miss a new tenant
+        with Session(engine) as db:
+            entry = TenantShardRepository(db).get_by_org(org_id)
+            shard, read_only = (entry.shard, entry.state != "active") if entry else (0, False)
+
+        with self._lock:
+            self._cache[org_id] = (shard, read_only, time.monotonic() + self.ttl)
+        return shard, read_only
+
+    def assign(self, db: Session, org_id: int) -> int:
+        """Place a new organization on a shard"""
+        shard_repo = TenantShardRepository(db)
+        if NEW_TENANT_SHARD is not None:
+            shard = int(NEW_TENANT_SHARD)
+        else:
+            counts = shard_repo.count_by_shard()
+            shard = min(range(len(shards)), key=lambda index: counts.get(index, 0))
+
+        shard_repo.create(org_id, shard)
+        self.invalidate(org_id)
+        return shard
+
+    def invalidate(self, org_id: Optional[int] = None):
+        with self._lock:
+            if org_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(org_id, None)
+
+
+shard_map = ShardMap()
+
+
+def bind_tenant(db: Session, org_id: Optional[int]):
+    """Route the session's org-scoped tables to the shard holding org_id"""
+    shard, read_only = shard_map.lookup(org_id) if org_id is not None else (0, False)
+    db.info["shard"] = shard
+    db.info["tenant_read_only"] = read_only
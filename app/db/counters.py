@@ -0,0 +1,133 @@
+"""Denormalized per-organization counters.
+
+`users_count`, `projects_count`, `active_projects_count` and `tasks_count` on
+organizations are adjusted at the end of every flush that adds, removes, moves
+or (un)archives a member, project or task, as an atomic `x = x + delta` in the
+flush's own transaction. Statement-level writes that bypass the unit of work
+(query(...).update()/delete()) call adjust() themselves.
+
+The directory lives on shard 0, so for tenants on another shard the counter
+update commits separately from the change itself. reconcile() recounts an
+organization under a row lock and repairs any drift, the "reconcile_counters"
+job runs it periodically.
+"""
+from collections import Counter, defaultdict
+from sqlalchemy import event, func, select, update, inspect
+from sqlalchemy.orm import Session
+from app.core.database import engine, shards
+from app.db.models.organization import Organization
+from app.db.models.user import User
+from app.db.models.project import Project
+from app.db.models.task import Task
+from app.db.models.archived_task import ArchivedTask
+
+COUNTERS = ("users_count", "projects_count", "active_projects_count", "tasks_count")
+
+
+def _contribution(obj, values: dict) -> Counter:
+    if isinstance(obj, User):
+        return Counter(users_count=1)
+    if isinstance(obj, Project):
+        return Counter(projects_count=1, active_projects_count=0 if values.get("is_archived") else 1)
+    return Counter(tasks_count=1)
+
+
+def _values(obj, before: bool) -> dict:
+    """org_id and is_archived of an object, as flushed now or as loaded before the flush"""
+    state = inspect(obj)
+    values = {}
+    for name in ("org_id", "is_archived"):
+        if name not in state.attrs:
+            continue
+        history = state.attrs[name].history
+        if before and history.deleted:
+            values[name] = history.deleted[0]
+        elif before and history.unchanged:
+            values[name] = history.unchanged[0]
+        else:
+            values[name] = state.attrs[name].value
+    return values
+
+
+def adjust(db: Session, org_id: int, **deltas):
+    """Add deltas to an organization's counters (joins the session's transaction on shard 0)"""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if org_id is None or not deltas:
+        return
+    table = Organization.__table__
+    stmt = update(table).where(table.c.id == org_id).values({name: table.c[name] + delta for name, delta in deltas.items()})
+    db.connection(bind_arguments={"mapper": Organization.__mapper__, "clause": stmt}).execute(stmt)
+    # a loaded organization would keep showing the old values
+    loaded = db.identity_map.get(db.identity_key(Organization, org_id))
+    if loaded is not None:
+        db.expire(loaded, list(deltas))
+
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed_changes(session, flush_context):
+    deltas = defaultdict(Counter)
+    for obj in session.new:
+        if isinstance(obj, (User, Project, Task)):
+            values = _values(obj, before=False)
+            deltas[values.get("org_id")].update(_contribution(obj, values))
+    for obj in session.deleted:
+        if isinstance(obj, (User, Project, Task)):
+            values = _values(obj, before=True)
+            deltas[values.get("org_id")].subtract(_contribution(obj, values))
+    for obj in session.dirty:
+        if isinstance(obj, (User, Project, Task)) and session.is_modified(obj, include_collections=False):
+            before, after = _values(obj, before=True), _values(obj, before=False)
+            if before != after:
+                deltas[before.get("org_id")].subtract(_contribution(obj, before))
+                deltas[after.get("org_id")].update(_contribution(obj, after))
+
+    # always lock organization rows in the same order
+    for org_id in sorted(org_id for org_id in deltas if org_id is not None):
+        adjust(session, org_id, **deltas[org_id])
+
+
+# ===== Reconciliation ===== #
+
+def count_actual(directory: Session, tenant: Session, org_id: int) -> dict:
+    """What the counters of an organization should be, counted from the rows"""
+    projects, active_projects = tenant.execute(
+        select(func.count(), func.count().filter(Project.is_archived == False)).where(Project.org_id == org_id)
+    ).one()
+    return {
+        "users_count": directory.execute(select(func.count()).where(User.org_id == org_id)).scalar(),
+        "projects_count": projects,
+        "active_projects_count": active_projects,
+        # tasks of archived projects are moved to archived_tasks but still count
+        "tasks_count": tenant.execute(select(func.count()).where(Task.org_id == org_id)).scalar()
+        + tenant.execute(select(func.count()).where(ArchivedTask.org_id == org_id)).scalar(),
+    }
+
+
+def reconcile(org_id: int) -> dict:
+    """Recount an organization and fix its counters, returns {counter: (stored, actual)} of what drifted.
+
+    The organization row is locked while counting, so changes made on shard 0
+    meanwhile wait and apply their delta on top of the corrected value.
+    """
+    # imported here, app.core.sharding imports the repositories which import this module
+    from app.core.sharding import shard_map
+
+    with Session(engine) as directory:
+        organization = directory.query(Organization).filter(Organization.id == org_id).with_for_update().first()
+        if organization is None:
+            return {}
+        shard, _ = shard_map.lookup(org_id)
+        if shard == 0:
+            actual = count_actual(directory, directory, org_id)
+        else:
+            with Session(shards[shard].primary) as tenant:
+                actual = count_actual(directory, tenant, org_id)
+
+        drift = {
+            name: (getattr(organization, name), value)
+            for name, value in actual.items() if getattr(organization, name) != value
+        }
+        for name, (_, value) in drift.items():
+            setattr(organization, name, value)
+        directory.commit()
+        return drift
@@ -2,5 +2,17 @@ from app.db.models.organization import Organization
 from app.db.models.user import User
 from app.db.models.project import Project
 from app.db.models.task import Task
+from app.db.models.tenant_shard import TenantShard
+from app.db.models.job import Job
+from app.db.models.event import Event
+from app.db.models.tombstone import Tombstone
+from app.db.models.deadline_digest import DeadlineDigest
+from app.db.models.schema_fingerprint import SchemaFingerprint
+from app.db.models.activity import ActivityEntry
+from app.db.models.idempotency_key import IdempotencyKey
+from app.db.models.archived_task import ArchivedTask
+from app.db.models.task_status_change import TaskStatusChange
+from app.db.models.daily_task_rollup import DailyTaskRollup
+from app.db.models.rollup_watermark import RollupWatermark
 
-__all__ = ["Organization", "User", "Project", "Task"]
+__all__ = ["Organization", "User", "Project", "Task", "TenantShard", "Job", "Event", "Tombstone", "DeadlineDigest", "SchemaFingerprint", "ActivityEntry", "IdempotencyKey", "ArchivedTask", "TaskStatusChange", "DailyTaskRollup", "RollupWatermark"]
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Index
+from app.core.database import Base
+
+
+class ActivityEntry(Base):
+    """Append-only record of who changed what in an organization"""
+    __tablename__ = "activity_log"
+    # lives on the shard of its organization, written in batches (app/core/activity.py)
+    __table_args__ = (
+        Index("ix_activity_log_org_id_id", "org_id", "id"),
+        Index("ix_activity_log_org_id_entity_entity_id_id", "org_id", "entity", "entity_id", "id"),
+        {"info": {"sharded": True}},
+    )
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    actor_id = Column(Integer)  # user who made the change, None for the system
+    action = Column(String, nullable=False)  # member.role_changed, task.status_changed, project.archived, ...
+    entity = Column(String, nullable=False)  # user, organization, project or task
+    entity_id = Column(Integer, nullable=False)
+    data = Column(JSON, nullable=False)  # details of the change, e.g. {"from": "todo", "to": "done"}
+    created_at = Column(DateTime(timezone=True), nullable=False)  # when it happened, not when it was written
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from app.core.database import Base, current_txid
+
+
+class ArchivedTask(Base):
+    """Cold copy of a task of an archived project, same columns as `tasks`.
+
+    Rows are moved here in batches when a project is archived and back when
+    it is unarchived (app/jobs/handlers.py), so the hot table and its indexes
+    only hold tasks of active projects. Read-only while archived.
+    """
+    __tablename__ = "archived_tasks"
+    # lives on the shard of its organization, like the tasks it came from
+    __table_args__ = (
+        # a project's board and the per-status counts of ?include=task_counts
+        Index("ix_archived_tasks_org_id_project_id_status", "org_id", "project_id", "status"),
+        {"info": {"sharded": True}},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # the task's own id, kept across moves
+    title = Column(String, nullable=False)
+    content = Column(String)
+    status = Column(String)
+    rank = Column(String(collation="C"))
+    # no foreign key to projects.id, which may be partitioned (app/utils/partitioning.py)
+    project_id = Column(Integer, nullable=False)
+    assignee_id = Column(Integer)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    # moves and updates stamp their own transaction, move_tenant re-syncs rows by it
+    change_txid = Column(BigInteger, nullable=False, onupdate=current_txid())
+    archived_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint
+from app.core.database import Base
+
+
+class DailyTaskRollup(Base):
+    """Task counts of one project on one day (UTC), aggregated from task_status_history.
+
+    Maintained by the "roll_up_daily_tasks" job (app/utils/daily_rollups.py),
+    read by the trend endpoints. A row only exists for days with activity.
+    """
+    __tablename__ = "daily_task_rollups"
+    # lives on the shard of its organization, next to the history it sums
+    __table_args__ = (
+        # also serves the org-wide trends (org_id, any project, day range)
+        UniqueConstraint("org_id", "project_id", "day", name="ux_daily_task_rollups_org_id_project_id_day"),
+        {"info": {"sharded": True}},
+    )
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    project_id = Column(Integer, nullable=False)  # no foreign key, rollups outlive deleted projects
+    day = Column(Date, nullable=False)
+    created = Column(Integer, nullable=False)
+    completed = Column(Integer, nullable=False)  # moved to (or created as) done
+    deleted = Column(Integer, nullable=False)
+    # change in the number of open (not done) tasks over the day; the open count
+    # at the end of a day is the sum of every delta up to it
+    open_delta = Column(Integer, nullable=False)
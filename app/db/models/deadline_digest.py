@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from app.core.database import Base
+
+
+class DeadlineDigest(Base):
+    """Per-organization result of the last deadline scan, read by dashboards"""
+    __tablename__ = "deadline_digests"
+    # lives on the shard of its organization, next to the projects it lists
+    __table_args__ = {"info": {"sharded": True}}
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False, unique=True)
+    overdue = Column(JSON, nullable=False)  # [{"id", "name", "deadline"}] of active projects past their deadline
+    due_soon = Column(JSON, nullable=False)  # same, deadline within DEADLINE_DUE_SOON_HOURS
+    scanned_at = Column(DateTime(timezone=True), nullable=False)
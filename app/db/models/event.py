@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, JSON, Index
+from sqlalchemy.sql import func
+from app.core.database import Base, current_txid
+
+
+class Event(Base):
+    """Change feed of an organization, streamed to clients and replayed on resume"""
+    __tablename__ = "events"
+    # lives on the shard of its organization, next to the rows it describes
+    __table_args__ = (
+        Index("ix_events_org_id_id", "org_id", "id"),
+        Index("ix_events_org_id_txid_id", "org_id", "txid", "id"),
+        {"info": {"sharded": True}},
+    )
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    type = Column(String, nullable=False)  # task.created, task.updated, task.status_changed, ...
+    data = Column(JSON, nullable=False)
+    # id of the writing transaction: ids are drawn at INSERT but become visible at
+    # COMMIT, so replay follows transactions that have ended (EventRepository.get_horizon)
+    txid = Column(BigInteger, nullable=False, default=current_txid())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, JSON, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """First response to a request sent with an Idempotency-Key, replayed to its retries"""
+    __tablename__ = "idempotency_keys"
+    # in the directory database, next to the users
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", "route", name="ux_idempotency_keys_user_id_key_route"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    route = Column(String, nullable=False)  # "POST /tasks/create"
+    request_hash = Column(String(64), nullable=False)  # sha256 of the body, a reused key must come with the same request
+
+    status = Column(String, nullable=False, default="in_progress")  # in_progress, completed
+    response_status = Column(Integer, nullable=True)
+    response_content_type = Column(String, nullable=True)
+    response_headers = Column(JSON, nullable=True)  # [[name, value], ...] as sent, but content-length
+    response_body = Column(LargeBinary, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
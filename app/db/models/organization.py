@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -12,6 +12,17 @@ class Organization(Base):
     owner_id = Column(Integer, ForeignKey("users.id"))
     invite_code = Column(String, unique=True, nullable=True)
 
+    # Soft deletion, the org's projects and tasks are purged in the background
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+    purged_at = Column(DateTime(timezone=True), nullable=True)
+    purged_rows = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Denormalized counts, kept up to date by app/db/counters.py
+    users_count = Column(Integer, nullable=False, default=0, server_default="0")
+    projects_count = Column(Integer, nullable=False, default=0, server_default="0")
+    active_projects_count = Column(Integer, nullable=False, default=0, server_default="0")
+    tasks_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relationships
     owner = relationship("User", foreign_keys=[owner_id], back_populates="owned_organizations")
     users = relationship("User", foreign_keys="User.org_id", back_populates="organization")
@@ -1,17 +1,33 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Index, String, Boolean, DateTime, ForeignKey, text
 from sqlalchemy.orm import relationship
-from app.core.database import Base
+from app.core.database import Base, next_change_seq, current_txid
 
 
 class Project(Base):
     __tablename__ = "projects"
+    # lives on the shard of its organization, see app/core/sharding.py
+    __table_args__ = (
+        Index("ix_projects_org_id_change_txid_change_seq", "org_id", "change_txid", "change_seq"),
+        # deadline scans only care about active projects
+        Index("ix_projects_deadline_active", "deadline", postgresql_where=text("NOT is_archived")),
+        {"info": {"sharded": True}},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String)
     org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+
+    # bumped on every insert/update with the writing transaction, /sync returns rows
+    # past the client's cursor in (change_txid, change_seq) order
+    change_seq = Column(BigInteger, nullable=False, default=next_change_seq(), onupdate=next_change_seq())
+    change_txid = Column(BigInteger, nullable=False, default=current_txid(), onupdate=current_txid())
     is_archived = Column(Boolean, default=False)
-    deadline = Column(DateTime)
+    deadline = Column(DateTime(timezone=True))
+    # optimistic concurrency, as on Task.version
+    version = Column(Integer, nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     organization = relationship("Organization", back_populates="projects")
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, DateTime
+from app.core.database import Base
+
+
+class RollupWatermark(Base):
+    """How far the daily rollups of a shard are up to date (directory on shard 0, one row per shard)"""
+    __tablename__ = "rollup_watermarks"
+
+    shard = Column(Integer, primary_key=True)
+    rolled_up_at = Column(DateTime(timezone=True), nullable=False)  # start of the last run, history before it is counted
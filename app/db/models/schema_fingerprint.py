@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class SchemaFingerprint(Base):
+    """Hash of the models the database was last created from (single row, directory on shard 0)"""
+    __tablename__ = "schema_fingerprint"
+
+    id = Column(Integer, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    applied_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
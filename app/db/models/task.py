@@ -1,17 +1,48 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Index, String, ForeignKey
 from sqlalchemy.orm import relationship
-from app.core.database import Base
+from app.core.database import Base, next_change_seq, current_txid
+
+TASK_STATUSES = ("todo", "in_progress", "done", "blocked")
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    # lives on the shard of its organization, see app/core/sharding.py
+    __table_args__ = (
+        Index("ix_tasks_org_id_change_txid_change_seq", "org_id", "change_txid", "change_seq"),
+        # per-project listing and the per-status counts of ?include=task_counts
+        Index("ix_tasks_org_id_project_id_status", "org_id", "project_id", "status"),
+        # a board column in card order, see app/core/ranking.py
+        Index("ix_tasks_project_id_status_rank", "project_id", "status", "rank"),
+        # "my tasks" and the workload counts, answered from the index alone: the
+        # key and INCLUDE columns cover the default task fieldset
+        Index(
+            "ix_tasks_org_id_assignee_id_status", "org_id", "assignee_id", "status", "id",
+            postgresql_include=["project_id", "title", "rank", "version"]
+        ),
+        {"info": {"sharded": True}},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(String)
     status = Column(String)
+    # position within the (project, status) column, compared bytewise
+    rank = Column(String(collation="C"))
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    # a member of the organization; the foreign key only exists on shard 0
+    assignee_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
     org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    # optimistic concurrency: every ORM update runs as UPDATE ... WHERE version = :loaded
+    # and increments it, a lost race raises StaleDataError instead of overwriting
+    version = Column(Integer, nullable=False, server_default="1")
+
+    # bumped on every insert/update with the writing transaction, /sync returns rows
+    # past the client's cursor in (change_txid, change_seq) order
+    change_seq = Column(BigInteger, nullable=False, default=next_change_seq(), onupdate=next_change_seq())
+    change_txid = Column(BigInteger, nullable=False, default=current_txid(), onupdate=current_txid())
+
+    __mapper_args__ = {"version_id_col": version}
 
     # Relationships
     project = relationship("Project", back_populates="tasks")
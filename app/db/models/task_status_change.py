@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.core.database import Base
+
+
+class TaskStatusChange(Base):
+    """Append-only history of task statuses, one row per transition (app/db/status_history.py)"""
+    __tablename__ = "task_status_history"
+    # lives on the shard of its organization, read in time order by the flow analytics
+    __table_args__ = (
+        Index("ix_task_status_history_org_id_project_id_changed_at", "org_id", "project_id", "changed_at"),
+        Index("ix_task_status_history_org_id_changed_at", "org_id", "changed_at"),
+        # the daily rollups of a whole shard since their last run
+        Index("ix_task_status_history_changed_at", "changed_at"),
+        {"info": {"sharded": True}},
+    )
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    # no foreign keys to tasks / projects, which may be partitioned, and the
+    # history outlives deleted tasks
+    project_id = Column(Integer, nullable=False)
+    task_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # created, changed, deleted, or seeded (existed before the history)
+    from_status = Column(String)  # None when the task was created or seeded (or had no status)
+    to_status = Column(String)  # None when the task was deleted (or has no status)
+    actor_id = Column(Integer)  # None for the system
+    changed_at = Column(DateTime(timezone=True), nullable=False)
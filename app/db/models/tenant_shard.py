@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.core.database import Base
+
+
+class TenantShard(Base):
+    __tablename__ = "tenant_shards"
+
+    org_id = Column(Integer, ForeignKey("organizations.id"), primary_key=True)
+    shard = Column(Integer, nullable=False, default=0, index=True)
+    state = Column(String, nullable=False, default="active")  # active or moving (read-only)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base, next_change_seq, current_txid
+
+
+class Tombstone(Base):
+    """Record of a synced row that left an organization (deleted, or a member who left)"""
+    __tablename__ = "tombstones"
+    # lives on the shard of its organization and shares its change_seq sequence
+    __table_args__ = (
+        Index("ix_tombstones_org_id_change_txid_change_seq", "org_id", "change_txid", "change_seq"),
+        {"info": {"sharded": True}},
+    )
+
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    entity = Column(String, nullable=False)  # task, project or user
+    entity_id = Column(Integer, nullable=False)
+    change_seq = Column(BigInteger, nullable=False, default=next_change_seq())
+    change_txid = Column(BigInteger, nullable=False, default=current_txid())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
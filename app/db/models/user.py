@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, Index, String, ForeignKey
 from sqlalchemy.orm import relationship
-from app.core.database import Base
+from app.core.database import Base, next_change_seq, current_txid
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_org_id_change_txid_change_seq", "org_id", "change_txid", "change_seq"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -13,6 +16,11 @@ class User(Base):
     role = Column(String, nullable=True)
     org_id = Column(Integer, ForeignKey("organizations.id"), nullable=True)
 
+    # bumped on every insert/update with the writing transaction, /sync returns rows
+    # past the client's cursor in (change_txid, change_seq) order
+    change_seq = Column(BigInteger, nullable=False, default=next_change_seq(), onupdate=next_change_seq())
+    change_txid = Column(BigInteger, nullable=False, default=current_txid(), onupdate=current_txid())
+
     # Relationships
     organization = relationship("Organization", foreign_keys=[org_id], back_populates="users")
     owned_organizations = relationship("Organization", foreign_keys="Organization.owner_id", back_populates="owner")
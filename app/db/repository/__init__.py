@@ -2,10 +2,35 @@ from app.db.repository.user import UserRepository
 from app.db.repository.organization import OrganizationRepository
 from app.db.repository.project import ProjectRepository
 from app.db.repository.task import TaskRepository
+from app.db.repository.tenant_shard import TenantShardRepository
+from app.db.repository.job import JobRepository
+from app.db.repository.event import EventRepository
+from app.db.repository.tombstone import TombstoneRepository
+from app.db.repository.deadline_digest import DeadlineDigestRepository
+from app.db.repository.activity import ActivityRepository
+from app.db.repository.idempotency_key import IdempotencyKeyRepository
+from app.db.repository.archived_task import ArchivedTaskRepository
+from app.db.repository.task_status_history import TaskStatusHistoryRepository
+from app.db.repository.daily_task_rollup import DailyTaskRollupRepository
+from app.db.repository.rollup_watermark import RollupWatermarkRepository
+from app.db import soft_delete  # registers the soft-deleted organization filter
+from app.db import counters  # registers the organization counter updates
+from app.db import status_history  # registers the task status history capture
 
 __all__ = [
     "UserRepository",
     "OrganizationRepository",
     "ProjectRepository",
     "TaskRepository",
+    "TenantShardRepository",
+    "JobRepository",
+    "EventRepository",
+    "TombstoneRepository",
+    "DeadlineDigestRepository",
+    "ActivityRepository",
+    "IdempotencyKeyRepository",
+    "ArchivedTaskRepository",
+    "TaskStatusHistoryRepository",
+    "DailyTaskRollupRepository",
+    "RollupWatermarkRepository",
 ]
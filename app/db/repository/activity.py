@@ -0,0 +1,31 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import Optional, List
+from app.db.models.activity import ActivityEntry
+
+
+class ActivityRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def insert_many(self, entries: List[dict]) -> int:
+        """Write a batch of entries with one multi-row INSERT and commit"""
+        self.db.execute(insert(ActivityEntry), entries)
+        self.db.commit()
+        return len(entries)
+
+    def get_page(
+        self,
+        org_id: int,
+        before: Optional[int] = None,
+        limit: int = 50,
+        entity: Optional[str] = None,
+        entity_id: Optional[int] = None
+    ) -> List[ActivityEntry]:
+        """Newest entries first, keyset paginated: pass the last id of a page as `before`"""
+        query = self.db.query(ActivityEntry).filter(ActivityEntry.org_id == org_id)
+        if entity is not None:
+            query = query.filter(ActivityEntry.entity == entity, ActivityEntry.entity_id == entity_id)
+        if before is not None:
+            query = query.filter(ActivityEntry.id < before)
+        return query.order_by(ActivityEntry.id.desc()).limit(limit).all()
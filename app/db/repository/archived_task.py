@@ -0,0 +1,123 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, select, insert, delete, union_all, literal
+from typing import Optional, List, Sequence
+from datetime import datetime, timezone
+from app.core.database import current_txid
+from app.db.models.task import Task
+from app.db.models.archived_task import ArchivedTask
+from app.db.models.tombstone import Tombstone
+from app.db import counters, status_history
+
+# the columns a task keeps while it moves between the hot and the cold table
+MOVED_COLUMNS = [column.name for column in Task.__table__.columns]
+
+
+def _moved(table) -> list:
+    """The moved columns of a table, change_txid stamped with the moving transaction (move_tenant re-syncs by it)"""
+    return [current_txid() if name == "change_txid" else table.c[name] for name in MOVED_COLUMNS]
+
+
+class ArchivedTaskRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def archive_batch(self, project_id: int, org_id: int, batch_size: int) -> int:
+        """Move up to batch_size tasks of a project from `tasks` to `archived_tasks`, returns how many"""
+        task_ids = self.db.execute(
+            select(Task.id).where(and_(Task.project_id == project_id, Task.org_id == org_id))
+            .order_by(Task.id).limit(batch_size).with_for_update()
+        ).scalars().all()
+        if not task_ids:
+            return 0
+        hot = Task.__table__
+        self.db.execute(insert(ArchivedTask).from_select(
+            MOVED_COLUMNS + ["archived_at"],
+            select(*_moved(hot), literal(datetime.now(timezone.utc), ArchivedTask.archived_at.type))
+            .where(hot.c.id.in_(task_ids))
+        ))
+        # a plain DELETE: the tasks still exist, so no tombstone and no counter change
+        self.db.execute(delete(hot).where(hot.c.id.in_(task_ids)))
+        self.db.commit()
+        return len(task_ids)
+
+    def restore_batch(self, project_id: int, org_id: int, batch_size: int) -> int:
+        """Move up to batch_size tasks of a project back to `tasks`, returns how many"""
+        cold = ArchivedTask.__table__
+        task_ids = self.db.execute(
+            select(cold.c.id).where(and_(cold.c.project_id == project_id, cold.c.org_id == org_id))
+            .order_by(cold.c.id).limit(batch_size).with_for_update()
+        ).scalars().all()
+        if not task_ids:
+            return 0
+        self.db.execute(insert(Task.__table__).from_select(
+            MOVED_COLUMNS,
+            select(*_moved(cold)).where(cold.c.id.in_(task_ids))
+        ))
+        self.db.execute(delete(cold).where(cold.c.id.in_(task_ids)))
+        self.db.commit()
+        return len(task_ids)
+
+    def get_by_id(self, task_id: int, org_id: int) -> Optional[ArchivedTask]:
+        return self.db.query(ArchivedTask).filter(
+            and_(ArchivedTask.id == task_id, ArchivedTask.org_id == org_id)
+        ).first()
+
+    def count_by_org(self, org_id: int) -> int:
+        """Archived tasks of an organization"""
+        return self.db.query(func.count(ArchivedTask.id)).filter(ArchivedTask.org_id == org_id).scalar()
+
+    def get_many(self, task_ids: List[int], org_id: int) -> List[ArchivedTask]:
+        return self.db.query(ArchivedTask).filter(
+            and_(ArchivedTask.id.in_(task_ids), ArchivedTask.org_id == org_id)
+        ).order_by(ArchivedTask.id).all()
+
+    def has_project(self, project_id: int, org_id: int) -> bool:
+        """Whether any task of the project is in cold storage"""
+        return self.db.query(
+            self.db.query(ArchivedTask.id).filter(
+                and_(ArchivedTask.org_id == org_id, ArchivedTask.project_id == project_id)
+            ).exists()
+        ).scalar()
+
+    def get_board(self, project_id: int, org_id: int, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> list:
+        """A project's tasks from both tables in board order (status, rank, id).
+
+        Used for archived projects and while a project's tasks are being moved,
+        when some are still hot and some already cold. Rows carry the given
+        fields as attributes.
+        """
+        names = list(dict.fromkeys([*(fields or MOVED_COLUMNS), "status", "rank", "id"]))
+        hot, cold = Task.__table__, ArchivedTask.__table__
+        both = union_all(
+            select(*[hot.c[name] for name in names]).where(and_(hot.c.project_id == project_id, hot.c.org_id == org_id)),
+            select(*[cold.c[name] for name in names]).where(and_(cold.c.project_id == project_id, cold.c.org_id == org_id))
+        ).subquery()
+        statement = select(both).order_by(both.c.status, both.c.rank.asc().nulls_last(), both.c.id).offset(skip).limit(limit)
+        # a Core union carries no mapper, route it to the tenant's shard explicitly
+        return self.db.execute(statement, bind_arguments={"mapper": ArchivedTask.__mapper__}).all()
+
+    def unassign_user(self, user_id: int, org_id: int) -> int:
+        """Clear the archived assignments of a member leaving the organization"""
+        result = self.db.query(ArchivedTask).filter(
+            and_(ArchivedTask.org_id == org_id, ArchivedTask.assignee_id == user_id)
+        ).update({"assignee_id": None, "version": ArchivedTask.version + 1}, synchronize_session=False)
+        self.db.commit()
+        return result
+
+    def delete_by_project(self, project_id: int, org_id: int, commit: bool = True) -> int:
+        """Delete the archived tasks of a project being deleted, with their tombstones"""
+        deleted = self.db.query(ArchivedTask.id, ArchivedTask.status).filter(
+            and_(ArchivedTask.project_id == project_id, ArchivedTask.org_id == org_id)
+        ).all()
+        task_ids = [row.id for row in deleted]
+        if task_ids:
+            self.db.query(ArchivedTask).filter(ArchivedTask.id.in_(task_ids)).delete(synchronize_session=False)
+            counters.adjust(self.db, org_id, tasks_count=-len(task_ids))
+            status_history.record(self.db, [
+                status_history.transition(status_history.DELETED, row.id, project_id, org_id, row.status, None, self.db.info.get("user_id"))
+                for row in deleted
+            ])
+            self.db.add_all([Tombstone(org_id=org_id, entity="task", entity_id=task_id) for task_id in task_ids])
+        if commit:
+            self.db.commit()
+        return len(task_ids)
@@ -0,0 +1,78 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, select, insert, delete, literal
+from typing import Optional, List
+from datetime import date, datetime, time, timedelta, timezone
+from app.db.models.task_status_change import TaskStatusChange
+from app.db.models.daily_task_rollup import DailyTaskRollup
+from app.db import status_history
+
+ROLLED_UP_COLUMNS = ["org_id", "project_id", "day", "created", "completed", "deleted", "open_delta"]
+
+
+def _start_of(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+class DailyTaskRollupRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def rebuild(self, first_day: date, last_day: Optional[date] = None) -> int:
+        """Recompute the rollups of every organization on the shard for first_day..last_day (open ended when None).
+
+        A day's rows only depend on that day's history, so any day range can be
+        rebuilt on its own: the rows are deleted and summed again from
+        task_status_history in one INSERT ... SELECT. Not committed, returns
+        how many rows were written.
+        """
+        history = TaskStatusChange.__table__
+        rollups = DailyTaskRollup.__table__
+        open_before = func.coalesce(history.c.from_status, "") != "done"
+        open_after = func.coalesce(history.c.to_status, "") != "done"
+        day = func.date(func.timezone("UTC", history.c.changed_at))
+        aggregated = select(
+            history.c.org_id,
+            history.c.project_id,
+            day,
+            func.count().filter(history.c.action == status_history.CREATED),
+            func.count().filter(and_(history.c.action.in_([status_history.CREATED, status_history.CHANGED]), history.c.to_status == "done")),
+            func.count().filter(history.c.action == status_history.DELETED),
+            func.coalesce(func.sum(case(
+                # a seeded task was there before the history, open or not
+                (and_(history.c.action.in_([status_history.CREATED, status_history.SEEDED]), open_after), 1),
+                (and_(history.c.action == status_history.DELETED, open_before), -1),
+                (and_(history.c.action == status_history.CHANGED, open_before, ~open_after), -1),
+                (and_(history.c.action == status_history.CHANGED, ~open_before, open_after), 1),
+                else_=0
+            )), 0)
+        ).where(history.c.changed_at >= _start_of(first_day))
+        removed = delete(rollups).where(rollups.c.day >= first_day)
+        if last_day is not None:
+            aggregated = aggregated.where(history.c.changed_at < _start_of(last_day + timedelta(days=1)))
+            removed = removed.where(rollups.c.day <= last_day)
+        aggregated = aggregated.group_by(history.c.org_id, history.c.project_id, day)
+
+        # Core statements carry no mapper, route them to the session's shard explicitly
+        bind = {"mapper": DailyTaskRollup.__mapper__}
+        self.db.execute(removed, bind_arguments=bind)
+        return self.db.execute(insert(rollups).from_select(ROLLED_UP_COLUMNS, aggregated), bind_arguments=bind).rowcount
+
+    def get_days(self, org_id: int, since: date, until: date, project_id: Optional[int] = None) -> List[tuple]:
+        """Rows (day, created, completed, deleted, open_delta) of since..until, summed over projects unless one is given"""
+        conditions = [DailyTaskRollup.org_id == org_id, DailyTaskRollup.day >= since, DailyTaskRollup.day <= until]
+        if project_id is not None:
+            conditions.append(DailyTaskRollup.project_id == project_id)
+        return self.db.query(
+            DailyTaskRollup.day,
+            func.sum(DailyTaskRollup.created),
+            func.sum(DailyTaskRollup.completed),
+            func.sum(DailyTaskRollup.deleted),
+            func.sum(DailyTaskRollup.open_delta)
+        ).filter(and_(*conditions)).group_by(DailyTaskRollup.day).order_by(DailyTaskRollup.day).all()
+
+    def open_before(self, org_id: int, day: date, project_id: Optional[int] = None) -> int:
+        """Open tasks at the start of a day, the sum of every earlier delta"""
+        conditions = [DailyTaskRollup.org_id == org_id, DailyTaskRollup.day < day]
+        if project_id is not None:
+            conditions.append(DailyTaskRollup.project_id == project_id)
+        return self.db.query(func.coalesce(func.sum(DailyTaskRollup.open_delta), 0)).filter(and_(*conditions)).scalar()
@@ -0,0 +1,31 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, List
+from datetime import datetime
+from app.db.models.deadline_digest import DeadlineDigest
+
+
+class DeadlineDigestRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_by_org(self, org_id: int) -> Optional[DeadlineDigest]:
+        """Digest of an organization, None before its first hit"""
+        return self.db.query(DeadlineDigest).filter(DeadlineDigest.org_id == org_id).first()
+
+    def get_all(self) -> Dict[int, DeadlineDigest]:
+        """Every digest stored on this shard, by org_id"""
+        return {digest.org_id: digest for digest in self.db.query(DeadlineDigest).all()}
+
+    def save(self, digest: Optional[DeadlineDigest], org_id: int, overdue: List[dict], due_soon: List[dict], scanned_at: datetime):
+        """Create or replace an organization's digest (not committed)"""
+        if digest is None:
+            digest = DeadlineDigest(org_id=org_id)
+            self.db.add(digest)
+        digest.overdue = overdue
+        digest.due_soon = due_soon
+        digest.scanned_at = scanned_at
+        return digest
+
+    def remove(self, digest: DeadlineDigest):
+        """Drop a digest whose organization has nothing due anymore (not committed)"""
+        self.db.delete(digest)
@@ -0,0 +1,59 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text, delete, select, tuple_
+from typing import List, Optional, Tuple
+from datetime import datetime
+from app.core.database import txid_horizon
+from app.db.models.event import Event
+
+# NOTIFY channel carrying "<org_id>:<event_id>" for every committed event
+EVENTS_CHANNEL = "org_events"
+
+
+class EventRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, org_id: int, type: str, data: dict) -> Event:
+        """Store an event in the caller's transaction, listeners are notified when it commits"""
+        db_event = Event(org_id=org_id, type=type, data=data)
+        self.db.add(db_event)
+        self.db.flush()
+        # NOTIFY is transactional: listeners hear about it at commit, never before
+        self.db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": EVENTS_CHANNEL, "payload": f"{org_id}:{db_event.id}"},
+            bind_arguments={"mapper": Event.__mapper__}
+        )
+        return db_event
+
+    def get_horizon(self) -> int:
+        """Oldest transaction still running on the shard: every event with a lower txid is committed (or rolled back) for good"""
+        return self.db.execute(select(txid_horizon()), bind_arguments={"mapper": Event.__mapper__}).scalar()
+
+    def get_since(self, org_id: int, from_txid: int, after: Optional[Tuple[int, int]] = None, limit: int = 500) -> List[Event]:
+        """Committed events of an organization written by transactions from from_txid on, in (txid, id) order.
+
+        `after` is the (txid, id) of the last event of the previous page.
+        """
+        query = self.db.query(Event).filter(Event.org_id == org_id, Event.txid >= from_txid)
+        if after is not None:
+            query = query.filter(tuple_(Event.txid, Event.id) > tuple_(*after))
+        return query.order_by(Event.txid, Event.id).limit(limit).all()
+
+    def get_by_ids(self, event_ids: List[int]) -> List[Event]:
+        """Get several events in one query"""
+        return self.db.query(Event).filter(Event.id.in_(event_ids)).order_by(Event.id).all()
+
+    def get_pending(self, org_id: int, from_txid: int) -> List[Tuple[int, int]]:
+        """(id, txid) of the committed events of an organization written by transactions from from_txid on"""
+        return [tuple(row) for row in self.db.query(Event.id, Event.txid).filter(
+            Event.org_id == org_id,
+            Event.txid >= from_txid
+        ).all()]
+
+    def delete_older_than(self, cutoff: datetime, batch_size: int = 5000) -> int:
+        """Delete one batch of events created before cutoff"""
+        batch = select(Event.id).where(Event.created_at < cutoff).limit(batch_size).scalar_subquery()
+        deleted = self.db.execute(delete(Event).where(Event.id.in_(batch))).rowcount
+        self.db.commit()
+        return deleted
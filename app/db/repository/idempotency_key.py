@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, update, delete, select
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, Tuple, List
+from datetime import datetime, timedelta, timezone
+from app.db.models.idempotency_key import IdempotencyKey
+
+
+class IdempotencyKeyRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, user_id: int, key: str, route: str) -> Optional[IdempotencyKey]:
+        return self.db.query(IdempotencyKey).filter(
+            and_(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.route == route)
+        ).first()
+
+    def claim(self, user_id: int, key: str, route: str, request_hash: str, ttl: timedelta) -> Tuple[IdempotencyKey, bool]:
+        """Take the key for a request about to run, or return who holds it (claimed=False)"""
+        record = IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            route=route,
+            request_hash=request_hash,
+            status="in_progress",
+            expires_at=datetime.now(timezone.utc) + ttl
+        )
+        self.db.add(record)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # the unique (user_id, key, route) is held by an earlier request
+            self.db.rollback()
+            return self.get(user_id, key, route), False
+        return record, True
+
+    def complete(self, record_id: int, status_code: int, content_type: Optional[str], headers: List[List[str]], body: bytes):
+        """Store the response for the retries"""
+        self.db.execute(update(IdempotencyKey).where(IdempotencyKey.id == record_id).values(
+            status="completed",
+            response_status=status_code,
+            response_content_type=content_type,
+            response_headers=headers,
+            response_body=body
+        ).execution_options(synchronize_session=False))
+        self.db.commit()
+
+    def release(self, record_id: int):
+        """Forget a key whose request failed, a retry runs it again"""
+        self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == record_id).execution_options(synchronize_session=False))
+        self.db.commit()
+
+    def release_if_abandoned(self, record_id: int, stale_after: timedelta) -> bool:
+        """Drop a key that expired, or whose request has been in progress for too long (its process died)"""
+        now = datetime.now(timezone.utc)
+        deleted = self.db.execute(delete(IdempotencyKey).where(
+            IdempotencyKey.id == record_id,
+            or_(
+                IdempotencyKey.expires_at < now,
+                and_(IdempotencyKey.status == "in_progress", IdempotencyKey.created_at < now - stale_after)
+            )
+        ).execution_options(synchronize_session=False)).rowcount
+        self.db.commit()
+        return deleted > 0
+
+    def delete_expired(self, cutoff: datetime, batch_size: int = 5000) -> int:
+        """Delete one batch of keys that expired before cutoff"""
+        batch = select(IdempotencyKey.id).where(IdempotencyKey.expires_at < cutoff).limit(batch_size).scalar_subquery()
+        deleted = self.db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(batch)).execution_options(synchronize_session=False)).rowcount
+        self.db.commit()
+        return deleted
@@ -0,0 +1,194 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, and_, update, delete, select, text, func
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from app.db.models.job import Job
+
+# first key of the two-int advisory lock taken while checking an org's running jobs
+JOB_ORG_LOCK_KEY = 31
+
+
+class JobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: dict,
+        org_id: int = None,
+        created_by: int = None,
+        dedupe_key: str = None,
+        max_attempts: int = 5,
+        run_at: datetime = None,
+        commit: bool = True
+    ) -> Job:
+        """Queue a job, or return the queued/running one holding the same dedupe key.
+
+        With commit=False the job joins the caller's transaction and only runs
+        once the caller commits.
+        """
+        if dedupe_key:
+            existing = self.get_active_by_dedupe_key(dedupe_key)
+            if existing:
+                return existing
+
+        db_job = Job(
+            kind=kind,
+            payload=payload,
+            org_id=org_id,
+            created_by=created_by,
+            dedupe_key=dedupe_key,
+            max_attempts=max_attempts,
+            run_at=run_at or datetime.now(timezone.utc)
+        )
+        if not commit:
+            try:
+                # a savepoint, so losing the dedupe race keeps the caller's changes
+                with self.db.begin_nested():
+                    self.db.add(db_job)
+            except IntegrityError:
+                return self.get_active_by_dedupe_key(dedupe_key)
+            return db_job
+
+        self.db.add(db_job)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # another request queued the same job in between
+            self.db.rollback()
+            return self.get_active_by_dedupe_key(dedupe_key)
+        self.db.refresh(db_job)
+        return db_job
+
+    def get_by_id(self, job_id: int) -> Optional[Job]:
+        """Get job by ID"""
+        return self.db.query(Job).filter(Job.id == job_id).first()
+
+    def get_active_by_dedupe_key(self, dedupe_key: str) -> Optional[Job]:
+        """Get the queued or running job holding a dedupe key"""
+        return self.db.query(Job).filter(
+            Job.dedupe_key == dedupe_key,
+            Job.status.in_(["queued", "running"])
+        ).first()
+
+    def queued_since(self, kind: str, since: datetime) -> bool:
+        """Whether a job of this kind was queued after `since`"""
+        return self.db.query(Job.id).filter(Job.kind == kind, Job.created_at >= since).first() is not None
+
+    def delete_finished_before(self, cutoff: datetime, batch_size: int = 5000) -> int:
+        """Delete one batch of succeeded/failed jobs finished before cutoff"""
+        batch = select(Job.id).where(
+            Job.status.in_(["succeeded", "failed"]),
+            Job.finished_at < cutoff
+        ).limit(batch_size).scalar_subquery()
+        deleted = self.db.execute(delete(Job).where(Job.id.in_(batch))).rowcount
+        self.db.commit()
+        return deleted
+
+    def get_by_org(self, org_id: int, limit: int = 50) -> List[Job]:
+        """Get the latest jobs of an organization"""
+        return self.db.query(Job).filter(Job.org_id == org_id).order_by(Job.id.desc()).limit(limit).all()
+
+    def claim(self, worker_id: str, org_limit: int, stale_after: timedelta, batch: int = 10) -> Optional[Job]:
+        """Lock the next runnable job for this worker.
+
+        Ready jobs are locked with FOR UPDATE SKIP LOCKED so concurrent workers
+        never wait on, or double-run, the same row. A running job whose heartbeat
+        is older than `stale_after` lost its worker and is picked up again.
+        Jobs of an organization already running `org_limit` jobs are skipped.
+        The job comes back detached: nothing reads it through this session while
+        the handler runs, which would hold a transaction open meanwhile.
+        """
+        now = datetime.now(timezone.utc)
+        candidates = self.db.query(Job).filter(
+            or_(
+                and_(Job.status == "queued", Job.run_at <= now),
+                and_(Job.status == "running", Job.heartbeat_at < now - stale_after)
+            )
+        ).order_by(Job.run_at).limit(batch).with_for_update(skip_locked=True).all()
+
+        for job in candidates:
+            if job.attempts >= job.max_attempts:
+                # its last attempt died with the worker
+                job.status = "failed"
+                job.error = job.error or "worker lost"
+                job.finished_at = now
+                continue
+
+            if job.org_id is not None and org_limit:
+                # serializes the check below between workers for this org until commit
+                self.db.execute(text("SELECT pg_advisory_xact_lock(:key, :org_id)"), {"key": JOB_ORG_LOCK_KEY, "org_id": job.org_id})
+                running = self.db.query(func.count(Job.id)).filter(
+                    Job.org_id == job.org_id,
+                    Job.status == "running",
+                    Job.heartbeat_at >= now - stale_after,
+                    Job.id != job.id
+                ).scalar()
+                if running >= org_limit:
+                    continue
+
+            job.status = "running"
+            job.attempts += 1
+            job.locked_by = worker_id
+            job.heartbeat_at = now
+            job.started_at = job.started_at or now
+            self.db.flush()
+            self.db.expunge(job)
+            self.db.commit()
+            return job
+
+        # release the row locks
+        self.db.commit()
+        return None
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Tell the other workers the job is still alive, False if it was taken over"""
+        result = self.db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+            .values(heartbeat_at=datetime.now(timezone.utc))
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def report_progress(self, job_id: int, worker_id: str, done: int, total: int = None) -> bool:
+        """Record progress, it also counts as a heartbeat"""
+        values = {"progress": done, "heartbeat_at": datetime.now(timezone.utc)}
+        if total is not None:
+            values["progress_total"] = total
+        result = self.db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+            .values(**values)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def _finish(self, job: Job, worker_id: str, **values) -> bool:
+        """Conditional UPDATE of a job this worker still runs, False if it was taken over"""
+        result = self.db.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.locked_by == worker_id, Job.status == "running")
+            .values(**values)
+        )
+        self.db.commit()
+        return result.rowcount > 0
+
+    def complete(self, job: Job, worker_id: str, result: dict = None) -> bool:
+        """Mark a job succeeded, False if another worker took it over meanwhile"""
+        return self._finish(
+            job, worker_id,
+            status="succeeded",
+            result=result,
+            error=None,
+            finished_at=datetime.now(timezone.utc),
+            progress=func.coalesce(Job.progress_total, Job.progress)
+        )
+
+    def fail(self, job: Job, worker_id: str, error: str, retry_in: Optional[timedelta]) -> bool:
+        """Requeue a failed job after `retry_in`, or fail it for good when None; False if it was taken over"""
+        if retry_in is not None and job.attempts < job.max_attempts:
+            return self._finish(job, worker_id, error=error, status="queued", run_at=datetime.now(timezone.utc) + retry_in, locked_by=None)
+        return self._finish(job, worker_id, error=error, status="failed", finished_at=datetime.now(timezone.utc))
@@ -1,11 +1,11 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, select, delete
 from typing import Optional, List
+from datetime import datetime, timezone
 import secrets
 import string
 from app.db.models.organization import Organization
 from app.db.models.user import User
-from app.db.models.project import Project
 from app.db.schema.organization import OrganizationCreate, OrganizationUpdate
 
 
@@ -43,27 +43,33 @@ class OrganizationRepository:
         return self.db.query(Organization).filter(Organization.owner_id == owner_id).all()
 
     def get_with_details(self, org_id: int) -> Optional[dict]:
-        """Get organization with users and projects count"""
+        """Get organization with its users, projects and tasks counts (maintained counters, no COUNT)"""
         org = self.db.query(Organization).filter(Organization.id == org_id).first()
         if not org:
             return None
 
-        users_count = self.db.query(func.count(User.id)).filter(User.org_id == org_id).scalar()
-        projects_count = self.db.query(func.count(Project.id)).filter(Project.org_id == org_id).scalar()
-
         return {
             "organization": org,
-            "users_count": users_count,
-            "projects_count": projects_count
+            "users_count": org.users_count,
+            "projects_count": org.projects_count,
+            "active_projects_count": org.active_projects_count,
+            "tasks_count": org.tasks_count
         }
 
+    def get_ids_after(self, last_id: int, limit: int = 500) -> List[int]:
+        """Ids of organizations that are not deleted, in id order after last_id"""
+        return [row.id for row in self.db.query(Organization.id).filter(
+            Organization.id > last_id,
+            Organization.deleted_at.is_(None)
+        ).order_by(Organization.id).limit(limit).all()]
+
     def get_with_users(self, org_id: int) -> Optional[Organization]:
         """Get organization with all users"""
         return self.db.query(Organization).options(joinedload(Organization.users)).filter(Organization.id == org_id).first()
 
     def get_with_projects(self, org_id: int) -> Optional[Organization]:
-        """Get organization with all projects"""
-        return self.db.query(Organization).options(joinedload(Organization.projects)).filter(Organization.id == org_id).first()
+        """Get organization with all projects (separate query, projects may live on another shard)"""
+        return self.db.query(Organization).options(selectinload(Organization.projects)).filter(Organization.id == org_id).first()
 
     def update(self, org_id: int, organization_update: OrganizationUpdate) -> Optional[Organization]:
         """Update organization details"""
@@ -89,6 +95,62 @@ class OrganizationRepository:
         self.db.commit()
         return True
 
+    def soft_delete(self, org_id: int, commit: bool = True) -> Optional[Organization]:
+        """Mark organization deleted and revoke its invite code, data is purged later"""
+        db_organization = self.get_by_id(org_id)
+        if not db_organization:
+            return None
+
+        db_organization.deleted_at = datetime.now(timezone.utc)
+        db_organization.invite_code = None
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_organization)
+        else:
+            self.db.flush()
+        return db_organization
+
+    def get_pending_purge(self) -> List[Organization]:
+        """Get soft-deleted organizations whose data is not purged yet"""
+        return self.db.query(Organization).filter(
+            Organization.deleted_at.isnot(None),
+            Organization.purged_at.is_(None)
+        ).all()
+
+    def purge_batch(self, table, org_id: int, batch_size: int) -> int:
+        """Hard-delete up to batch_size rows of an org-scoped table (session must be bound to the org's shard)"""
+        batch = select(table.c.id).where(table.c.org_id == org_id).limit(batch_size).scalar_subquery()
+        result = self.db.execute(delete(table).where(table.c.id.in_(batch)))
+        self.db.commit()
+        return result.rowcount
+
+    def count_tenant_rows(self, tables: list, org_id: int) -> int:
+        """Count the rows an organization still has in org-scoped tables"""
+        return sum(
+            self.db.execute(
+                select(func.count()).select_from(table).where(table.c.org_id == org_id)
+            ).scalar()
+            for table in tables
+        )
+
+    def add_purged_rows(self, org_id: int, count: int):
+        """Record purge progress"""
+        self.db.query(Organization).filter(Organization.id == org_id).update(
+            {"purged_rows": Organization.purged_rows + count}, synchronize_session=False
+        )
+        self.db.commit()
+
+    def mark_purged(self, org_id: int) -> Optional[Organization]:
+        """Mark organization purge as finished"""
+        db_organization = self.get_by_id(org_id)
+        if not db_organization:
+            return None
+
+        db_organization.purged_at = datetime.now(timezone.utc)
+        self.db.commit()
+        self.db.refresh(db_organization)
+        return db_organization
+
     def user_belongs_to_org(self, user_id: int, org_id: int) -> bool:
         """Check if user belongs to organization (authorization helper)"""
         user = self.db.query(User).filter(User.id == user_id, User.org_id == org_id).first()
@@ -101,7 +163,10 @@ class OrganizationRepository:
 
     def get_by_invite_code(self, invite_code: str) -> Optional[Organization]:
         """Get organization by invite code"""
-        return self.db.query(Organization).filter(Organization.invite_code == invite_code).first()
+        return self.db.query(Organization).filter(
+            Organization.invite_code == invite_code,
+            Organization.deleted_at.is_(None)
+        ).first()
 
     def regenerate_invite_code(self, org_id: int) -> Optional[Organization]:
         """Regenerate invite code for an organization"""
@@ -1,8 +1,12 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_
-from typing import Optional, List
-from datetime import datetime
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import and_, or_, not_, func, select, union_all, tuple_
+from typing import Optional, List, Sequence, Tuple
+from datetime import datetime, timezone
 from app.db.models.project import Project
+from app.db.models.task import Task, TASK_STATUSES
+from app.db.models.archived_task import ArchivedTask
+from app.db.models.tombstone import Tombstone
 from app.db.schema.project import ProjectCreate, ProjectUpdate
 
 
@@ -10,6 +14,13 @@ class ProjectRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _query(self, fields: Optional[Sequence[str]] = None):
+        """Query loading only the given columns (every column when None)"""
+        query = self.db.query(Project)
+        if fields:
+            query = query.options(load_only(*[getattr(Project, name) for name in fields]))
+        return query
+
     def create(self, project: ProjectCreate) -> Project:
         """Create a new project (org-scoped)"""
         db_project = Project(
@@ -29,16 +40,71 @@ class ProjectRepository:
             and_(Project.id == project_id, Project.org_id == org_id)
         ).first()
 
-    def get_all_by_organization(self, org_id: int, skip: int = 0, limit: int = 100) -> List[Project]:
+    def get_many(self, project_ids: List[int], org_id: int, fields: Optional[Sequence[str]] = None) -> List[Project]:
+        """Get several projects by ID in one query (org-scoped)"""
+        return self._query(fields).filter(
+            and_(Project.id.in_(project_ids), Project.org_id == org_id)
+        ).order_by(Project.id).all()
+
+    def get_all_by_organization(self, org_id: int, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Project]:
         """Get all projects in an organization"""
-        return self.db.query(Project).filter(Project.org_id == org_id).offset(skip).limit(limit).all()
+        return self._query(fields).filter(Project.org_id == org_id).offset(skip).limit(limit).all()
 
-    def get_by_status(self, org_id: int, is_archived: bool = False, skip: int = 0, limit: int = 100) -> List[Project]:
+    def get_by_status(self, org_id: int, is_archived: bool = False, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Project]:
         """Get projects by status (archived/active) within org"""
-        return self.db.query(Project).filter(
+        return self._query(fields).filter(
             and_(Project.org_id == org_id, Project.is_archived == is_archived)
         ).offset(skip).limit(limit).all()
 
+    def get_with_task_counts(
+        self,
+        org_id: int,
+        is_archived: bool = False,
+        skip: int = 0,
+        limit: int = 100,
+        project_ids: Optional[List[int]] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> list:
+        """A page of projects with their task counts per status, in one query.
+
+        Tasks are aggregated in the database (a grouped subquery restricted to the
+        page's projects, outer joined back), no task row is loaded. Tasks of
+        archived projects are counted from archived_tasks. Rows are
+        (project, todo, in_progress, done, blocked, overdue).
+        """
+        page = select(Project.id).where(Project.org_id == org_id)
+        if project_ids is not None:
+            page = page.where(Project.id.in_(project_ids))
+        else:
+            page = page.where(Project.is_archived == is_archived).order_by(Project.id).offset(skip).limit(limit)
+
+        tasks = union_all(
+            select(Task.project_id, Task.status).where(
+                and_(Task.org_id == org_id, Task.project_id.in_(page.scalar_subquery()))
+            ),
+            select(ArchivedTask.project_id, ArchivedTask.status).where(
+                and_(ArchivedTask.org_id == org_id, ArchivedTask.project_id.in_(page.scalar_subquery()))
+            )
+        ).subquery()
+        counts = select(
+            tasks.c.project_id,
+            *[func.count().filter(tasks.c.status == status).label(status) for status in TASK_STATUSES]
+        ).group_by(tasks.c.project_id).subquery()
+
+        counted = {status: func.coalesce(counts.c[status], 0) for status in TASK_STATUSES}
+        # overdue: deadline passed while the project is active and still has unfinished tasks
+        overdue = func.coalesce(and_(
+            Project.is_archived == False,
+            Project.deadline < datetime.now(timezone.utc),
+            counted["todo"] + counted["in_progress"] + counted["blocked"] > 0
+        ), False)
+        query = self._query(fields).outerjoin(counts, counts.c.project_id == Project.id)
+        query = query.add_columns(*counted.values(), overdue)
+        query = query.filter(Project.org_id == org_id)
+        if project_ids is not None:
+            return query.filter(Project.id.in_(project_ids)).order_by(Project.id).all()
+        return query.filter(Project.is_archived == is_archived).order_by(Project.id).offset(skip).limit(limit).all()
+
     def get_with_tasks(self, project_id: int, org_id: int) -> Optional[Project]:
         """Get project with all tasks"""
         return self.db.query(Project).options(joinedload(Project.tasks)).filter(
@@ -65,53 +131,87 @@ class ProjectRepository:
         return self.db.query(Project).filter(
             and_(
                 Project.org_id == org_id,
-                Project.is_archived == False,
-                Project.deadline < datetime.now()
+                not_(Project.is_archived),
+                Project.deadline < datetime.now(timezone.utc)
             )
         ).all()
 
-    def update(self, project_id: int, org_id: int, project_update: ProjectUpdate) -> Optional[Project]:
-        """Update project details (org-scoped)"""
+    def get_active_due_before(self, until: datetime, exclude_org_ids=()) -> List[Project]:
+        """Active projects of every organization on the shard with a deadline before `until`.
+
+        NOT is_archived matches the predicate of ix_projects_deadline_active, so
+        this is a range scan of that partial index.
+        """
+        query = self.db.query(Project).options(
+            load_only(Project.id, Project.org_id, Project.name, Project.deadline, Project.is_archived)
+        ).filter(not_(Project.is_archived), Project.deadline <= until)
+        if exclude_org_ids:
+            query = query.filter(Project.org_id.not_in(exclude_org_ids))
+        return query.order_by(Project.deadline).all()
+
+    def update(self, project_id: int, org_id: int, project_update: ProjectUpdate, expected_version: Optional[int] = None, commit: bool = True) -> Optional[Project]:
+        """Update project details (org-scoped), only at expected_version when given (StaleDataError otherwise)"""
         db_project = self.get_by_id(project_id, org_id)
         if not db_project:
             return None
+        if expected_version is not None and db_project.version != expected_version:
+            raise StaleDataError(f"Project {project_id} is at version {db_project.version}, not {expected_version}")
 
         update_data = project_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_project, field, value)
 
-        self.db.commit()
-        self.db.refresh(db_project)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_project)
+        else:
+            self.db.flush()
         return db_project
 
-    def archive(self, project_id: int, org_id: int) -> Optional[Project]:
+    def archive(self, project_id: int, org_id: int, commit: bool = True) -> Optional[Project]:
         """Archive a project"""
         db_project = self.get_by_id(project_id, org_id)
         if not db_project:
             return None
 
         db_project.is_archived = True
-        self.db.commit()
-        self.db.refresh(db_project)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_project)
+        else:
+            self.db.flush()
         return db_project
 
-    def unarchive(self, project_id: int, org_id: int) -> Optional[Project]:
+    def unarchive(self, project_id: int, org_id: int, commit: bool = True) -> Optional[Project]:
         """Unarchive a project"""
         db_project = self.get_by_id(project_id, org_id)
         if not db_project:
             return None
 
         db_project.is_archived = False
-        self.db.commit()
-        self.db.refresh(db_project)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_project)
+        else:
+            self.db.flush()
         return db_project
 
-    def delete(self, project_id: int, org_id: int) -> bool:
+    def delete(self, project_id: int, org_id: int, commit: bool = True) -> bool:
         """Delete project (org-scoped)"""
         db_project = self.get_by_id(project_id, org_id)
         if not db_project:
             return False
 
         self.db.delete(db_project)
-        self.db.commit()
+        self.db.add(Tombstone(org_id=org_id, entity="project", entity_id=project_id))
+        if commit:
+            self.db.commit()
+        else:
+            self.db.flush()
         return True
+
+    def get_changed_since(self, org_id: int, after: Tuple[int, int], horizon: int, limit: int = 500) -> List[Project]:
+        """Projects created or updated after a (change_txid, change_seq) position by transactions below horizon, in that order"""
+        return self.db.query(Project).filter(
+            and_(Project.org_id == org_id, tuple_(Project.change_txid, Project.change_seq) > tuple_(*after), Project.change_txid < horizon)
+        ).order_by(Project.change_txid, Project.change_seq).limit(limit).all()
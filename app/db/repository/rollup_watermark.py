@@ -0,0 +1,23 @@
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+from app.db.models.rollup_watermark import RollupWatermark
+
+
+class RollupWatermarkRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, shard: int) -> Optional[datetime]:
+        """Start of the last rollup run of a shard, None before the first"""
+        watermark = self.db.get(RollupWatermark, shard)
+        return watermark.rolled_up_at if watermark else None
+
+    def set(self, shard: int, rolled_up_at: datetime):
+        """Move a shard's watermark (committed)"""
+        watermark = self.db.get(RollupWatermark, shard)
+        if watermark is None:
+            self.db.add(RollupWatermark(shard=shard, rolled_up_at=rolled_up_at))
+        else:
+            watermark.rolled_up_at = rolled_up_at
+        self.db.commit()
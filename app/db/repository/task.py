@@ -1,7 +1,13 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
-from typing import Optional, List
-from app.db.models.task import Task
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import and_, or_, func, update, select, tuple_
+from typing import Optional, List, Sequence, Tuple
+from datetime import datetime, timezone
+from app.db.models.task import Task, TASK_STATUSES
+from app.db.models.tombstone import Tombstone
+from app.core.database import txid_horizon
+from app.db import counters, status_history
+from app.core.ranking import rank_between, spread_ranks
 from app.db.schema.task import TaskCreate, TaskUpdate
 
 
@@ -9,12 +15,20 @@ class TaskRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _query(self, fields: Optional[Sequence[str]] = None):
+        """Query loading only the given columns (every column when None)"""
+        query = self.db.query(Task)
+        if fields:
+            query = query.options(load_only(*[getattr(Task, name) for name in fields]))
+        return query
+
     def create(self, task: TaskCreate) -> Task:
         """Create a new task (org-scoped)"""
         db_task = Task(
             title=task.title,
             content=task.content,
             status=task.status,
+            rank=rank_between(self.last_rank(task.project_id, task.org_id, task.status), None),
             project_id=task.project_id,
             org_id=task.org_id
         )
@@ -29,19 +43,25 @@ class TaskRepository:
             and_(Task.id == task_id, Task.org_id == org_id)
         ).first()
 
-    def get_all_by_project(self, project_id: int, org_id: int, skip: int = 0, limit: int = 100) -> List[Task]:
-        """Get all tasks in a project"""
-        return self.db.query(Task).filter(
+    def get_many(self, task_ids: List[int], org_id: int, fields: Optional[Sequence[str]] = None) -> List[Task]:
+        """Get several tasks by ID in one query (org-scoped)"""
+        return self._query(fields).filter(
+            and_(Task.id.in_(task_ids), Task.org_id == org_id)
+        ).order_by(Task.id).all()
+
+    def get_all_by_project(self, project_id: int, org_id: int, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Task]:
+        """Get all tasks in a project, column by column in card order"""
+        return self._query(fields).filter(
             and_(Task.project_id == project_id, Task.org_id == org_id)
-        ).offset(skip).limit(limit).all()
+        ).order_by(Task.status, Task.rank.asc().nulls_last(), Task.id).offset(skip).limit(limit).all()
 
-    def get_all_by_organization(self, org_id: int, skip: int = 0, limit: int = 100) -> List[Task]:
+    def get_all_by_organization(self, org_id: int, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Task]:
         """Get all tasks in an organization"""
-        return self.db.query(Task).filter(Task.org_id == org_id).offset(skip).limit(limit).all()
+        return self._query(fields).filter(Task.org_id == org_id).offset(skip).limit(limit).all()
 
-    def get_by_status(self, org_id: int, status: str, skip: int = 0, limit: int = 100) -> List[Task]:
+    def get_by_status(self, org_id: int, status: str, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[Task]:
         """Get tasks by status within org"""
-        return self.db.query(Task).filter(
+        return self._query(fields).filter(
             and_(Task.org_id == org_id, Task.status == status)
         ).offset(skip).limit(limit).all()
 
@@ -76,65 +96,251 @@ class TaskRepository:
             and_(Task.id == task_id, Task.org_id == org_id)
         ).first()
 
-    def update(self, task_id: int, org_id: int, task_update: TaskUpdate) -> Optional[Task]:
-        """Update task details (org-scoped)"""
+    def update(self, task_id: int, org_id: int, task_update: TaskUpdate, expected_version: Optional[int] = None, commit: bool = True) -> Optional[Task]:
+        """Update task details (org-scoped).
+
+        With expected_version the write only applies to that version of the row
+        (UPDATE ... WHERE version = :expected), StaleDataError otherwise.
+        """
         db_task = self.get_by_id(task_id, org_id)
         if not db_task:
             return None
+        if expected_version is not None and db_task.version != expected_version:
+            raise StaleDataError(f"Task {task_id} is at version {db_task.version}, not {expected_version}")
 
         update_data = task_update.model_dump(exclude_unset=True)
+        if "status" in update_data and update_data["status"] != db_task.status:
+            # the card goes to the bottom of its new column
+            db_task.rank = rank_between(self.last_rank(db_task.project_id, org_id, update_data["status"]), None)
         for field, value in update_data.items():
             setattr(db_task, field, value)
 
-        self.db.commit()
-        self.db.refresh(db_task)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_task)
+        else:
+            self.db.flush()
         return db_task
 
-    def update_status(self, task_id: int, org_id: int, status: str) -> Optional[Task]:
+    def update_status(self, task_id: int, org_id: int, status: str, commit: bool = True) -> Optional[Task]:
         """Update task status"""
         db_task = self.get_by_id(task_id, org_id)
         if not db_task:
             return None
 
+        if status != db_task.status:
+            db_task.rank = rank_between(self.last_rank(db_task.project_id, org_id, status), None)
         db_task.status = status
-        self.db.commit()
-        self.db.refresh(db_task)
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_task)
+        else:
+            self.db.flush()
+        return db_task
+
+    def last_rank(self, project_id: int, org_id: int, status: Optional[str], exclude_id: Optional[int] = None) -> Optional[str]:
+        """Rank of the bottom card of a column"""
+        query = self.db.query(func.max(Task.rank)).filter(
+            and_(Task.project_id == project_id, Task.org_id == org_id, Task.status == status)
+        )
+        if exclude_id is not None:
+            query = query.filter(Task.id != exclude_id)
+        return query.scalar()
+
+    def rank_after(self, project_id: int, org_id: int, status: Optional[str], rank: str, exclude_id: int) -> Optional[str]:
+        """Rank of the card right below `rank` in a column, None at the bottom"""
+        return self.db.query(func.min(Task.rank)).filter(
+            and_(Task.project_id == project_id, Task.org_id == org_id, Task.status == status,
+                 Task.rank > rank, Task.id != exclude_id)
+        ).scalar()
+
+    def rank_before(self, project_id: int, org_id: int, status: Optional[str], rank: str, exclude_id: int) -> Optional[str]:
+        """Rank of the card right above `rank` in a column, None at the top"""
+        return self.db.query(func.max(Task.rank)).filter(
+            and_(Task.project_id == project_id, Task.org_id == org_id, Task.status == status,
+                 Task.rank < rank, Task.id != exclude_id)
+        ).scalar()
+
+    def move(self, db_task: Task, status: Optional[str], rank: str, commit: bool = True) -> Task:
+        """Put a task at `rank` of a column, a single-row update"""
+        db_task.status = status
+        db_task.rank = rank
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_task)
+        else:
+            self.db.flush()
+        return db_task
+
+    def rebalance_column(self, project_id: int, org_id: int, status: Optional[str], commit: bool = True) -> int:
+        """Respace the ranks of a column evenly, keeping the card order.
+
+        Also ranks cards that have none yet (at the bottom, oldest first). The
+        column's rows stay locked until the transaction ends.
+        """
+        tasks = self.db.query(Task).filter(
+            and_(Task.project_id == project_id, Task.org_id == org_id, Task.status == status)
+        ).order_by(Task.rank.asc().nulls_last(), Task.id).with_for_update().all()
+        for db_task, rank in zip(tasks, spread_ranks(len(tasks))):
+            if db_task.rank != rank:
+                db_task.rank = rank
+        if commit:
+            self.db.commit()
+        else:
+            self.db.flush()
+        return len(tasks)
+
+    def assign(self, db_task: Task, user_id: Optional[int], commit: bool = True) -> Task:
+        """Set (or clear with None) the assignee of a task"""
+        db_task.assignee_id = user_id
+        if commit:
+            self.db.commit()
+            self.db.refresh(db_task)
+        else:
+            self.db.flush()
         return db_task
 
+    def unassign_user(self, user_id: int, org_id: int) -> int:
+        """Clear every assignment of a member leaving the organization"""
+        result = self.db.query(Task).filter(
+            and_(Task.org_id == org_id, Task.assignee_id == user_id)
+        ).update({"assignee_id": None, "version": Task.version + 1}, synchronize_session=False)
+        self.db.commit()
+        return result
+
+    def get_by_assignee(
+        self,
+        org_id: int,
+        user_id: int,
+        status: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Task]:
+        """Tasks assigned to a user, by status then id (a range of ix_tasks_org_id_assignee_id_status)"""
+        query = self._query(fields).filter(and_(Task.org_id == org_id, Task.assignee_id == user_id))
+        if status is not None:
+            query = query.filter(Task.status == status)
+        return query.order_by(Task.status, Task.id).offset(skip).limit(limit).all()
+
+    def count_by_assignee(self, org_id: int) -> list:
+        """Task counts per assignee and status in one aggregate, no task row is loaded.
+
+        Rows are (assignee_id, todo, in_progress, done, blocked, total), None
+        being the unassigned tasks.
+        """
+        return self.db.query(
+            Task.assignee_id,
+            *[func.count().filter(Task.status == status).label(status) for status in TASK_STATUSES],
+            func.count().label("total")
+        ).filter(Task.org_id == org_id).group_by(Task.assignee_id).order_by(Task.assignee_id.asc().nulls_first()).all()
+
     def bulk_update_status(self, task_ids: List[int], org_id: int, status: str) -> int:
         """Bulk update task statuses"""
+        # the previous statuses, for the history
+        previous = self.db.query(Task.id, Task.project_id, Task.status).filter(
+            and_(Task.id.in_(task_ids), Task.org_id == org_id)
+        ).with_for_update().all()
         result = self.db.query(Task).filter(
             and_(Task.id.in_(task_ids), Task.org_id == org_id)
-        ).update({"status": status}, synchronize_session=False)
+        ).update({"status": status, "version": Task.version + 1}, synchronize_session=False)
+        status_history.record(self.db, [
+            status_history.transition(status_history.CHANGED, row.id, row.project_id, org_id, row.status, status, self.db.info.get("user_id"))
+            for row in previous if row.status != status
+        ])
         self.db.commit()
         return result
 
+    def transition_status(
+        self,
+        project_id: int,
+        org_id: int,
+        from_status: str,
+        to_status: str,
+        task_ids: Optional[List[int]] = None,
+        commit: bool = True
+    ) -> List[int]:
+        """Move every task of a project in from_status to to_status with one UPDATE ... RETURNING id.
+
+        The moved cards lose their rank (unranked cards are listed at the bottom
+        of a column); rebalance_column() ranks them.
+        """
+        conditions = [Task.project_id == project_id, Task.org_id == org_id, Task.status == from_status]
+        if task_ids is not None:
+            conditions.append(Task.id.in_(task_ids))
+        result = self.db.execute(
+            update(Task).where(and_(*conditions)).values(
+                status=to_status,
+                rank=None,
+                version=Task.version + 1
+            ).returning(Task.id).execution_options(synchronize_session=False)
+        )
+        moved_ids = sorted(result.scalars().all())
+        changed_at = datetime.now(timezone.utc)
+        status_history.record(self.db, [
+            status_history.transition(status_history.CHANGED, task_id, project_id, org_id, from_status, to_status, self.db.info.get("user_id"), changed_at)
+            for task_id in moved_ids
+        ])
+        if commit:
+            self.db.commit()
+        return moved_ids
+
     def bulk_delete(self, task_ids: List[int], org_id: int) -> int:
         """Bulk delete tasks"""
-        result = self.db.query(Task).filter(
+        deleted = self.db.query(Task.id, Task.project_id, Task.status).filter(
             and_(Task.id.in_(task_ids), Task.org_id == org_id)
+        ).all()
+        deleted_ids = [row.id for row in deleted]
+        result = self.db.query(Task).filter(
+            and_(Task.id.in_(deleted_ids), Task.org_id == org_id)
         ).delete(synchronize_session=False)
+        counters.adjust(self.db, org_id, tasks_count=-result)
+        status_history.record(self.db, [
+            status_history.transition(status_history.DELETED, row.id, row.project_id, org_id, row.status, None, self.db.info.get("user_id"))
+            for row in deleted
+        ])
+        self.db.add_all([Tombstone(org_id=org_id, entity="task", entity_id=task_id) for task_id in deleted_ids])
         self.db.commit()
         return result
 
-    def delete(self, task_id: int, org_id: int) -> bool:
+    def delete(self, task_id: int, org_id: int, commit: bool = True) -> bool:
         """Delete task (org-scoped)"""
         db_task = self.get_by_id(task_id, org_id)
         if not db_task:
             return False
 
         self.db.delete(db_task)
-        self.db.commit()
+        self.db.add(Tombstone(org_id=org_id, entity="task", entity_id=task_id))
+        if commit:
+            self.db.commit()
+        else:
+            self.db.flush()
         return True
 
+    def get_sync_horizon(self) -> int:
+        """txid below which the shard's synced rows (tasks, projects, tombstones) are final"""
+        return self.db.execute(select(txid_horizon()), bind_arguments={"mapper": Task.__mapper__}).scalar()
+
+    def get_changed_since(self, org_id: int, after: Tuple[int, int], horizon: int, limit: int = 500) -> List[Task]:
+        """Tasks created or updated after a (change_txid, change_seq) position by transactions below horizon, in that order"""
+        return self.db.query(Task).filter(
+            and_(Task.org_id == org_id, tuple_(Task.change_txid, Task.change_seq) > tuple_(*after), Task.change_txid < horizon)
+        ).order_by(Task.change_txid, Task.change_seq).limit(limit).all()
+
     def count_by_project(self, project_id: int, org_id: int) -> int:
         """Count tasks in a project"""
         return self.db.query(Task).filter(
             and_(Task.project_id == project_id, Task.org_id == org_id)
         ).count()
 
-    def count_by_status(self, org_id: int, status: str) -> int:
-        """Count tasks by status in organization"""
-        return self.db.query(Task).filter(
-            and_(Task.org_id == org_id, Task.status == status)
-        ).count()
+    def count_by_status(self, org_id: int):
+        """Task counts of an organization per status in one aggregate.
+
+        The row has a column per TASK_STATUSES, `other` (no or another status)
+        and `total`.
+        """
+        return self.db.query(
+            *[func.count().filter(Task.status == status).label(status) for status in TASK_STATUSES],
+            func.count().filter(or_(Task.status.is_(None), Task.status.not_in(TASK_STATUSES))).label("other"),
+            func.count().label("total")
+        ).filter(Task.org_id == org_id).one()
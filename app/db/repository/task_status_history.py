@@ -0,0 +1,98 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, select, cast, Float, DateTime, insert, literal, union_all, exists
+from typing import Optional, Iterator, List
+from datetime import date, datetime, timedelta, timezone
+from app.db.models.task import Task, TASK_STATUSES
+from app.db.models.archived_task import ArchivedTask
+from app.db.models.task_status_change import TaskStatusChange
+from app.db import status_history
+
+# codes of iter_columns besides the TASK_STATUSES indexes
+NO_STATUS = -1
+BEFORE_HISTORY = -2  # from status of a seeded row: the task existed before the history
+
+
+def _status_code(column):
+    """A status as its index in TASK_STATUSES, NO_STATUS for None"""
+    return case(
+        *[(column == status, index) for index, status in enumerate(TASK_STATUSES)],
+        else_=NO_STATUS
+    )
+
+
+class TaskStatusHistoryRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def iter_columns(self, org_id: int, until: datetime, project_id: Optional[int] = None, chunk_size: int = 50000) -> Iterator[List[tuple]]:
+        """Transitions up to `until` in time order, as chunks of (task_id, from, to, epoch) rows.
+
+        Statuses are encoded as small integers and timestamps as epoch seconds
+        in the database, so rows are plain numbers ready to become columnar
+        arrays (app/core/flow_metrics.py); seeded rows come from BEFORE_HISTORY.
+        Served by the (org_id, project_id, changed_at) / (org_id, changed_at)
+        indexes.
+        """
+        conditions = [TaskStatusChange.org_id == org_id, TaskStatusChange.changed_at <= until]
+        if project_id is not None:
+            conditions.append(TaskStatusChange.project_id == project_id)
+        statement = select(
+            TaskStatusChange.task_id,
+            case(
+                (TaskStatusChange.action == status_history.SEEDED, BEFORE_HISTORY),
+                else_=_status_code(TaskStatusChange.from_status)
+            ),
+            _status_code(TaskStatusChange.to_status),
+            cast(func.extract("epoch", TaskStatusChange.changed_at), Float)
+        ).where(and_(*conditions)).order_by(TaskStatusChange.changed_at, TaskStatusChange.id)
+        result = self.db.execute(
+            statement.execution_options(yield_per=chunk_size),
+            bind_arguments={"mapper": TaskStatusChange.__mapper__}
+        )
+        for chunk in result.partitions():
+            yield chunk
+
+    def first_day(self) -> Optional[date]:
+        """Day (UTC) of the oldest transition on the shard, None when there is none"""
+        first = self.db.query(func.min(TaskStatusChange.changed_at)).scalar()
+        if first is None:
+            return None
+        # rows written on a database without time zones are UTC
+        return (first if first.tzinfo else first.replace(tzinfo=timezone.utc)).astimezone(timezone.utc).date()
+
+    def seed(self) -> int:
+        """Add a seeded row for every task of the shard that has no created one (app/utils/seed_status_history.py).
+
+        Those tasks existed before the history. Each gets its status when the
+        history began: the from status of its first transition, or its current
+        status (hot or cold table) when it has none, dated a second before the
+        oldest transition. Running it again adds nothing. Not committed, returns
+        how many rows were added.
+        """
+        history = TaskStatusChange.__table__
+        bind = {"mapper": TaskStatusChange.__mapper__}
+        first = self.db.execute(select(func.min(history.c.changed_at)), bind_arguments=bind).scalar()
+        seeded_at = first - timedelta(seconds=1) if first is not None else datetime.now(timezone.utc)
+
+        # tasks whose history starts with a change or a deletion, not with their creation
+        ranked = select(
+            history.c.task_id, history.c.project_id, history.c.org_id, history.c.action, history.c.from_status,
+            func.row_number().over(partition_by=history.c.task_id, order_by=(history.c.changed_at, history.c.id)).label("position")
+        ).subquery()
+        started_late = select(ranked.c.task_id, ranked.c.project_id, ranked.c.org_id, ranked.c.from_status).where(
+            ranked.c.position == 1,
+            ranked.c.action.not_in([status_history.CREATED, status_history.SEEDED])
+        )
+        # tasks without any history, in the hot or the cold table
+        untouched = [
+            select(table.c.id, table.c.project_id, table.c.org_id, table.c.status).where(
+                ~exists().where(history.c.task_id == table.c.id)
+            )
+            for table in (Task.__table__, ArchivedTask.__table__)
+        ]
+        missing = union_all(started_late, *untouched).subquery()
+        seeded = select(
+            literal(status_history.SEEDED), *missing.c, literal(seeded_at, DateTime(timezone=True))
+        )
+        stmt = insert(history).from_select(["action", "task_id", "project_id", "org_id", "to_status", "changed_at"], seeded)
+        return self.db.execute(stmt, bind_arguments=bind).rowcount
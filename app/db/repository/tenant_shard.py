@@ -0,0 +1,49 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Optional, Dict
+from app.db.models.tenant_shard import TenantShard
+
+
+class TenantShardRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, org_id: int, shard: int) -> TenantShard:
+        """Place an organization on a shard"""
+        db_entry = TenantShard(org_id=org_id, shard=shard, state="active")
+        self.db.add(db_entry)
+        self.db.commit()
+        self.db.refresh(db_entry)
+        return db_entry
+
+    def get_by_org(self, org_id: int) -> Optional[TenantShard]:
+        """Get the shard entry of an organization"""
+        return self.db.query(TenantShard).filter(TenantShard.org_id == org_id).first()
+
+    def count_by_shard(self) -> Dict[int, int]:
+        """Count organizations placed on each shard"""
+        rows = self.db.query(TenantShard.shard, func.count(TenantShard.org_id)).group_by(TenantShard.shard).all()
+        return {shard: count for shard, count in rows}
+
+    def set_state(self, org_id: int, state: str) -> Optional[TenantShard]:
+        """Mark a tenant active or moving (read-only)"""
+        db_entry = self.get_by_org(org_id)
+        if not db_entry:
+            return None
+
+        db_entry.state = state
+        self.db.commit()
+        self.db.refresh(db_entry)
+        return db_entry
+
+    def set_shard(self, org_id: int, shard: int) -> Optional[TenantShard]:
+        """Flip a tenant to another shard and make it writable again"""
+        db_entry = self.get_by_org(org_id)
+        if not db_entry:
+            return None
+
+        db_entry.shard = shard
+        db_entry.state = "active"
+        self.db.commit()
+        self.db.refresh(db_entry)
+        return db_entry
@@ -0,0 +1,17 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import tuple_
+from typing import List, Tuple
+from app.db.models.tombstone import Tombstone
+
+
+class TombstoneRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_changed_since(self, org_id: int, after: Tuple[int, int], horizon: int, limit: int = 500) -> List[Tombstone]:
+        """Tombstones of an organization after a (change_txid, change_seq) position by transactions below horizon, in that order"""
+        return self.db.query(Tombstone).filter(
+            Tombstone.org_id == org_id,
+            tuple_(Tombstone.change_txid, Tombstone.change_seq) > tuple_(*after),
+            Tombstone.change_txid < horizon
+        ).order_by(Tombstone.change_txid, Tombstone.change_seq).limit(limit).all()
@@ -1,6 +1,10 @@
-from sqlalchemy.orm import Session, joinedload
-from typing import Optional, List
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy import select, tuple_
+from typing import Optional, List, Sequence, Tuple
+from app.core.database import txid_horizon
 from app.db.models.user import User
+from app.db.models.tombstone import Tombstone
+from app.db import counters
 from app.db.schema.user import UserCreate, UserUpdate
 
 
@@ -8,6 +12,13 @@ class UserRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _query(self, fields: Optional[Sequence[str]] = None):
+        """Query loading only the given columns (every column when None)"""
+        query = self.db.query(User)
+        if fields:
+            query = query.options(load_only(*[getattr(User, name) for name in fields]))
+        return query
+
     def create(self, user: UserCreate) -> User:
         """Create a new user (without organization initially)"""
         db_user = User(
@@ -30,9 +41,13 @@ class UserRepository:
         """Get user by email (for authentication)"""
         return self.db.query(User).filter(User.email == email).first()
 
-    def get_all_by_organization(self, org_id: int, skip: int = 0, limit: int = 100) -> List[User]:
+    def get_all_by_organization(self, org_id: int, skip: int = 0, limit: int = 100, fields: Optional[Sequence[str]] = None) -> List[User]:
         """Get all users in an organization"""
-        return self.db.query(User).filter(User.org_id == org_id).offset(skip).limit(limit).all()
+        return self._query(fields).filter(User.org_id == org_id).offset(skip).limit(limit).all()
+
+    def get_many_in_organization(self, user_ids: List[int], org_id: int, fields: Optional[Sequence[str]] = None) -> List[User]:
+        """Get several members of an organization by ID in one query"""
+        return self._query(fields).filter(User.id.in_(user_ids), User.org_id == org_id).order_by(User.id).all()
 
     def get_with_organization(self, user_id: int) -> Optional[User]:
         """Get user with organization details"""
@@ -62,6 +77,9 @@ class UserRepository:
         if not db_user:
             return False
 
+        if db_user.org_id is not None:
+            # synced clients of the organization have to drop this member
+            self.db.add(Tombstone(org_id=db_user.org_id, entity="user", entity_id=user_id))
         self.db.delete(db_user)
         self.db.commit()
         return True
@@ -71,15 +89,40 @@ class UserRepository:
         user = self.db.query(User).filter(User.id == user_id, User.org_id == org_id).first()
         return user is not None
 
+    def detach_all_from_organization(self, org_id: int, commit: bool = True) -> int:
+        """Remove every member from an organization in one statement"""
+        result = self.db.query(User).filter(User.org_id == org_id).update(
+            {"org_id": None, "role": None}, synchronize_session=False
+        )
+        counters.adjust(self.db, org_id, users_count=-result)
+        if commit:
+            self.db.commit()
+        return result
+
     def assign_to_organization(self, user_id: int, org_id: int, role: str) -> Optional[User]:
         """Assign user to an organization with a role"""
         db_user = self.get_by_id(user_id)
         if not db_user:
             return None
         
+        if db_user.org_id is not None and db_user.org_id != org_id:
+            # the member left, synced clients of the old organization have to drop them
+            self.db.add(Tombstone(org_id=db_user.org_id, entity="user", entity_id=user_id))
         db_user.org_id = org_id
         db_user.role = role
         
         self.db.commit()
         self.db.refresh(db_user)
         return db_user
+
+    def get_sync_horizon(self) -> int:
+        """txid below which the directory's synced rows (users) are final"""
+        return self.db.execute(select(txid_horizon()), bind_arguments={"mapper": User.__mapper__}).scalar()
+
+    def get_changed_since(self, org_id: int, after: Tuple[int, int], horizon: int, limit: int = 500) -> List[User]:
+        """Members created or updated after a (change_txid, change_seq) position by transactions below horizon, in that order"""
+        return self.db.query(User).filter(
+            User.org_id == org_id,
+            tuple_(User.change_txid, User.change_seq) > tuple_(*after),
+            User.change_txid < horizon
+        ).order_by(User.change_txid, User.change_seq).limit(limit).all()
@@ -1,7 +1,12 @@
 from app.db.schema.user import UserBase, UserCreate, UserUpdate, UserResponse, UserLogin
 from app.db.schema.organization import OrganizationBase, OrganizationCreate, OrganizationUpdate, OrganizationResponse, JoinOrganizationRequest, UpdateMemberRoleRequest, TransferOwnershipRequest
-from app.db.schema.project import ProjectBase, ProjectCreate, ProjectUpdate, ProjectResponse
-from app.db.schema.task import TaskBase, TaskCreate, TaskUpdate, TaskResponse, TaskStatusUpdate
+from app.db.schema.project import ProjectBase, ProjectCreate, ProjectUpdate, ProjectResponse, TaskCounts, ProjectTaskCounts, DeadlineDigestResponse
+from app.db.schema.task import TaskBase, TaskCreate, TaskUpdate, TaskResponse, TaskStatusUpdate, TaskMove, TaskBulkStatusUpdate, TaskBulkStatusResult, TaskAssignment, AssigneeWorkload
+from app.db.schema.job import JobResponse
+from app.db.schema.sync import SyncResponse
+from app.db.schema.batch import BatchRequest, BatchResponse
+from app.db.schema.activity import ActivityEntryResponse, ActivityPage
+from app.db.schema.analytics import CumulativeFlowResponse, BurndownResponse, DurationStats, CycleTimeResponse, TrendsResponse
 
 __all__ = [
     "UserBase",
@@ -20,9 +25,28 @@ __all__ = [
     "ProjectCreate",
     "ProjectUpdate",
     "ProjectResponse",
+    "TaskCounts",
+    "ProjectTaskCounts",
+    "DeadlineDigestResponse",
     "TaskBase",
     "TaskCreate",
     "TaskUpdate",
     "TaskResponse",
     "TaskStatusUpdate",
+    "TaskMove",
+    "TaskBulkStatusUpdate",
+    "TaskBulkStatusResult",
+    "TaskAssignment",
+    "AssigneeWorkload",
+    "JobResponse",
+    "SyncResponse",
+    "BatchRequest",
+    "BatchResponse",
+    "ActivityEntryResponse",
+    "ActivityPage",
+    "CumulativeFlowResponse",
+    "BurndownResponse",
+    "DurationStats",
+    "CycleTimeResponse",
+    "TrendsResponse",
 ]
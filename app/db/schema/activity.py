@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from typing import Optional, Any, List
+from datetime import datetime
+
+
+class ActivityEntryResponse(BaseModel):
+    id: int
+    actor_id: Optional[int] = None
+    action: str
+    entity: str
+    entity_id: int
+    data: Any
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ActivityPage(BaseModel):
+    entries: List[ActivityEntryResponse]
+    next_before: Optional[int] = None  # pass as ?before= for the next (older) page, None on the last one
@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, List
+from datetime import date, datetime
+
+
+class CumulativeFlowResponse(BaseModel):
+    project_id: Optional[int] = None  # None for the whole organization
+    timestamps: List[datetime]
+    counts: Dict[str, List[int]]  # tasks in each status at each timestamp
+
+
+class BurndownResponse(BaseModel):
+    project_id: int
+    timestamps: List[datetime]
+    remaining: List[int]  # tasks not done yet
+    done: List[int]
+    scope: List[int]  # all tasks, remaining + done
+
+
+class DurationStats(BaseModel):
+    count: int
+    mean: Optional[float] = None  # hours, None when no task finished in the window
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p85: Optional[float] = None
+    p95: Optional[float] = None
+
+
+class CycleTimeResponse(BaseModel):
+    project_id: Optional[int] = None  # None for the whole organization
+    since: datetime
+    until: datetime
+    cycle_time: DurationStats  # first in_progress -> done
+    lead_time: DurationStats  # created -> done
+
+
+class TrendsResponse(BaseModel):
+    project_id: Optional[int] = None  # None for the whole organization
+    days: List[date]
+    created: List[int]
+    completed: List[int]
+    open: List[int]  # open (not done) tasks at the end of each day
+    rolled_up_at: Optional[datetime] = None  # changes after this are not counted yet
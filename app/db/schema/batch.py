@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Any
+
+
+class BatchRequestItem(BaseModel):
+    id: str
+    method: Literal["GET"] = "GET"
+    path: str  # e.g. "/tasks/12" or "/projects/?limit=20"
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchRequestItem] = Field(..., min_length=1)
+
+
+class BatchResponseItem(BaseModel):
+    id: str
+    status: int
+    body: Any
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchResponseItem]
@@ -1,6 +1,13 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, field_validator
+from typing import Optional, List
+from datetime import datetime, timezone
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # deadlines without an offset are taken as UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
 
 
 class ProjectBase(BaseModel):
@@ -11,6 +18,8 @@ class ProjectBase(BaseModel):
 class ProjectCreate(ProjectBase):
     deadline: Optional[datetime] = None
 
+    _deadline_utc = field_validator("deadline")(_utc)
+
 
 class ProjectUpdate(BaseModel):
     name: Optional[str] = None
@@ -18,12 +27,44 @@ class ProjectUpdate(BaseModel):
     is_archived: Optional[bool] = None
     deadline: Optional[datetime] = None
 
+    _deadline_utc = field_validator("deadline")(_utc)
+
 
 class ProjectResponse(ProjectBase):
     id: int
     org_id: int
     is_archived: bool
     deadline: Optional[datetime] = None
+    version: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class TaskCounts(BaseModel):
+    todo: int = 0
+    in_progress: int = 0
+    done: int = 0
+    blocked: int = 0
+
+
+class ProjectTaskCounts(BaseModel):
+    """What ?include=task_counts adds to each project of a list"""
+    task_counts: TaskCounts
+    overdue: bool
+
+
+class DeadlineProject(BaseModel):
+    id: int
+    name: str
+    deadline: datetime
+
+
+class DeadlineDigestResponse(BaseModel):
+    """Projects past or near their deadline, as of the last scan"""
+    overdue: List[DeadlineProject] = []
+    due_soon: List[DeadlineProject] = []
+    scanned_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
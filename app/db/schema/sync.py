@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import List
+from app.db.schema.task import TaskResponse
+from app.db.schema.project import ProjectResponse
+from app.db.schema.user import UserResponse
+
+
+class SyncTask(TaskResponse):
+    change_seq: int
+
+
+class SyncProject(ProjectResponse):
+    change_seq: int
+
+
+class SyncUser(UserResponse):
+    change_seq: int
+
+
+class SyncDeleted(BaseModel):
+    entity: str
+    entity_id: int
+
+    class Config:
+        from_attributes = True
+
+
+class SyncResponse(BaseModel):
+    cursor: str
+    has_more: bool
+    projects: List[SyncProject]
+    tasks: List[SyncTask]
+    users: List[SyncUser]
+    deleted: List[SyncDeleted]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
+from app.db.schema.project import TaskCounts
 
 
 class TaskBase(BaseModel):
@@ -22,6 +23,9 @@ class TaskResponse(TaskBase):
     id: int
     project_id: int
     org_id: int
+    rank: Optional[str] = None
+    assignee_id: Optional[int] = None
+    version: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -31,5 +35,35 @@ class TaskStatusUpdate(BaseModel):
     status: str
 
 
+class TaskMove(BaseModel):
+    """Where a dragged card lands in its (new) column, neither id means the bottom"""
+    status: Optional[str] = None
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
+
+
+class TaskBulkStatusUpdate(BaseModel):
+    """Move every task of a project in `from_status` (only those of task_ids when given) to `to_status`"""
+    project_id: int
+    from_status: str
+    to_status: str
+    task_ids: Optional[List[int]] = None
+
+
+class TaskBulkStatusResult(BaseModel):
+    project_id: int
+    from_status: str
+    to_status: str
+    updated: int
+    task_ids: List[int]
+
+
 class TaskAssignment(BaseModel):
     user_id: int
+
+
+class AssigneeWorkload(BaseModel):
+    """Tasks of one assignee per status, assignee_id None for unassigned tasks"""
+    assignee_id: Optional[int] = None
+    task_counts: TaskCounts
+    total: int
@@ -0,0 +1,79 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+from typing import Tuple
+import os
+import threading
+import time
+from app.core.database import SessionLocal, engine
+from app.db.models.organization import Organization
+from app.db.models.project import Project
+from app.db.models.task import Task
+from app.db.models.event import Event
+from app.db.models.tombstone import Tombstone
+from app.db.models.deadline_digest import DeadlineDigest
+from app.db.models.activity import ActivityEntry
+from app.db.models.archived_task import ArchivedTask
+from app.db.models.task_status_change import TaskStatusChange
+from app.db.models.daily_task_rollup import DailyTaskRollup
+
+# how long a process trusts its cached list of organizations being purged
+DELETED_ORGS_TTL_SECONDS = float(os.getenv("DELETED_ORGS_TTL_SECONDS", "10"))
+
+# org-scoped models hidden as soon as their organization is soft-deleted
+ORG_SCOPED_MODELS = [Project, Task, ArchivedTask, TaskStatusChange, DailyTaskRollup, Event, Tombstone, DeadlineDigest, ActivityEntry]
+
+
+class DeletedOrganizations:
+    """Cached ids of soft-deleted organizations whose data is not purged yet"""
+
+    def __init__(self, ttl: float = DELETED_ORGS_TTL_SECONDS):
+        self.ttl = ttl
+        self._ids = ()
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def ids(self) -> Tuple[int, ...]:
+        if self._expires > time.monotonic():
+            return self._ids
+
+        with self._lock:
+            if self._expires <= time.monotonic():
+                # the directory lives on shard 0, read it from the primary
+                with Session(engine) as db:
+                    rows = db.query(Organization.id).filter(
+                        Organization.deleted_at.isnot(None),
+                        Organization.purged_at.is_(None)
+                    ).all()
+                self._ids = tuple(row.id for row in rows)
+                self._expires = time.monotonic() + self.ttl
+        return self._ids
+
+    def invalidate(self):
+        self._expires = 0.0
+
+
+deleted_organizations = DeletedOrganizations()
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _hide_deleted_organizations(orm_execute_state):
+    """Filter rows of soft-deleted organizations out of every ORM select.
+
+    Pass execution_options(include_deleted_orgs=True) to see them (the purger does).
+    """
+    if (
+        not orm_execute_state.is_select
+        or orm_execute_state.is_column_load
+        or orm_execute_state.is_relationship_load
+        or orm_execute_state.execution_options.get("include_deleted_orgs", False)
+    ):
+        return
+
+    ids = deleted_organizations.ids()
+    if not ids:
+        return
+
+    orm_execute_state.statement = orm_execute_state.statement.options(*[
+        with_loader_criteria(model, model.org_id.not_in(ids), include_aliases=True)
+        for model in ORG_SCOPED_MODELS
+    ])
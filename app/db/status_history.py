@@ -0,0 +1,68 @@
+"""Task status history.
+
+Every status a task goes through is appended to `task_status_history`, in
+the transaction that changes it: its creation, every status change, its
+deletion. A None status is a task without one, or one not existing yet or
+anymore; the action tells which, so a task created without a status and
+given "todo" later has ("created", None, None) then ("changed", None, "todo").
+
+The end of each flush records what the unit of work changed. Statement-level
+writes that bypass it (query(...).update(), set based UPDATEs) call record()
+themselves.
+
+Moving tasks to and from cold storage (archived_tasks) is not a status
+change and leaves no trace here.
+
+Tasks that existed before the history have no "created" row. A one-off run of
+app/utils/seed_status_history.py gives each of them a "seeded" row (None to
+its status when the history began), dated just before the oldest transition,
+so counts start from every task instead of going negative.
+"""
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy import event, inspect, insert
+from sqlalchemy.orm import Session
+from app.db.models.task import Task
+from app.db.models.task_status_change import TaskStatusChange
+
+CREATED, CHANGED, DELETED, SEEDED = "created", "changed", "deleted", "seeded"
+
+
+def transition(action: str, task_id: int, project_id: int, org_id: int, from_status, to_status, actor_id=None, changed_at=None) -> dict:
+    return {
+        "action": action,
+        "org_id": org_id,
+        "project_id": project_id,
+        "task_id": task_id,
+        "from_status": from_status,
+        "to_status": to_status,
+        "actor_id": actor_id,
+        "changed_at": changed_at or datetime.now(timezone.utc),
+    }
+
+
+def record(db: Session, transitions: List[dict]):
+    """Append transitions (joins the session's transaction on the tenant's shard)"""
+    if not transitions:
+        return
+    stmt = insert(TaskStatusChange)
+    db.connection(bind_arguments={"mapper": TaskStatusChange.__mapper__, "clause": stmt}).execute(stmt, transitions)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_transitions(session, flush_context):
+    changed_at = datetime.now(timezone.utc)
+    actor_id = session.info.get("user_id")
+    transitions = []
+    for obj in session.new:
+        if isinstance(obj, Task):
+            transitions.append(transition(CREATED, obj.id, obj.project_id, obj.org_id, None, obj.status, actor_id, changed_at))
+    for obj in session.dirty:
+        if isinstance(obj, Task):
+            history = inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                transitions.append(transition(CHANGED, obj.id, obj.project_id, obj.org_id, history.deleted[0], history.added[0], actor_id, changed_at))
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            transitions.append(transition(DELETED, obj.id, obj.project_id, obj.org_id, obj.status, None, actor_id, changed_at))
+    record(session, transitions)
@@ -0,0 +1,10 @@
+from app.jobs.registry import job_handler, JobContext, RetryableError, PermanentError, HANDLERS, PERIODIC
+
+__all__ = [
+    "job_handler",
+    "JobContext",
+    "RetryableError",
+    "PermanentError",
+    "HANDLERS",
+    "PERIODIC",
+]
@@ -0,0 +1,158 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from app.core.database import engine, shards, SessionLocal
+from app.core.sharding import bind_tenant
+from app.db.repository import EventRepository, JobRepository, OrganizationRepository, TaskRepository, IdempotencyKeyRepository, ProjectRepository, ArchivedTaskRepository
+from app.db.counters import reconcile
+from app.jobs.registry import job_handler, JobContext
+from app.utils.purge_organizations import purge_organization
+from app.utils.deadline_scanner import scan_deadlines
+from app.utils.daily_rollups import roll_up
+
+# live events are only kept for stream resume, finished jobs for their status endpoint
+EVENTS_RETENTION_HOURS = float(os.getenv("EVENTS_RETENTION_HOURS", "24"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+# how often every organization's counters are recounted
+COUNTERS_RECONCILE_SECONDS = float(os.getenv("COUNTERS_RECONCILE_SECONDS", "3600"))
+# how often project deadlines are scanned
+DEADLINE_SCAN_SECONDS = float(os.getenv("DEADLINE_SCAN_SECONDS", "300"))
+# how often the daily task rollups catch up with the status history
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "600"))
+# tasks moved to or from cold storage per transaction, and the pause between batches
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", "0.05"))
+
+
+# ===== Organization Jobs ===== #
+
+@job_handler("purge_organization")
+def purge_organization_job(ctx: JobContext) -> dict:
+    """Delete the projects and tasks of a soft-deleted organization"""
+    purged = purge_organization(ctx.payload["org_id"], progress=ctx.progress)
+    return {"purged_rows": purged}
+
+
+@job_handler("reconcile_counters", every=COUNTERS_RECONCILE_SECONDS)
+def reconcile_counters_job(ctx: JobContext) -> dict:
+    """Recount the maintained counters of every organization and repair drift"""
+    checked = 0
+    repaired = {}
+    last_id = 0
+    while True:
+        with Session(engine) as db:
+            org_ids = OrganizationRepository(db).get_ids_after(last_id)
+        if not org_ids:
+            break
+        for org_id in org_ids:
+            drift = reconcile(org_id)
+            if drift:
+                print(f"Organization {org_id} counters drifted: {drift}")
+                repaired[str(org_id)] = {name: {"stored": stored, "actual": actual} for name, (stored, actual) in drift.items()}
+            checked += 1
+        last_id = org_ids[-1]
+        ctx.progress(checked)
+    return {"checked": checked, "repaired": repaired}
+
+
+# ===== Project Jobs ===== #
+
+@job_handler("scan_deadlines", every=DEADLINE_SCAN_SECONDS)
+def scan_deadlines_job(ctx: JobContext) -> dict:
+    """Refresh the overdue / due soon digests of every organization"""
+    return scan_deadlines(progress=ctx.progress)
+
+
+@job_handler("roll_up_daily_tasks", every=ROLLUP_INTERVAL_SECONDS)
+def roll_up_daily_tasks_job(ctx: JobContext) -> dict:
+    """Rebuild the daily task rollups of the days with new status history"""
+    return roll_up(progress=ctx.progress)
+
+
+@job_handler("move_project_tasks")
+def move_project_tasks_job(ctx: JobContext) -> dict:
+    """Move an archived project's tasks to archived_tasks, or an active one's back, in batches"""
+    moved = {"archived": 0, "restored": 0}
+    with SessionLocal() as db:
+        bind_tenant(db, ctx.org_id)
+        project_repo, archive_repo = ProjectRepository(db), ArchivedTaskRepository(db)
+        while True:
+            # read again every batch, the project may be (un)archived meanwhile
+            project = project_repo.get_by_id(ctx.payload["project_id"], ctx.org_id)
+            if project is None:
+                break
+            if project.is_archived:
+                batch = archive_repo.archive_batch(project.id, ctx.org_id, ARCHIVE_BATCH_SIZE)
+                moved["archived"] += batch
+            else:
+                batch = archive_repo.restore_batch(project.id, ctx.org_id, ARCHIVE_BATCH_SIZE)
+                moved["restored"] += batch
+            if not batch:
+                break
+            ctx.progress(moved["archived"] + moved["restored"])
+            time.sleep(ARCHIVE_PAUSE_SECONDS)
+    return moved
+
+
+# ===== Task Jobs ===== #
+
+@job_handler("rebalance_ranks")
+def rebalance_ranks_job(ctx: JobContext) -> dict:
+    """Respace the card ranks of one board column whose keys grew long, ranking unranked cards last"""
+    with SessionLocal() as db:
+        bind_tenant(db, ctx.org_id)
+        ranked = TaskRepository(db).rebalance_column(ctx.payload["project_id"], ctx.org_id, ctx.payload["status"])
+    return {"ranked": ranked}
+
+
+# ===== Housekeeping ===== #
+
+@job_handler("prune_events", every=3600)
+def prune_events_job(ctx: JobContext) -> dict:
+    """Delete events older than the retention window on every shard"""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=EVENTS_RETENTION_HOURS)
+    deleted = 0
+    for cluster in shards:
+        with Session(cluster.primary) as db:
+            event_repo = EventRepository(db)
+            while True:
+                batch = event_repo.delete_older_than(cutoff)
+                if not batch:
+                    break
+                deleted += batch
+                ctx.progress(deleted)
+                time.sleep(0.05)
+    return {"deleted_events": deleted}
+
+
+@job_handler("prune_jobs", every=86400)
+def prune_jobs_job(ctx: JobContext) -> dict:
+    """Delete finished jobs older than the retention window"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=JOB_RETENTION_DAYS)
+    deleted = 0
+    with Session(engine) as db:
+        job_repo = JobRepository(db)
+        while True:
+            batch = job_repo.delete_finished_before(cutoff)
+            if not batch:
+                break
+            deleted += batch
+            ctx.progress(deleted)
+    return {"deleted_jobs": deleted}
+
+
+@job_handler("prune_idempotency_keys", every=3600)
+def prune_idempotency_keys_job(ctx: JobContext) -> dict:
+    """Delete expired idempotency keys in batches"""
+    cutoff = datetime.now(timezone.utc)
+    deleted = 0
+    with Session(engine) as db:
+        key_repo = IdempotencyKeyRepository(db)
+        while True:
+            batch = key_repo.delete_expired(cutoff)
+            if not batch:
+                break
+            deleted += batch
+            ctx.progress(deleted)
+    return {"deleted_keys": deleted}
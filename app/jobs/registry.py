@@ -0,0 +1,43 @@
+from typing import Callable, Dict, Optional
+
+# job kind -> handler(ctx) returning an optional JSON-able result
+HANDLERS: Dict[str, Callable] = {}
+
+# job kind -> seconds between runs, queued by the workers themselves
+PERIODIC: Dict[str, float] = {}
+
+
+class RetryableError(Exception):
+    """Raise from a handler to retry the job later; any other exception is retried as well"""
+
+
+class PermanentError(Exception):
+    """Raise from a handler when retrying cannot help, the job fails right away"""
+
+
+class JobContext:
+    """What a handler gets: the job's payload and a way to report progress"""
+
+    def __init__(self, job_id: int, org_id: Optional[int], payload: dict, attempt: int, report: Callable):
+        self.job_id = job_id
+        self.org_id = org_id
+        self.payload = payload
+        self.attempt = attempt
+        self._report = report
+
+    def progress(self, done: int, total: int = None):
+        """Record progress (also keeps the job's heartbeat fresh)"""
+        self._report(done, total)
+
+
+def job_handler(kind: str, every: float = None):
+    """Register the decorated function as the handler of a job kind.
+
+    With `every`, the workers also queue it every that many seconds.
+    """
+    def register(func: Callable) -> Callable:
+        HANDLERS[kind] = func
+        if every:
+            PERIODIC[kind] = every
+        return func
+    return register
@@ -0,0 +1,131 @@
+"""Worker loop of the background job queue.
+
+Run with: python worker.py [--concurrency N]
+
+Each thread claims one job at a time from the jobs table (FOR UPDATE SKIP
+LOCKED, so any number of worker processes can share the queue), runs its
+handler, and records the result. Failed jobs are retried with exponential
+backoff until max_attempts. A heartbeat thread keeps running jobs fresh so a
+crashed worker's jobs are picked up again after JOB_STALE_SECONDS.
+Handlers registered with `every=` are queued periodically by the workers.
+"""
+import argparse
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.db.repository.job import JobRepository
+from app.jobs.registry import HANDLERS, PERIODIC, JobContext, PermanentError
+from app.jobs import handlers  # registers the handlers
+
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_ORG_CONCURRENCY = int(os.getenv("JOB_ORG_CONCURRENCY", "2"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "10"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "3600"))
+JOB_SCHEDULE_SECONDS = float(os.getenv("JOB_SCHEDULE_SECONDS", "60"))
+
+
+def backoff(attempt: int) -> timedelta:
+    """Exponential backoff with jitter so retries of a failed batch do not stampede"""
+    delay = min(JOB_BACKOFF_SECONDS * 2 ** (attempt - 1), JOB_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def _heartbeat(job_id: int, worker_id: str, done: threading.Event):
+    while not done.wait(JOB_HEARTBEAT_SECONDS):
+        # the job tables live in the directory, always talk to its primary
+        with Session(engine) as db:
+            if not JobRepository(db).heartbeat(job_id, worker_id):
+                return
+
+
+def run_job(db: Session, job, worker_id: str):
+    """Run one claimed job and record how it ended"""
+    job_repo = JobRepository(db)
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        job_repo.fail(job, worker_id, f"No handler for job kind '{job.kind}'", retry_in=None)
+        return
+
+    def report(done: int, total: int = None):
+        with Session(engine) as progress_db:
+            JobRepository(progress_db).report_progress(job.id, worker_id, done, total)
+
+    ctx = JobContext(job.id, job.org_id, dict(job.payload or {}), job.attempts, report)
+    done = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job.id, worker_id, done), daemon=True).start()
+    try:
+        result = handler(ctx)
+    except PermanentError as exc:
+        recorded = job_repo.fail(job, worker_id, str(exc), retry_in=None)
+    except Exception:
+        recorded = job_repo.fail(job, worker_id, traceback.format_exc(limit=5)[-2000:], retry_in=backoff(job.attempts))
+    else:
+        recorded = job_repo.complete(job, worker_id, result)
+    finally:
+        done.set()
+    if not recorded:
+        # our heartbeat went stale and another worker claimed the job, its run decides
+        print(f"[{worker_id}] job {job.id} ({job.kind}) was taken over by another worker, outcome dropped")
+
+
+def work(worker_id: str, stop: threading.Event, org_limit: int = JOB_ORG_CONCURRENCY, poll: float = JOB_POLL_SECONDS):
+    """Claim and run jobs until `stop` is set"""
+    stale_after = timedelta(seconds=JOB_STALE_SECONDS)
+    while not stop.is_set():
+        try:
+            with Session(engine) as db:
+                job = JobRepository(db).claim(worker_id, org_limit, stale_after)
+                if job is not None:
+                    print(f"[{worker_id}] job {job.id} ({job.kind}) attempt {job.attempts}")
+                    run_job(db, job, worker_id)
+                    continue
+        except Exception:
+            traceback.print_exc()
+        stop.wait(poll)
+
+
+def schedule(stop: threading.Event):
+    """Queue the periodic jobs that are due, the dedupe key keeps workers from doubling them"""
+    while not stop.is_set():
+        try:
+            with Session(engine) as db:
+                job_repo = JobRepository(db)
+                now = datetime.now(timezone.utc)
+                for kind, every in PERIODIC.items():
+                    if not job_repo.queued_since(kind, now - timedelta(seconds=every)):
+                        job_repo.enqueue(kind, {}, dedupe_key=kind)
+        except Exception:
+            traceback.print_exc()
+        stop.wait(JOB_SCHEDULE_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=1, help="jobs run in parallel by this process")
+    parser.add_argument("--org-concurrency", type=int, default=JOB_ORG_CONCURRENCY, help="max running jobs per organization (0 = unlimited)")
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # finish the current jobs, then exit
+        signal.signal(sig, lambda *_: stop.set())
+
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    threads = [
+        threading.Thread(target=work, args=(f"{name}:{index}", stop, args.org_concurrency))
+        for index in range(args.concurrency)
+    ]
+    threads.append(threading.Thread(target=schedule, args=(stop,)))
+    for thread in threads:
+        thread.start()
+    print(f"Worker {name} running {args.concurrency} job(s) at a time")
+    for thread in threads:
+        thread.join()
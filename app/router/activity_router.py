@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.db.models.user import User
+from app.db.schema import ActivityPage
+from app.service import activity_service
+
+
+router = APIRouter(
+    prefix="/activity",
+    tags=["Activity"]
+)
+
+
+# ===== Activity Log ===== #
+
+@router.get("/", response_model=ActivityPage)
+def get_organization_activity(
+    before: Optional[int] = Query(None, ge=1, description="Entries older than this id (next_before of the previous page)"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get who changed what in your organization, newest first (owner/admin only)"""
+    return activity_service.getOrganizationActivity(current_user, db, before, limit)
+
+
+@router.get("/{entity}/{entity_id}", response_model=ActivityPage)
+def get_entity_activity(
+    entity: str,
+    entity_id: int,
+    before: Optional[int] = Query(None, ge=1, description="Entries older than this id (next_before of the previous page)"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the history of a user, project or task, newest first"""
+    return activity_service.getEntityActivity(entity, entity_id, current_user, db, before, limit)
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.db.models.user import User
+from app.db.schema import CumulativeFlowResponse, BurndownResponse, CycleTimeResponse, TrendsResponse
+from app.service import analytics_service
+
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"]
+)
+
+SINCE = Query(None, description="Start of the window (default: 30 days before until)")
+UNTIL = Query(None, description="End of the window (default: now)")
+SINCE_DAY = Query(None, description="First day, UTC (default: 29 days before until)")
+UNTIL_DAY = Query(None, description="Last day, UTC (default: today)")
+POINTS = Query(31, ge=2, le=1000, description="Number of evenly spaced times from since to until")
+
+
+# ===== Organization ===== #
+
+@router.get("/cumulative-flow", response_model=CumulativeFlowResponse)
+def get_organization_cumulative_flow(
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    points: int = POINTS,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the number of tasks in each status over time, across your organization"""
+    return analytics_service.getCumulativeFlow(None, current_user, db, since, until, points)
+
+
+@router.get("/cycle-time", response_model=CycleTimeResponse)
+def get_organization_cycle_time(
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get cycle and lead time percentiles (hours) of tasks finished in the window, across your organization"""
+    return analytics_service.getCycleTime(None, current_user, db, since, until)
+
+
+@router.get("/trends", response_model=TrendsResponse)
+def get_organization_trends(
+    since: Optional[date] = SINCE_DAY,
+    until: Optional[date] = UNTIL_DAY,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get tasks created, completed and open per day across your organization"""
+    return analytics_service.getTrends(None, current_user, db, since, until)
+
+
+# ===== Project ===== #
+
+@router.get("/projects/{project_id}/cumulative-flow", response_model=CumulativeFlowResponse)
+def get_project_cumulative_flow(
+    project_id: int,
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    points: int = POINTS,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the number of tasks in each status of a project over time"""
+    return analytics_service.getCumulativeFlow(project_id, current_user, db, since, until, points)
+
+
+@router.get("/projects/{project_id}/burndown", response_model=BurndownResponse)
+def get_project_burndown(
+    project_id: int,
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    points: int = POINTS,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the remaining, done and total tasks of a project over time"""
+    return analytics_service.getBurndown(project_id, current_user, db, since, until, points)
+
+
+@router.get("/projects/{project_id}/cycle-time", response_model=CycleTimeResponse)
+def get_project_cycle_time(
+    project_id: int,
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get cycle and lead time percentiles (hours) of a project's tasks finished in the window"""
+    return analytics_service.getCycleTime(project_id, current_user, db, since, until)
+
+
+@router.get("/projects/{project_id}/trends", response_model=TrendsResponse)
+def get_project_trends(
+    project_id: int,
+    since: Optional[date] = SINCE_DAY,
+    until: Optional[date] = UNTIL_DAY,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get tasks created, completed and open per day of a project"""
+    return analytics_service.getTrends(project_id, current_user, db, since, until)
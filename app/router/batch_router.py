@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.db.models.user import User
+from app.db.schema import BatchRequest, BatchResponse
+from app.service import batch_service
+
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["Batch"]
+)
+
+
+# ===== Batch Reads ===== #
+
+@router.post("", response_model=BatchResponse)
+def run_batch(
+    data: BatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Run several read requests (GET paths of this API) with one authentication"""
+    return batch_service.runBatch(data, current_user, db)
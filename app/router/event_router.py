@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Query, Header
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.db.models.user import User
+from app.service import event_service
+
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Events"]
+)
+
+
+# ===== Live Events ===== #
+
+@router.get("/stream")
+def stream_events(
+    last_event_id: Optional[int] = Query(None, ge=0, description="Resume from this stream position (the last `id:` received)"),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Server-Sent Events stream of task and project changes in your organization"""
+    # browsers send Last-Event-ID by themselves when they reconnect
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        event_service.getEventStream(current_user, resume_from, db),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -99,6 +99,16 @@ def delete_organization(
     return organization_service.deleteOrganization(current_user, db)
 
 
+@router.get("/deleted/{org_id}/purge-status")
+def get_purge_status(
+    org_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Follow the background purge of a deleted organization (former owner only)"""
+    return organization_service.getPurgeStatus(org_id, current_user, db)
+
+
 # ===== User Actions ===== #
 
 @router.post("/leave")
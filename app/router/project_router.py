@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, status, Query, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, parse_ids, parse_if_match
+from typing import Optional, List, Literal
 from app.db.models.user import User
-from app.db.schema import ProjectCreate, ProjectUpdate, ProjectResponse
+from app.db.schema import ProjectCreate, ProjectUpdate, ProjectResponse, ProjectTaskCounts, DeadlineDigestResponse
 from app.service import project_service
+from app.core.serialization import render, ProjectFields
 
 
 router = APIRouter(
@@ -28,33 +30,48 @@ def create_project(
 @router.get("/{project_id}", response_model=ProjectResponse)
 def get_project(
     project_id: int,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get a specific project by ID"""
-    return project_service.getProjectById(project_id, current_user, db)
+    """Get a specific project by ID, its version in ETag"""
+    project = project_service.getProjectById(project_id, current_user, db)
+    response.headers["ETag"] = f'"{project.version}"'
+    return project
 
 
 @router.get("/", response_model=list[ProjectResponse])
 def get_all_projects(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: tuple = Depends(ProjectFields.query),
+    include: Optional[Literal["task_counts"]] = Query(None, description="task_counts: add per-status task counts and an overdue flag"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all active projects in your organization"""
-    return project_service.getAllProjects(current_user, db, skip, limit)
+    """Get all active projects in your organization, or only the given ?ids=1,2,3"""
+    if include == "task_counts":
+        projects = project_service.getProjectsWithTaskCounts(current_user, db, skip, limit, project_ids=ids, fields=fields)
+        return render(ProjectFields.list_adapter(fields, ProjectTaskCounts), projects)
+    if ids is not None:
+        return render(ProjectFields.list_adapter(fields), project_service.getProjectsByIds(ids, current_user, db, fields))
+    return render(ProjectFields.list_adapter(fields), project_service.getAllProjects(current_user, db, skip, limit, fields))
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
 def update_project(
     project_id: int,
     data: ProjectUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(parse_if_match),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Update a project (owner/admin only)"""
-    return project_service.updateProject(project_id, data, current_user, db)
+    """Update a project (owner/admin only); with If-Match: "<version>" only if nobody changed it since (412 otherwise)"""
+    project = project_service.updateProject(project_id, data, current_user, db, expected_version)
+    response.headers["ETag"] = f'"{project.version}"'
+    return project
 
 
 @router.delete("/{project_id}")
@@ -93,8 +110,24 @@ def unarchive_project(
 def get_archived_projects(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    fields: tuple = Depends(ProjectFields.query),
+    include: Optional[Literal["task_counts"]] = Query(None, description="task_counts: add per-status task counts and an overdue flag"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all archived projects in your organization"""
-    return project_service.getArchivedProjects(current_user, db, skip, limit)
+    if include == "task_counts":
+        projects = project_service.getProjectsWithTaskCounts(current_user, db, skip, limit, is_archived=True, fields=fields)
+        return render(ProjectFields.list_adapter(fields, ProjectTaskCounts), projects)
+    return render(ProjectFields.list_adapter(fields), project_service.getArchivedProjects(current_user, db, skip, limit, fields))
+
+
+# ===== Deadlines ===== #
+
+@router.get("/deadlines/digest", response_model=DeadlineDigestResponse)
+def get_deadline_digest(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Overdue and soon-due projects of your organization (refreshed by the deadline scanner)"""
+    return project_service.getDeadlineDigest(current_user, db)
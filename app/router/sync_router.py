@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.core.dependencies import get_current_user
+from app.db.models.user import User
+from app.db.schema import SyncResponse
+from app.service import sync_service
+from app.core.serialization import render, SyncAdapter
+
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["Sync"]
+)
+
+
+# ===== Delta Sync ===== #
+
+@router.get("", response_model=SyncResponse)
+def sync_changes(
+    since: Optional[str] = Query(None, description="Cursor returned by the previous call, omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Everything in your organization that changed since a cursor (call again while has_more)"""
+    return render(SyncAdapter, sync_service.getChanges(current_user, since, limit, db))
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, status, Query
+from fastapi import APIRouter, Depends, status, Query, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, parse_ids, parse_if_match
+from typing import Optional, List
 from app.db.models.user import User
-from app.db.schema import TaskCreate, TaskUpdate, TaskResponse, TaskStatusUpdate
+from app.db.schema import TaskCreate, TaskUpdate, TaskResponse, TaskStatusUpdate, TaskMove, TaskBulkStatusUpdate, TaskBulkStatusResult, TaskAssignment, AssigneeWorkload
 from app.service import task_service
+from app.core.serialization import render, TaskFields
 
 
 router = APIRouter(
@@ -25,14 +27,30 @@ def create_task(
     return task_service.createTask(data, current_user, db)
 
 
+@router.get("/mine", response_model=list[TaskResponse])
+def get_my_tasks(
+    status_filter: Optional[str] = Query(None, description="Only tasks with this status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    fields: tuple = Depends(TaskFields.query),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the tasks assigned to you, by status"""
+    return render(TaskFields.list_adapter(fields), task_service.getMyTasks(current_user, db, status_filter, skip, limit, fields))
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get a specific task by ID"""
-    return task_service.getTaskById(task_id, current_user, db)
+    """Get a specific task by ID, its version in ETag"""
+    task = task_service.getTaskById(task_id, current_user, db)
+    response.headers["ETag"] = f'"{task.version}"'
+    return task
 
 
 @router.get("/project/{project_id}", response_model=list[TaskResponse])
@@ -40,33 +58,42 @@ def get_tasks_by_project(
     project_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    fields: tuple = Depends(TaskFields.query),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all tasks for a specific project"""
-    return task_service.getAllTasksByProject(project_id, current_user, db, skip, limit)
+    """Get all tasks for a specific project in board order (content only with ?fields=...,content)"""
+    return render(TaskFields.list_adapter(fields), task_service.getAllTasksByProject(project_id, current_user, db, skip, limit, fields))
 
 
 @router.get("/", response_model=list[TaskResponse])
 def get_all_tasks(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: tuple = Depends(TaskFields.query),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all tasks in your organization"""
-    return task_service.getAllTasksByOrg(current_user, db, skip, limit)
+    """Get all tasks in your organization, or only the given ?ids=1,2,3"""
+    if ids is not None:
+        return render(TaskFields.list_adapter(fields), task_service.getTasksByIds(ids, current_user, db, fields))
+    return render(TaskFields.list_adapter(fields), task_service.getAllTasksByOrg(current_user, db, skip, limit, fields))
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
 def update_task(
     task_id: int,
     data: TaskUpdate,
+    response: Response,
+    expected_version: Optional[int] = Depends(parse_if_match),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Update a task"""
-    return task_service.updateTask(task_id, data, current_user, db)
+    """Update a task; with If-Match: "<version>" only if nobody changed it since (412 otherwise)"""
+    task = task_service.updateTask(task_id, data, current_user, db, expected_version)
+    response.headers["ETag"] = f'"{task.version}"'
+    return task
 
 
 @router.delete("/{task_id}")
@@ -92,16 +119,38 @@ def update_task_status(
     return task_service.updateTaskStatus(task_id, data.status, current_user, db)
 
 
+@router.patch("/{task_id}/move", response_model=TaskResponse)
+def move_task(
+    task_id: int,
+    data: TaskMove,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Move a card on the board: right after `after_id` / before `before_id`, optionally into another `status` column"""
+    return task_service.moveTask(task_id, data, current_user, db)
+
+
+@router.post("/bulk/status", response_model=TaskBulkStatusResult)
+def bulk_update_task_status(
+    data: TaskBulkStatusUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Move every task of a project in `from_status` (or only `task_ids`) to `to_status` in one update"""
+    return task_service.bulkUpdateTaskStatus(data, current_user, db)
+
+
 @router.get("/filter/status", response_model=list[TaskResponse])
 def get_tasks_by_status(
     status_filter: str = Query(..., description="Filter by status: todo, in_progress, done, blocked"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    fields: tuple = Depends(TaskFields.query),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get tasks filtered by status"""
-    return task_service.getTasksByStatus(status_filter, current_user, db, skip, limit)
+    return render(TaskFields.list_adapter(fields), task_service.getTasksByStatus(status_filter, current_user, db, skip, limit, fields))
 
 
 @router.get("/statistics/overview")
@@ -111,3 +160,35 @@ def get_task_statistics(
 ):
     """Get task statistics (counts by status)"""
     return task_service.getTaskStatistics(current_user, db)
+
+
+@router.get("/statistics/workload", response_model=list[AssigneeWorkload])
+def get_workload(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get task counts per assignee and status"""
+    return task_service.getWorkload(current_user, db)
+
+
+# ===== Task Assignment ===== #
+
+@router.put("/{task_id}/assignee", response_model=TaskResponse)
+def assign_task(
+    task_id: int,
+    data: TaskAssignment,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Assign a task to a member of your organization"""
+    return task_service.assignTask(task_id, data.user_id, current_user, db)
+
+
+@router.delete("/{task_id}/assignee", response_model=TaskResponse)
+def unassign_task(
+    task_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Remove the assignee of a task"""
+    return task_service.unassignTask(task_id, current_user, db)
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, parse_ids
 from app.db.schema.user import UserResponse , UserUpdate
 from app.db.models.user import User
-from typing import List
-from app.service.user_service import getCurrentUserProfile , getAllUsersInOrganization , getUserById , updateUser,deleteUser,updateOwnProfile
+from typing import List, Optional
+from app.core.serialization import render, UserFields
+from app.service.user_service import getCurrentUserProfile , getAllUsersInOrganization , getUsersByIds , getUserById , updateUser,deleteUser,updateOwnProfile
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -38,10 +39,15 @@ def update_own_profile(
 def lis_org_users(
     skip:int = 0 , 
     limit:int = 10 ,
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: tuple = Depends(UserFields.query),
     current_user:User = Depends(get_current_user),
     db : Session = Depends(get_db)
 ):
-    return getAllUsersInOrganization(current_user=current_user, db=db, skip=skip, limit=limit)
+    # ?ids=1,2,3 fetches those members with a single IN query
+    if ids is not None:
+        return render(UserFields.list_adapter(fields), getUsersByIds(user_ids=ids, current_user=current_user, db=db, fields=fields))
+    return render(UserFields.list_adapter(fields), getAllUsersInOrganization(current_user=current_user, db=db, skip=skip, limit=limit, fields=fields))
 #-------------------------------------------------------------------
 
 #-------------------------------------------------------------------
@@ -0,0 +1,65 @@
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.db.repository import ActivityRepository
+from app.db.schema import ActivityPage
+from fastapi import HTTPException, status
+from app.db.models.user import User
+
+ACTIVITY_ENTITIES = ("user", "organization", "project", "task")
+
+
+def _page(entries: list, limit: int) -> dict:
+    # a full page may have older entries behind it
+    return {
+        "entries": entries,
+        "next_before": entries[-1].id if len(entries) == limit else None
+    }
+
+
+# ===== Activity Log ===== #
+
+
+# --------------------------------------------------------------------------------
+def getOrganizationActivity(current_user: User, db: Session, before: Optional[int] = None, limit: int = 50) -> ActivityPage:
+    """Get the activity log of user's organization, newest first (owner/admin only)"""
+    activity_repo = ActivityRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Check if user has permission
+    if current_user.role not in ["owner", "admin"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only organization owner or admin can view the activity log."
+        )
+    
+    return _page(activity_repo.get_page(current_user.org_id, before, limit), limit)
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getEntityActivity(entity: str, entity_id: int, current_user: User, db: Session, before: Optional[int] = None, limit: int = 50) -> ActivityPage:
+    """Get the history of one user, project or task of user's organization, newest first"""
+    activity_repo = ActivityRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    if entity not in ACTIVITY_ENTITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid entity. Must be one of: {', '.join(ACTIVITY_ENTITIES)}"
+        )
+    
+    # Entries are org-scoped, ids of other organizations simply have no history
+    return _page(activity_repo.get_page(current_user.org_id, before, limit, entity, entity_id), limit)
+# --------------------------------------------------------------------------------
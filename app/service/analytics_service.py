@@ -0,0 +1,152 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+from app.core.sharding import shard_map
+from app.db.repository import ProjectRepository, TaskStatusHistoryRepository, DailyTaskRollupRepository, RollupWatermarkRepository
+from app.db.models.task import TASK_STATUSES
+from app.db.schema import CumulativeFlowResponse, BurndownResponse, CycleTimeResponse, TrendsResponse
+from fastapi import HTTPException, status
+from app.db.models.user import User
+
+DEFAULT_WINDOW = timedelta(days=30)
+MAX_TREND_DAYS = 366
+
+# numpy (app/core/flow_metrics.py) is imported on first use, only processes
+# serving analytics pay for it
+
+
+def _window(since: Optional[datetime], until: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """The requested time window, the last 30 days by default (naive times are UTC)"""
+    until = until or datetime.now(timezone.utc)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    since = since or until - DEFAULT_WINDOW
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if since >= until:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="since must be before until."
+        )
+    return since, until
+
+
+def _checkAccess(project_id: Optional[int], current_user: User, db: Session):
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+
+    # Verify project exists and belongs to user's org (archived ones keep their history)
+    if project_id is not None and ProjectRepository(db).get_by_id(project_id, current_user.org_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found or doesn't belong to your organization."
+        )
+
+
+def _load(project_id: Optional[int], until: datetime, current_user: User, db: Session):
+    """Every transition of the project (or organization) up to `until`, as columns"""
+    from app.core import flow_metrics
+    history_repo = TaskStatusHistoryRepository(db)
+    return flow_metrics.to_columns(history_repo.iter_columns(current_user.org_id, until, project_id))
+
+
+def _flow(project_id: Optional[int], current_user: User, db: Session, since, until, points: int):
+    from app.core import flow_metrics
+    since, until = _window(since, until)
+    transitions = _load(project_id, until, current_user, db)
+    edges = flow_metrics.time_edges(since.timestamp(), until.timestamp(), points)
+    timestamps = [datetime.fromtimestamp(edge, timezone.utc) for edge in edges.tolist()]
+    return timestamps, flow_metrics.cumulative_flow(transitions, edges)
+
+
+# ===== Flow Analytics ===== #
+
+
+# --------------------------------------------------------------------------------
+def getCumulativeFlow(project_id: Optional[int], current_user: User, db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None, points: int = 31) -> CumulativeFlowResponse:
+    """Get the number of tasks in each status at evenly spaced times (project, or the whole organization)"""
+    _checkAccess(project_id, current_user, db)
+
+    timestamps, flow = _flow(project_id, current_user, db, since, until, points)
+    return {
+        "project_id": project_id,
+        "timestamps": timestamps,
+        "counts": {task_status: flow[code].tolist() for code, task_status in enumerate(TASK_STATUSES)}
+    }
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getBurndown(project_id: int, current_user: User, db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None, points: int = 31) -> BurndownResponse:
+    """Get the remaining, done and total tasks of a project at evenly spaced times"""
+    from app.core import flow_metrics
+    _checkAccess(project_id, current_user, db)
+
+    timestamps, flow = _flow(project_id, current_user, db, since, until, points)
+    series = flow_metrics.burndown(flow)
+    return {
+        "project_id": project_id,
+        "timestamps": timestamps,
+        **{name: values.tolist() for name, values in series.items()}
+    }
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getCycleTime(project_id: Optional[int], current_user: User, db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None) -> CycleTimeResponse:
+    """Get cycle and lead time percentiles of the tasks finished in a window (project, or the whole organization)"""
+    from app.core import flow_metrics
+    _checkAccess(project_id, current_user, db)
+
+    since, until = _window(since, until)
+    # tasks finished in the window may have started long before it
+    transitions = _load(project_id, until, current_user, db)
+    cycle = flow_metrics.completion_times(transitions, since.timestamp(), until.timestamp())
+    lead = flow_metrics.completion_times(transitions, since.timestamp(), until.timestamp(), start_status=None)
+    return {
+        "project_id": project_id,
+        "since": since,
+        "until": until,
+        "cycle_time": flow_metrics.summarize(cycle),
+        "lead_time": flow_metrics.summarize(lead)
+    }
+# --------------------------------------------------------------------------------
+
+
+# ===== Trends ===== #
+
+
+# --------------------------------------------------------------------------------
+def getTrends(project_id: Optional[int], current_user: User, db: Session, since: Optional[date] = None, until: Optional[date] = None) -> TrendsResponse:
+    """Get tasks created, completed and open per day (project, or the whole organization), from the daily rollups"""
+    rollup_repo = DailyTaskRollupRepository(db)
+    _checkAccess(project_id, current_user, db)
+
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - (DEFAULT_WINDOW - timedelta(days=1))
+    if since > until or (until - since).days >= MAX_TREND_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"since must be before until, at most {MAX_TREND_DAYS} days apart."
+        )
+
+    # rows only exist for days with activity, the others are zeros
+    rows = {row[0]: row for row in rollup_repo.get_days(current_user.org_id, since, until, project_id)}
+    open_count = rollup_repo.open_before(current_user.org_id, since, project_id)
+    trends = {"project_id": project_id, "days": [], "created": [], "completed": [], "open": []}
+    for offset in range((until - since).days + 1):
+        day = since + timedelta(days=offset)
+        _, created, completed, _, open_delta = rows.get(day, (day, 0, 0, 0, 0))
+        open_count += open_delta
+        trends["days"].append(day)
+        trends["created"].append(created)
+        trends["completed"].append(completed)
+        trends["open"].append(open_count)
+
+    trends["rolled_up_at"] = RollupWatermarkRepository(db).get(shard_map.lookup(current_user.org_id)[0])
+    return trends
+# --------------------------------------------------------------------------------
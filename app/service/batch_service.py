@@ -0,0 +1,231 @@
+import logging
+import os
+import re
+import threading
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from app.core.database import SessionLocal
+from app.core.dependencies import parse_ids
+from app.core.serialization import TaskAdapter, TaskFields, ProjectAdapter, ProjectFields, DeadlineDigestAdapter, UserAdapter, UserFields
+from app.db.schema import BatchRequest, ProjectTaskCounts
+from app.db.models.user import User
+from app.db.repository import UserRepository
+from app.service import user_service, organization_service, project_service, task_service
+
+logger = logging.getLogger(__name__)
+
+# sub-requests accepted in one batch
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+# sub-requests of one batch running at the same time, each extra lane uses its own session
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+# connections the extra lanes of all batches of the process may hold together, a budget
+# of their own next to the request threads' (serve.py takes it out of the worker's pool)
+BATCH_LANE_CONNECTIONS = int(os.getenv("BATCH_LANE_CONNECTIONS", str(max(BATCH_CONCURRENCY - 1, 0))))
+
+if BATCH_CONCURRENCY > 1 and BATCH_LANE_CONNECTIONS <= 0:
+    logger.warning("BATCH_LANE_CONNECTIONS is 0, batch sub-requests run sequentially despite BATCH_CONCURRENCY=%d", BATCH_CONCURRENCY)
+
+_executor = ThreadPoolExecutor(max_workers=max(BATCH_LANE_CONNECTIONS, 1), thread_name_prefix="batch")
+_lane_connections = threading.BoundedSemaphore(max(BATCH_LANE_CONNECTIONS, 1))
+
+# (path pattern, handler) of the read endpoints allowed in a batch
+_ROUTES = []
+
+
+def _route(pattern: str):
+    def register(func):
+        _ROUTES.append((re.compile(f"^{pattern}$"), func))
+        return func
+    return register
+
+
+def _int(query: dict, name: str, default: int) -> int:
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{name} must be an integer"
+        )
+
+
+def _task_counts(query: dict) -> bool:
+    include = query.get("include")
+    if include not in (None, "task_counts"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="include must be task_counts"
+        )
+    return include == "task_counts"
+
+
+# ===== Allowed Sub-requests ===== #
+
+@_route(r"/users/me")
+def _get_me(match, query, current_user, db):
+    return UserAdapter, user_service.getCurrentUserProfile(current_user, db)
+
+
+@_route(r"/users")
+def _get_users(match, query, current_user, db):
+    fields = UserFields.parse(query.get("fields"))
+    if "ids" in query:
+        return UserFields.list_adapter(fields), user_service.getUsersByIds(parse_ids(query["ids"]), current_user, db, fields)
+    return UserFields.list_adapter(fields), user_service.getAllUsersInOrganization(current_user, db, _int(query, "skip", 0), _int(query, "limit", 10), fields)
+
+
+@_route(r"/users/(\d+)")
+def _get_user(match, query, current_user, db):
+    return UserAdapter, user_service.getUserById(int(match.group(1)), current_user, db)
+
+
+@_route(r"/organizations/details")
+def _get_organization(match, query, current_user, db):
+    return None, organization_service.getOrganizationDetailes(current_user, db)
+
+
+@_route(r"/projects")
+def _get_projects(match, query, current_user, db):
+    fields = ProjectFields.parse(query.get("fields"))
+    if _task_counts(query):
+        project_ids = parse_ids(query["ids"]) if "ids" in query else None
+        return ProjectFields.list_adapter(fields, ProjectTaskCounts), project_service.getProjectsWithTaskCounts(
+            current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), project_ids=project_ids, fields=fields
+        )
+    if "ids" in query:
+        return ProjectFields.list_adapter(fields), project_service.getProjectsByIds(parse_ids(query["ids"]), current_user, db, fields)
+    return ProjectFields.list_adapter(fields), project_service.getAllProjects(current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), fields)
+
+
+@_route(r"/projects/archived/list")
+def _get_archived_projects(match, query, current_user, db):
+    fields = ProjectFields.parse(query.get("fields"))
+    if _task_counts(query):
+        return ProjectFields.list_adapter(fields, ProjectTaskCounts), project_service.getProjectsWithTaskCounts(
+            current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), is_archived=True, fields=fields
+        )
+    return ProjectFields.list_adapter(fields), project_service.getArchivedProjects(current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), fields)
+
+
+@_route(r"/projects/deadlines/digest")
+def _get_deadline_digest(match, query, current_user, db):
+    return DeadlineDigestAdapter, project_service.getDeadlineDigest(current_user, db)
+
+
+@_route(r"/projects/(\d+)")
+def _get_project(match, query, current_user, db):
+    return ProjectAdapter, project_service.getProjectById(int(match.group(1)), current_user, db)
+
+
+@_route(r"/tasks")
+def _get_tasks(match, query, current_user, db):
+    fields = TaskFields.parse(query.get("fields"))
+    if "ids" in query:
+        return TaskFields.list_adapter(fields), task_service.getTasksByIds(parse_ids(query["ids"]), current_user, db, fields)
+    return TaskFields.list_adapter(fields), task_service.getAllTasksByOrg(current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), fields)
+
+
+@_route(r"/tasks/mine")
+def _get_my_tasks(match, query, current_user, db):
+    fields = TaskFields.parse(query.get("fields"))
+    return TaskFields.list_adapter(fields), task_service.getMyTasks(current_user, db, query.get("status_filter"), _int(query, "skip", 0), min(_int(query, "limit", 100), 100), fields)
+
+
+@_route(r"/tasks/statistics/workload")
+def _get_workload(match, query, current_user, db):
+    return None, task_service.getWorkload(current_user, db)
+
+
+@_route(r"/tasks/statistics/overview")
+def _get_task_statistics(match, query, current_user, db):
+    return None, task_service.getTaskStatistics(current_user, db)
+
+
+@_route(r"/tasks/filter/status")
+def _get_tasks_by_status(match, query, current_user, db):
+    fields = TaskFields.parse(query.get("fields"))
+    return TaskFields.list_adapter(fields), task_service.getTasksByStatus(query.get("status_filter", ""), current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), fields)
+
+
+@_route(r"/tasks/project/(\d+)")
+def _get_project_tasks(match, query, current_user, db):
+    fields = TaskFields.parse(query.get("fields"))
+    return TaskFields.list_adapter(fields), task_service.getAllTasksByProject(int(match.group(1)), current_user, db, _int(query, "skip", 0), min(_int(query, "limit", 100), 100), fields)
+
+
+@_route(r"/tasks/(\d+)")
+def _get_task(match, query, current_user, db):
+    return TaskAdapter, task_service.getTaskById(int(match.group(1)), current_user, db)
+
+
+# ===== Batch Execution ===== #
+
+
+def _run(item, current_user: User, db: Session) -> dict:
+    """Run one sub-request, errors become its status instead of failing the batch"""
+    url = urlsplit(item.path)
+    path = url.path.rstrip("/") or "/"
+    query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+    for pattern, handler in _ROUTES:
+        match = pattern.match(path)
+        if match is None:
+            continue
+        try:
+            adapter, result = handler(match, query, current_user, db)
+        except HTTPException as exc:
+            return {"id": item.id, "status": exc.status_code, "body": {"detail": exc.detail}}
+        if adapter is not None:
+            # serialize while the lane's session is still open
+            result = adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+        return {"id": item.id, "status": status.HTTP_200_OK, "body": result}
+    return {"id": item.id, "status": status.HTTP_404_NOT_FOUND, "body": {"detail": "Path not available in a batch."}}
+
+
+def _run_lane(items: list, user_id: int, org_id: Optional[int], parent_info: dict) -> list:
+    # a Session is not thread-safe, so concurrent lanes get their own one routed like the request's
+    db = SessionLocal()
+    db.info.update({key: parent_info[key] for key in ("shard", "tenant_read_only", "user_id") if key in parent_info})
+    try:
+        # and their own copy of the user, the request's one belongs to the request's session
+        current_user = UserRepository(db).get_by_id(user_id)
+        if current_user is None or current_user.org_id != org_id:
+            return [(index, {"id": item.id, "status": status.HTTP_401_UNAUTHORIZED, "body": {"detail": "User not found"}}) for index, item in items]
+        return [(index, _run(item, current_user, db)) for index, item in items]
+    finally:
+        db.close()
+        _lane_connections.release()
+
+
+def _lanes(count: int) -> int:
+    """How many lanes a batch gets: the request's one plus the lane connections free right now"""
+    if BATCH_LANE_CONNECTIONS <= 0:
+        return 1
+    lanes = 1
+    while lanes < count and _lane_connections.acquire(blocking=False):
+        lanes += 1
+    return lanes
+
+
+# --------------------------------------------------------------------------------
+def runBatch(batch: BatchRequest, current_user: User, db: Session) -> dict:
+    """Run several read sub-requests under one authentication"""
+    if len(batch.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BATCH_MAX_REQUESTS} requests per batch."
+        )
+    
+    # Spread the sub-requests over lanes, the first lane runs here on the request's session.
+    # The others only run when the pool has a connection to spare for them, else it is one lane
+    lane_count = _lanes(min(BATCH_CONCURRENCY, len(batch.requests)))
+    lanes = [list(enumerate(batch.requests))[lane::lane_count] for lane in range(lane_count)]
+    futures = [_executor.submit(_run_lane, lane, current_user.id, current_user.org_id, dict(db.info)) for lane in lanes[1:]]
+    results = [(index, _run(item, current_user, db)) for index, item in lanes[0]]
+    for future in futures:
+        results += future.result()
+    
+    return {"responses": [response for _, response in sorted(results, key=lambda result: result[0])]}
+# --------------------------------------------------------------------------------
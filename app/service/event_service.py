@@ -0,0 +1,27 @@
+from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import HTTPException, status
+from app.db.models.user import User
+from app.core.events import broker
+
+
+# ===== Live Events ===== #
+
+
+# --------------------------------------------------------------------------------
+def getEventStream(current_user: User, last_event_id: Optional[int], db: Session):
+    """Open the live event stream of user's organization"""
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    org_id = current_user.org_id
+    
+    # The stream can stay open for hours, give the connection back to the pool now
+    db.close()
+    
+    return broker.stream(org_id, last_event_id)
+# --------------------------------------------------------------------------------
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import Session
+from app.db.repository import JobRepository
+from app.db.schema import JobResponse
+from fastapi import HTTPException, status
+from app.db.models.user import User
+
+
+# ===== Job Status ===== #
+
+
+# --------------------------------------------------------------------------------
+def getJob(job_id: int, current_user: User, db: Session) -> JobResponse:
+    """Get the status and progress of a background job"""
+    job_repo = JobRepository(db)
+    
+    job = job_repo.get_by_id(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found."
+        )
+    
+    # Visible to whoever queued it and to the members of its organization
+    owns_job = job.created_by == current_user.id
+    same_org = job.org_id is not None and job.org_id == current_user.org_id
+    if not (owns_job or same_org):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found."
+        )
+    
+    return job
+# --------------------------------------------------------------------------------
@@ -1,9 +1,12 @@
 from sqlalchemy.orm import Session
-from app.db.repository import OrganizationRepository, UserRepository
+from app.db.repository import OrganizationRepository, UserRepository, JobRepository, TaskRepository, ArchivedTaskRepository
 from app.db.schema import OrganizationCreate, OrganizationResponse, OrganizationUpdate
 from fastapi import HTTPException, status
 from app.db.models.organization import Organization
 from app.db.models.user import User
+from app.core.sharding import shard_map, bind_tenant, sharded_tables
+from app.db.soft_delete import deleted_organizations
+from app.core.activity import record_activity
 
 # ===== Organization Setup ===== #
 
@@ -22,6 +25,10 @@ def createOrganization(org_data: OrganizationCreate, current_user: User, db: Ses
     organization = org_repo.create(org_data, owner_id=current_user.id, generate_code=True)
     
     user_repo.assign_to_organization(current_user.id, organization.id, role="owner")
+
+    # Place the new tenant on a shard
+    shard_map.assign(db, organization.id)
+    bind_tenant(db, organization.id)
     
     return organization
 # --------------------------------------------------------------------------------
@@ -46,6 +53,7 @@ def joinOrganization(current_user: User, invite_code: str, db: Session) -> Organ
         )
     
     user_repo.assign_to_organization(current_user.id, org.id, role="member")
+    bind_tenant(db, org.id)
     
     return org
 # --------------------------------------------------------------------------------
@@ -148,6 +156,8 @@ def getOrganizationDetailes(current_user: User, db: Session) -> dict:
         "invite_code": organization.invite_code if current_user.role == "owner" else None,
         "users_count": org_details["users_count"],
         "projects_count": org_details["projects_count"],
+        "active_projects_count": org_details["active_projects_count"],
+        "tasks_count": org_details["tasks_count"],
         "your_role": current_user.role
     }
 # --------------------------------------------------------------------------------
@@ -207,7 +217,9 @@ def updateMemberRole(target_user_id: int, new_role: str, current_user: User, db:
         )
     
     # Update role
+    previous_role = target_user.role
     updated_user = user_repo.assign_to_organization(target_user_id, current_user.org_id, new_role)
+    record_activity(current_user.org_id, current_user.id, "member.role_changed", "user", target_user_id, {"from": previous_role, "to": new_role})
     
     return {
         "user_id": updated_user.id,
@@ -254,7 +266,10 @@ def updateOrganization(org_data: OrganizationUpdate, current_user: User, db: Ses
 
 # --------------------------------------------------------------------------------
 def deleteOrganization(current_user: User, db: Session) -> dict:
-    """Delete organization and remove all members (owner only, dangerous!)"""
+    """Soft-delete organization and remove all members (owner only, dangerous!)
+
+    Projects and tasks are hidden right away and purged by a background job.
+    """
     org_repo = OrganizationRepository(db)
     user_repo = UserRepository(db)
     
@@ -274,25 +289,71 @@ def deleteOrganization(current_user: User, db: Session) -> dict:
     
     org_id = current_user.org_id
     
-    # Get all users in the organization
-    all_users = user_repo.get_all_by_organization(org_id)
+    # Mark the organization deleted, its data disappears from every org-scoped query
+    organization = org_repo.soft_delete(org_id, commit=False)
+    if organization is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Organization not found."
+        )
     
     # Remove all users from organization (set org_id and role to None)
-    for user in all_users:
-        user_repo.assign_to_organization(user.id, None, None)
+    users_affected = user_repo.detach_all_from_organization(org_id, commit=False)
+    
+    # Purge the data outside of the request
+    job = JobRepository(db).enqueue(
+        "purge_organization",
+        {"org_id": org_id},
+        org_id=org_id,
+        created_by=current_user.id,
+        dedupe_key=f"purge_organization:{org_id}",
+        commit=False
+    )
+    
+    # All three or none: no deleted organization keeps its members or misses its purge
+    db.commit()
+    deleted_organizations.invalidate()
+    
+    return {
+        "message": "Organization deleted successfully, its projects and tasks are being purged",
+        "deleted_org_id": org_id,
+        "users_affected": users_affected,
+        "job_id": job.id
+    }
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getPurgeStatus(org_id: int, current_user: User, db: Session) -> dict:
+    """Get the background purge progress of a deleted organization (former owner only)"""
+    org_repo = OrganizationRepository(db)
     
-    # Delete the organization
-    success = org_repo.delete(org_id)
-    if not success:
+    organization = org_repo.get_by_id(org_id)
+    if organization is None or organization.deleted_at is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Organization not found."
+            detail="Deleted organization not found."
         )
     
+    # Only the owner at deletion time can follow the purge
+    if organization.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the organization owner can see the purge status."
+        )
+    
+    remaining_rows = 0
+    if organization.purged_at is None:
+        bind_tenant(db, org_id)
+        remaining_rows = org_repo.count_tenant_rows(sharded_tables(), org_id)
+    
     return {
-        "message": "Organization deleted successfully",
-        "deleted_org_id": org_id,
-        "users_affected": len(all_users)
+        "org_id": org_id,
+        "status": "purged" if organization.purged_at else "purging",
+        "deleted_at": organization.deleted_at,
+        "purged_at": organization.purged_at,
+        "purged_rows": organization.purged_rows,
+        "remaining_rows": remaining_rows
     }
 # --------------------------------------------------------------------------------
 
@@ -315,9 +376,9 @@ def leaveOrganization(current_user: User, db: Session) -> dict:
     
     # Check if user is owner
     if current_user.role == "owner":
-        # Count users in organization
-        all_users = user_repo.get_all_by_organization(current_user.org_id)
-        if len(all_users) > 1:
+        # Maintained member count, no need to load the members
+        organization = org_repo.get_by_id(current_user.org_id)
+        if organization is not None and organization.users_count > 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Owner cannot leave organization while other members exist. Transfer ownership or delete the organization first."
@@ -326,7 +387,9 @@ def leaveOrganization(current_user: User, db: Session) -> dict:
     
     org_id = current_user.org_id
     
-    # Remove user from organization
+    # Remove user from organization, and from the tasks assigned to them
+    TaskRepository(db).unassign_user(current_user.id, org_id)
+    ArchivedTaskRepository(db).unassign_user(current_user.id, org_id)
     user_repo.assign_to_organization(current_user.id, None, None)
     
     return {
@@ -387,6 +450,7 @@ def transferOwnership(new_owner_id: int, current_user: User, db: Session) -> dic
     # Update roles: new owner gets "owner", current owner becomes "member"
     user_repo.assign_to_organization(new_owner_id, current_user.org_id, "owner")
     user_repo.assign_to_organization(current_user.id, current_user.org_id, "member")
+    record_activity(current_user.org_id, current_user.id, "organization.ownership_transferred", "organization", current_user.org_id, {"from": current_user.id, "to": new_owner_id})
     
     return {
         "message": "Ownership transferred successfully",
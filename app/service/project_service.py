@@ -1,9 +1,13 @@
 from sqlalchemy.orm import Session
-from app.db.repository import ProjectRepository
-from app.db.schema import ProjectCreate, ProjectUpdate, ProjectResponse
+from sqlalchemy.orm.exc import StaleDataError
+from app.db.repository import ProjectRepository, DeadlineDigestRepository, ArchivedTaskRepository, JobRepository
+from app.db.schema import ProjectCreate, ProjectUpdate, ProjectResponse, DeadlineDigestResponse
 from fastapi import HTTPException, status
 from app.db.models.project import Project
 from app.db.models.user import User
+from app.core.events import publish, project_event_data
+from app.core.activity import record_activity
+from app.core.database import use_primary
 
 
 # ===== Project CRUD ===== #
@@ -26,6 +30,10 @@ def createProject(project_data: ProjectCreate, current_user: User, db: Session)
     project_dict['org_id'] = current_user.org_id
     project = Project(**project_dict)
     db.add(project)
+    db.flush()
+    
+    # the event is written in the same transaction as the project
+    publish(db, current_user.org_id, "project.created", project_event_data(project))
     db.commit()
     db.refresh(project)
     
@@ -58,7 +66,7 @@ def getProjectById(project_id: int, current_user: User, db: Session) -> ProjectR
 
 
 # --------------------------------------------------------------------------------
-def getAllProjects(current_user: User, db: Session, skip: int = 0, limit: int = 100) -> list[ProjectResponse]:
+def getAllProjects(current_user: User, db: Session, skip: int = 0, limit: int = 100, fields: tuple = None) -> list[ProjectResponse]:
     """Get all projects in user's organization"""
     project_repo = ProjectRepository(db)
     
@@ -70,15 +78,84 @@ def getAllProjects(current_user: User, db: Session, skip: int = 0, limit: int =
         )
     
     # Get all projects in org
-    projects = project_repo.get_all_by_organization(current_user.org_id, skip, limit)
+    projects = project_repo.get_all_by_organization(current_user.org_id, skip, limit, fields)
     
     return projects
 # --------------------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------------------
-def updateProject(project_id: int, project_data: ProjectUpdate, current_user: User, db: Session) -> ProjectResponse:
-    """Update a project (owner/admin only)"""
+def getProjectsByIds(project_ids: list[int], current_user: User, db: Session, fields: tuple = None) -> list[ProjectResponse]:
+    """Get several projects of user's organization in one query"""
+    project_repo = ProjectRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Unknown ids and ids of other organizations are simply left out
+    return project_repo.get_many(project_ids, current_user.org_id, fields)
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getProjectsWithTaskCounts(
+    current_user: User,
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    is_archived: bool = False,
+    project_ids: list[int] = None,
+    fields: tuple = None
+) -> list[dict]:
+    """Projects of user's organization with per-status task counts and an overdue flag"""
+    project_repo = ProjectRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # One aggregated query, the tasks themselves are never loaded
+    rows = project_repo.get_with_task_counts(current_user.org_id, is_archived, skip, limit, project_ids, fields)
+    names = fields or tuple(ProjectResponse.model_fields)
+    
+    return [
+        {
+            **{name: getattr(project, name) for name in names},
+            "task_counts": {"todo": todo, "in_progress": in_progress, "done": done, "blocked": blocked},
+            "overdue": overdue
+        }
+        for project, todo, in_progress, done, blocked, overdue in rows
+    ]
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def _versionConflict(project_repo: ProjectRepository, project_id: int, org_id: int, expected_version: int = None) -> HTTPException:
+    """412 (stale If-Match) or 409 (lost a concurrent write) with the current project"""
+    current = project_repo.get_by_id(project_id, org_id)
+    if current is None:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Project not found.")
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED if expected_version is not None else status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Project was changed by someone else, apply your change to the current version.",
+            "current": ProjectResponse.model_validate(current).model_dump(mode="json")
+        },
+        headers={"ETag": f'"{current.version}"'}
+    )
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def updateProject(project_id: int, project_data: ProjectUpdate, current_user: User, db: Session, expected_version: int = None) -> ProjectResponse:
+    """Update a project (owner/admin only), only if still at expected_version (If-Match) when given"""
     project_repo = ProjectRepository(db)
     
     # Check if user has an organization
@@ -88,6 +165,9 @@ def updateProject(project_id: int, project_data: ProjectUpdate, current_user: Us
             detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Check if user has permission (owner or admin)
     if current_user.role not in ["owner", "admin"]:
         raise HTTPException(
@@ -95,14 +175,24 @@ def updateProject(project_id: int, project_data: ProjectUpdate, current_user: Us
             detail="Only organization owner or admin can update projects."
         )
     
-    # Update project (org-scoped)
-    updated_project = project_repo.update(project_id, current_user.org_id, project_data)
+    # Update project (org-scoped), a conditional UPDATE on its version
+    try:
+        updated_project = project_repo.update(project_id, current_user.org_id, project_data, expected_version, commit=False)
+    except StaleDataError:
+        db.rollback()
+        raise _versionConflict(project_repo, project_id, current_user.org_id, expected_version)
     if updated_project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found."
         )
     
+    publish(db, current_user.org_id, "project.updated", project_event_data(updated_project))
+    db.commit()
+    db.refresh(updated_project)
+    if project_data.is_archived is not None:
+        _moveProjectTasks(project_id, current_user.org_id, db)
+    
     return updated_project
 # --------------------------------------------------------------------------------
 
@@ -119,6 +209,9 @@ def deleteProject(project_id: int, current_user: User, db: Session) -> dict:
             detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Check if user has permission (owner or admin)
     if current_user.role not in ["owner", "admin"]:
         raise HTTPException(
@@ -126,14 +219,18 @@ def deleteProject(project_id: int, current_user: User, db: Session) -> dict:
             detail="Only organization owner or admin can delete projects."
         )
     
-    # Delete project (org-scoped)
-    success = project_repo.delete(project_id, current_user.org_id)
+    # Delete project (org-scoped), with its tasks in cold storage if it was archived
+    ArchivedTaskRepository(db).delete_by_project(project_id, current_user.org_id, commit=False)
+    success = project_repo.delete(project_id, current_user.org_id, commit=False)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found."
         )
     
+    publish(db, current_user.org_id, "project.deleted", {"id": project_id})
+    db.commit()
+    
     return {
         "message": "Project deleted successfully",
         "project_id": project_id
@@ -144,6 +241,22 @@ def deleteProject(project_id: int, current_user: User, db: Session) -> dict:
 # ===== Project Management ===== #
 
 
+# --------------------------------------------------------------------------------
+def _moveProjectTasks(project_id: int, org_id: int, db: Session):
+    """Queue the move of a project's tasks to (archived) or from (active) cold storage.
+
+    One job per project, it follows the project's current state batch by
+    batch, so archiving and unarchiving again quickly only reverses it.
+    """
+    JobRepository(db).enqueue(
+        "move_project_tasks",
+        {"project_id": project_id},
+        org_id=org_id,
+        dedupe_key=f"move_project_tasks:{project_id}"
+    )
+# --------------------------------------------------------------------------------
+
+
 # --------------------------------------------------------------------------------
 def archiveProject(project_id: int, current_user: User, db: Session) -> ProjectResponse:
     """Archive a project (owner/admin only)"""
@@ -156,6 +269,9 @@ def archiveProject(project_id: int, current_user: User, db: Session) -> ProjectR
             detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Check if user has permission
     if current_user.role not in ["owner", "admin"]:
         raise HTTPException(
@@ -164,13 +280,19 @@ def archiveProject(project_id: int, current_user: User, db: Session) -> ProjectR
         )
     
     # Archive project
-    archived_project = project_repo.archive(project_id, current_user.org_id)
+    archived_project = project_repo.archive(project_id, current_user.org_id, commit=False)
     if archived_project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found."
         )
     
+    publish(db, current_user.org_id, "project.archived", project_event_data(archived_project))
+    db.commit()
+    db.refresh(archived_project)
+    _moveProjectTasks(project_id, current_user.org_id, db)
+    record_activity(current_user.org_id, current_user.id, "project.archived", "project", project_id)
+    
     return archived_project
 # --------------------------------------------------------------------------------
 
@@ -187,6 +309,9 @@ def unarchiveProject(project_id: int, current_user: User, db: Session) -> Projec
             detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Check if user has permission
     if current_user.role not in ["owner", "admin"]:
         raise HTTPException(
@@ -195,19 +320,25 @@ def unarchiveProject(project_id: int, current_user: User, db: Session) -> Projec
         )
     
     # Unarchive project
-    unarchived_project = project_repo.unarchive(project_id, current_user.org_id)
+    unarchived_project = project_repo.unarchive(project_id, current_user.org_id, commit=False)
     if unarchived_project is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found."
         )
     
+    publish(db, current_user.org_id, "project.unarchived", project_event_data(unarchived_project))
+    db.commit()
+    db.refresh(unarchived_project)
+    _moveProjectTasks(project_id, current_user.org_id, db)
+    record_activity(current_user.org_id, current_user.id, "project.unarchived", "project", project_id)
+    
     return unarchived_project
 # --------------------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------------------
-def getArchivedProjects(current_user: User, db: Session, skip: int = 0, limit: int = 100) -> list[ProjectResponse]:
+def getArchivedProjects(current_user: User, db: Session, skip: int = 0, limit: int = 100, fields: tuple = None) -> list[ProjectResponse]:
     """Get all archived projects in user's organization"""
     project_repo = ProjectRepository(db)
     
@@ -219,7 +350,31 @@ def getArchivedProjects(current_user: User, db: Session, skip: int = 0, limit: i
         )
     
     # Get archived projects
-    projects = project_repo.get_by_status(current_user.org_id, is_archived=True, skip=skip, limit=limit)
+    projects = project_repo.get_by_status(current_user.org_id, is_archived=True, skip=skip, limit=limit, fields=fields)
     
     return projects
 # --------------------------------------------------------------------------------
+
+
+# ===== Deadlines ===== #
+
+
+# --------------------------------------------------------------------------------
+def getDeadlineDigest(current_user: User, db: Session) -> DeadlineDigestResponse:
+    """Overdue and soon-due projects of user's organization, as of the last deadline scan"""
+    digest_repo = DeadlineDigestRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Precomputed by the scan_deadlines job, nothing is scanned here
+    digest = digest_repo.get_by_org(current_user.org_id)
+    if digest is None:
+        return DeadlineDigestResponse()
+    
+    return digest
+# --------------------------------------------------------------------------------
@@ -0,0 +1,91 @@
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from app.db.repository import TaskRepository, ProjectRepository, UserRepository, TombstoneRepository
+from app.db.models.user import User
+from app.core.database import use_primary
+from app.core.sharding import shard_map
+
+
+# ===== Delta Sync ===== #
+
+
+def _parse_position(part: str) -> Tuple[int, int]:
+    change_txid, change_seq = (int(value) for value in part.split("-"))
+    return change_txid, change_seq
+
+
+def _parse_cursor(cursor: Optional[str]) -> Tuple[Optional[int], Tuple[int, int], Tuple[int, int]]:
+    """Cursor is "<shard>-<txid>-<seq>.<txid>-<seq>": tenant then users position, the two live on different databases.
+
+    A position is the (change_txid, change_seq) of the last row sent. Transaction
+    ids only compare within one database, so the tenant part also names its shard.
+    """
+    if not cursor or all(part.isdigit() for part in cursor.split(".")) and cursor.count(".") == 1:
+        # first sync, or a change_seq cursor from before positions followed transactions
+        return None, (0, 0), (0, 0)
+    try:
+        tenant, users = cursor.split(".")
+        shard, tenant = tenant.split("-", 1)
+        return int(shard), _parse_position(tenant), _parse_position(users)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor."
+        )
+
+
+# --------------------------------------------------------------------------------
+def getChanges(current_user: User, since: Optional[str], limit: int, db: Session) -> dict:
+    """Get projects, tasks, members and deletions changed after a cursor"""
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    org_id = current_user.org_id
+    cursor_shard, tenant_position, users_position = _parse_cursor(since)
+    shard, _ = shard_map.lookup(org_id)
+    if cursor_shard != shard:
+        # the organization moved shards since (or a first sync): resend its data
+        tenant_position = (0, 0)
+    
+    # change_seq is drawn before commit, so a lower one can become visible after a
+    # higher one was sent. Only rows of transactions that have ended (below the
+    # horizon) are returned, in (change_txid, change_seq) order; the horizon is
+    # read first and everything from the primary, where all of them are visible
+    use_primary(db)
+    tenant_horizon = TaskRepository(db).get_sync_horizon()
+    users_horizon = UserRepository(db).get_sync_horizon()
+    
+    # Tasks, projects and tombstones share the shard: read limit + 1 of each,
+    # merge them in position order and keep the first `limit`
+    changed = [("projects", row) for row in ProjectRepository(db).get_changed_since(org_id, tenant_position, tenant_horizon, limit + 1)]
+    changed += [("tasks", row) for row in TaskRepository(db).get_changed_since(org_id, tenant_position, tenant_horizon, limit + 1)]
+    changed += [("deleted", row) for row in TombstoneRepository(db).get_changed_since(org_id, tenant_position, tenant_horizon, limit + 1)]
+    changed.sort(key=lambda item: (item[1].change_txid, item[1].change_seq))
+    has_more = len(changed) > limit
+    changed = changed[:limit]
+    if changed:
+        tenant_position = (changed[-1][1].change_txid, changed[-1][1].change_seq)
+    
+    # Members live in the directory with its own sequence and transactions
+    users = UserRepository(db).get_changed_since(org_id, users_position, users_horizon, limit + 1)
+    has_more = has_more or len(users) > limit
+    users = users[:limit]
+    if users:
+        users_position = (users[-1].change_txid, users[-1].change_seq)
+    
+    result = {"projects": [], "tasks": [], "deleted": []}
+    for kind, row in changed:
+        result[kind].append(row)
+    
+    return {
+        "cursor": f"{shard}-{tenant_position[0]}-{tenant_position[1]}.{users_position[0]}-{users_position[1]}",
+        "has_more": has_more,
+        "users": users,
+        **result
+    }
+# --------------------------------------------------------------------------------
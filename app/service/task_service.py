@@ -1,14 +1,31 @@
 from sqlalchemy.orm import Session
-from app.db.repository import TaskRepository, ProjectRepository
-from app.db.schema import TaskCreate, TaskUpdate, TaskResponse
+from sqlalchemy.orm.exc import StaleDataError
+from app.db.repository import TaskRepository, ProjectRepository, OrganizationRepository, JobRepository, UserRepository, ArchivedTaskRepository
+from app.db.schema import TaskCreate, TaskUpdate, TaskResponse, TaskMove, TaskBulkStatusUpdate, TaskBulkStatusResult, AssigneeWorkload
 from fastapi import HTTPException, status
-from app.db.models.task import Task
+from app.db.models.task import Task, TASK_STATUSES
 from app.db.models.user import User
+from app.core.events import publish, task_event_data
+from app.core.ranking import rank_between, RANK_REBALANCE_LENGTH
+from app.core.activity import record_activity
+from app.core.database import use_primary
 
 
 # ===== Task CRUD ===== #
 
 
+# --------------------------------------------------------------------------------
+def _taskNotFound(task_id: int, org_id: int, db: Session) -> HTTPException:
+    """404, or 409 for a task of an archived project (read-only in cold storage until unarchived)"""
+    if ArchivedTaskRepository(db).get_by_id(task_id, org_id) is not None:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Task belongs to an archived project, unarchive the project to change it."
+        )
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found.")
+# --------------------------------------------------------------------------------
+
+
 # --------------------------------------------------------------------------------
 def createTask(task_data: TaskCreate, current_user: User, db: Session) -> TaskResponse:
     """Create a new task in a project"""
@@ -22,6 +39,9 @@ def createTask(task_data: TaskCreate, current_user: User, db: Session) -> TaskRe
             detail="You must belong to an organization to create tasks."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Verify project exists and belongs to user's org
     project = project_repo.get_by_id(task_data.project_id, current_user.org_id)
     if project is None:
@@ -29,12 +49,23 @@ def createTask(task_data: TaskCreate, current_user: User, db: Session) -> TaskRe
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found or doesn't belong to your organization."
         )
+    if project.is_archived:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Project is archived, unarchive it to add tasks."
+        )
     
     # Create task with user's org_id
     task_dict = task_data.model_dump()
     task_dict['org_id'] = current_user.org_id
+    # new cards go to the bottom of their column
+    task_dict['rank'] = rank_between(task_repo.last_rank(task_data.project_id, current_user.org_id, task_data.status), None)
     task = Task(**task_dict)
     db.add(task)
+    db.flush()
+    
+    # the event is written in the same transaction as the task
+    publish(db, current_user.org_id, "task.created", task_event_data(task))
     db.commit()
     db.refresh(task)
     
@@ -54,8 +85,10 @@ def getTaskById(task_id: int, current_user: User, db: Session) -> TaskResponse:
             detail="You must belong to an organization."
         )
     
-    # Get task (org-scoped)
+    # Get task (org-scoped), from cold storage when its project is archived
     task = task_repo.get_by_id(task_id, current_user.org_id)
+    if task is None:
+        task = ArchivedTaskRepository(db).get_by_id(task_id, current_user.org_id)
     if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -67,7 +100,7 @@ def getTaskById(task_id: int, current_user: User, db: Session) -> TaskResponse:
 
 
 # --------------------------------------------------------------------------------
-def getAllTasksByProject(project_id: int, current_user: User, db: Session, skip: int = 0, limit: int = 100) -> list[TaskResponse]:
+def getAllTasksByProject(project_id: int, current_user: User, db: Session, skip: int = 0, limit: int = 100, fields: tuple = None) -> list[TaskResponse]:
     """Get all tasks for a specific project"""
     task_repo = TaskRepository(db)
     project_repo = ProjectRepository(db)
@@ -87,15 +120,19 @@ def getAllTasksByProject(project_id: int, current_user: User, db: Session, skip:
             detail="Project not found or doesn't belong to your organization."
         )
     
-    # Get tasks for project
-    tasks = task_repo.get_all_by_project(project_id, current_user.org_id, skip, limit)
+    # Get tasks for project; those of archived projects are in cold storage (all or,
+    # while the move job runs, some of them)
+    archive_repo = ArchivedTaskRepository(db)
+    if project.is_archived or archive_repo.has_project(project_id, current_user.org_id):
+        return archive_repo.get_board(project_id, current_user.org_id, skip, limit, fields)
+    tasks = task_repo.get_all_by_project(project_id, current_user.org_id, skip, limit, fields)
     
     return tasks
 # --------------------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------------------
-def getAllTasksByOrg(current_user: User, db: Session, skip: int = 0, limit: int = 100) -> list[TaskResponse]:
+def getAllTasksByOrg(current_user: User, db: Session, skip: int = 0, limit: int = 100, fields: tuple = None) -> list[TaskResponse]:
     """Get all tasks in user's organization"""
     task_repo = TaskRepository(db)
     
@@ -107,15 +144,15 @@ def getAllTasksByOrg(current_user: User, db: Session, skip: int = 0, limit: int
         )
     
     # Get all tasks in org
-    tasks = task_repo.get_all_by_organization(current_user.org_id, skip, limit)
+    tasks = task_repo.get_all_by_organization(current_user.org_id, skip, limit, fields)
     
     return tasks
 # --------------------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------------------
-def updateTask(task_id: int, task_data: TaskUpdate, current_user: User, db: Session) -> TaskResponse:
-    """Update a task"""
+def getTasksByIds(task_ids: list[int], current_user: User, db: Session, fields: tuple = None) -> list[TaskResponse]:
+    """Get several tasks of user's organization in one query"""
     task_repo = TaskRepository(db)
     
     # Check if user has an organization
@@ -125,14 +162,70 @@ def updateTask(task_id: int, task_data: TaskUpdate, current_user: User, db: Sess
             detail="You must belong to an organization."
         )
     
-    # Update task (org-scoped)
-    updated_task = task_repo.update(task_id, current_user.org_id, task_data)
-    if updated_task is None:
+    # Unknown ids and ids of other organizations are simply left out
+    tasks = task_repo.get_many(task_ids, current_user.org_id, fields)
+    if len(tasks) < len(task_ids):
+        # the others may be tasks of archived projects
+        found = {task.id for task in tasks}
+        archived = ArchivedTaskRepository(db).get_many([task_id for task_id in task_ids if task_id not in found], current_user.org_id)
+        tasks = sorted(tasks + archived, key=lambda task: task.id)
+    return tasks
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def _versionConflict(task_repo: TaskRepository, task_id: int, org_id: int, expected_version: int = None) -> HTTPException:
+    """412 when If-Match named an older version, 409 when a concurrent write won; both carry the current task"""
+    current = task_repo.get_by_id(task_id, org_id)
+    if current is None:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found.")
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED if expected_version is not None else status.HTTP_409_CONFLICT,
+        detail={
+            "message": "Task was changed by someone else, apply your change to the current version.",
+            "current": TaskResponse.model_validate(current).model_dump(mode="json")
+        },
+        headers={"ETag": f'"{current.version}"'}
+    )
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def updateTask(task_id: int, task_data: TaskUpdate, current_user: User, db: Session, expected_version: int = None) -> TaskResponse:
+    """Update a task, only if it is still at expected_version (If-Match) when given"""
+    task_repo = TaskRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
+    # The status before the change, a status change is logged whichever endpoint makes it
+    previous_status = None
+    if "status" in task_data.model_fields_set:
+        current = task_repo.get_by_id(task_id, current_user.org_id)
+        previous_status = current.status if current is not None else None
+    
+    # Update task (org-scoped), a conditional UPDATE on its version
+    try:
+        updated_task = task_repo.update(task_id, current_user.org_id, task_data, expected_version, commit=False)
+    except StaleDataError:
+        db.rollback()
+        raise _versionConflict(task_repo, task_id, current_user.org_id, expected_version)
+    if updated_task is None:
+        raise _taskNotFound(task_id, current_user.org_id, db)
+    
+    publish(db, current_user.org_id, "task.updated", task_event_data(updated_task))
+    db.commit()
+    db.refresh(updated_task)
+    if "status" in task_data.model_fields_set and updated_task.status != previous_status:
+        record_activity(current_user.org_id, current_user.id, "task.status_changed", "task", task_id, {"from": previous_status, "to": updated_task.status})
+    
     return updated_task
 # --------------------------------------------------------------------------------
 
@@ -149,13 +242,16 @@ def deleteTask(task_id: int, current_user: User, db: Session) -> dict:
             detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Delete task (org-scoped)
-    success = task_repo.delete(task_id, current_user.org_id)
+    success = task_repo.delete(task_id, current_user.org_id, commit=False)
     if not success:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found."
-        )
+        raise _taskNotFound(task_id, current_user.org_id, db)
+    
+    publish(db, current_user.org_id, "task.deleted", {"id": task_id})
+    db.commit()
     
     return {
         "message": "Task deleted successfully",
@@ -179,6 +275,9 @@ def updateTaskStatus(task_id: int, new_status: str, current_user: User, db: Sess
             detail="You must belong to an organization."
         )
     
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
     # Validate status
     valid_statuses = ["todo", "in_progress", "done", "blocked"]
     if new_status not in valid_statuses:
@@ -187,20 +286,196 @@ def updateTaskStatus(task_id: int, new_status: str, current_user: User, db: Sess
             detail=f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
         )
     
+    task = task_repo.get_by_id(task_id, current_user.org_id)
+    if task is None:
+        raise _taskNotFound(task_id, current_user.org_id, db)
+    previous_status = task.status
+    
     # Update status
-    updated_task = task_repo.update_status(task_id, current_user.org_id, new_status)
-    if updated_task is None:
+    updated_task = task_repo.update_status(task_id, current_user.org_id, new_status, commit=False)
+    
+    publish(db, current_user.org_id, "task.status_changed", task_event_data(updated_task))
+    db.commit()
+    db.refresh(updated_task)
+    if new_status != previous_status:
+        record_activity(current_user.org_id, current_user.id, "task.status_changed", "task", task_id, {"from": previous_status, "to": new_status})
+    
+    return updated_task
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def _moveRanks(task_repo: TaskRepository, task: Task, target_status: str, move: TaskMove) -> tuple:
+    """Ranks of the cards the moved task lands between (None = column edge).
+
+    Raises LookupError when a neighbour has no rank yet or shares its rank
+    with the next card, the column then needs a rebalance first.
+    """
+    anchors = {}
+    for name in ("after_id", "before_id"):
+        anchor_id = getattr(move, name)
+        if anchor_id is None:
+            continue
+        anchor = task_repo.get_by_id(anchor_id, task.org_id)
+        if anchor is None or anchor.id == task.id or anchor.project_id != task.project_id or anchor.status != target_status:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{name} must be another task of the target column."
+            )
+        if anchor.rank is None:
+            raise LookupError(anchor.id)
+        anchors[name] = anchor.rank
+
+    after_rank, before_rank = anchors.get("after_id"), anchors.get("before_id")
+    if "after_id" in anchors and "before_id" not in anchors:
+        before_rank = task_repo.rank_after(task.project_id, task.org_id, target_status, after_rank, task.id)
+    elif "before_id" in anchors and "after_id" not in anchors:
+        after_rank = task_repo.rank_before(task.project_id, task.org_id, target_status, before_rank, task.id)
+    elif not anchors:
+        after_rank = task_repo.last_rank(task.project_id, task.org_id, target_status, exclude_id=task.id)
+
+    if after_rank is not None and before_rank is not None and after_rank >= before_rank:
+        if move.after_id is not None and move.before_id is not None and after_rank > before_rank:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="after_id must be above before_id."
+            )
+        raise LookupError(task.id)
+    return after_rank, before_rank
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def moveTask(task_id: int, move: TaskMove, current_user: User, db: Session) -> TaskResponse:
+    """Move a card within its column or to another one (drag and drop on the board)"""
+    task_repo = TaskRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
+    task = task_repo.get_by_id(task_id, current_user.org_id)
+    if task is None:
+        raise _taskNotFound(task_id, current_user.org_id, db)
+    
+    target_status = move.status if move.status is not None else task.status
+    if target_status not in TASK_STATUSES and target_status != task.status:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid status. Must be one of: {', '.join(TASK_STATUSES)}"
+        )
+    
+    # Only the moved row is written; siblings keep their ranks
+    try:
+        after_rank, before_rank = _moveRanks(task_repo, task, target_status, move)
+    except LookupError:
+        # unranked cards (created before ranks existed) or a tie left by concurrent
+        # moves: respace the column once inside this transaction and retry
+        task_repo.rebalance_column(task.project_id, current_user.org_id, target_status, commit=False)
+        after_rank, before_rank = _moveRanks(task_repo, task, target_status, move)
+    
+    previous_status = task.status
+    task = task_repo.move(task, target_status, rank_between(after_rank, before_rank), commit=False)
+    status_changed = target_status != previous_status
+    publish(db, current_user.org_id, "task.status_changed" if status_changed else "task.moved", task_event_data(task))
+    db.commit()
+    db.refresh(task)
+    
+    # Keys grow when cards keep landing in the same gap, respace that column later
+    if len(task.rank) > RANK_REBALANCE_LENGTH:
+        JobRepository(db).enqueue(
+            "rebalance_ranks",
+            {"project_id": task.project_id, "status": task.status},
+            org_id=current_user.org_id,
+            dedupe_key=f"rebalance_ranks:{task.project_id}:{task.status}"
+        )
+    
+    if status_changed:
+        record_activity(current_user.org_id, current_user.id, "task.status_changed", "task", task_id, {"from": previous_status, "to": target_status})
+    
+    return task
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def bulkUpdateTaskStatus(data: TaskBulkStatusUpdate, current_user: User, db: Session) -> TaskBulkStatusResult:
+    """Move all tasks of a project in one status (or the listed ones) to another, e.g. closing a sprint"""
+    task_repo = TaskRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
+    # Validate statuses, the same ones updateTaskStatus accepts
+    for value in (data.from_status, data.to_status):
+        if value not in TASK_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid status. Must be one of: {', '.join(TASK_STATUSES)}"
+            )
+    if data.from_status == data.to_status:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_status and to_status must differ."
+        )
+    
+    if ProjectRepository(db).get_by_id(data.project_id, current_user.org_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found."
+            detail="Project not found or doesn't belong to your organization."
         )
     
-    return updated_task
+    # One set-based UPDATE, however many tasks match
+    moved_ids = task_repo.transition_status(data.project_id, current_user.org_id, data.from_status, data.to_status, data.task_ids, commit=False)
+    
+    if moved_ids:
+        # one event for the whole transition instead of one per task
+        publish(db, current_user.org_id, "task.bulk_status_changed", {
+            "project_id": data.project_id,
+            "from": data.from_status,
+            "to": data.to_status,
+            "ids": moved_ids
+        })
+    db.commit()
+    
+    if moved_ids:
+        # the moved cards are unranked, rank them at the bottom of their new column
+        JobRepository(db).enqueue(
+            "rebalance_ranks",
+            {"project_id": data.project_id, "status": data.to_status},
+            org_id=current_user.org_id,
+            dedupe_key=f"rebalance_ranks:{data.project_id}:{data.to_status}"
+        )
+        record_activity(current_user.org_id, current_user.id, "task.bulk_status_changed", "project", data.project_id, {
+            "from": data.from_status,
+            "to": data.to_status,
+            "count": len(moved_ids)
+        })
+    
+    return TaskBulkStatusResult(
+        project_id=data.project_id,
+        from_status=data.from_status,
+        to_status=data.to_status,
+        updated=len(moved_ids),
+        task_ids=moved_ids
+    )
 # --------------------------------------------------------------------------------
 
 
 # --------------------------------------------------------------------------------
-def getTasksByStatus(status_filter: str, current_user: User, db: Session, skip: int = 0, limit: int = 100) -> list[TaskResponse]:
+def getTasksByStatus(status_filter: str, current_user: User, db: Session, skip: int = 0, limit: int = 100, fields: tuple = None) -> list[TaskResponse]:
     """Get tasks filtered by status"""
     task_repo = TaskRepository(db)
     
@@ -212,7 +487,7 @@ def getTasksByStatus(status_filter: str, current_user: User, db: Session, skip:
         )
     
     # Get tasks by status
-    tasks = task_repo.get_by_status(current_user.org_id, status_filter, skip, limit)
+    tasks = task_repo.get_by_status(current_user.org_id, status_filter, skip, limit, fields)
     
     return tasks
 # --------------------------------------------------------------------------------
@@ -230,17 +505,124 @@ def getTaskStatistics(current_user: User, db: Session) -> dict:
             detail="You must belong to an organization."
         )
     
-    # Count tasks by status
-    statuses = ["todo", "in_progress", "done", "blocked"]
-    statistics = {}
-    
-    for status_item in statuses:
-        count = task_repo.count_by_status(current_user.org_id, status_item)
-        statistics[status_item] = count
+    # Count tasks by status in one aggregate, tasks of archived projects in their own bucket
+    counts = task_repo.count_by_status(current_user.org_id)
+    statistics = {status_item: getattr(counts, status_item) for status_item in (*TASK_STATUSES, "other")}
+    statistics["archived"] = ArchivedTaskRepository(db).count_by_org(current_user.org_id)
     
-    # Total tasks
-    all_tasks = task_repo.get_all_by_organization(current_user.org_id)
-    statistics["total"] = len(all_tasks)
+    # Total from the same rows, so the buckets add up to it
+    statistics["total"] = counts.total + statistics["archived"]
     
     return statistics
 # --------------------------------------------------------------------------------
+
+
+# ===== Task Assignment ===== #
+
+
+# --------------------------------------------------------------------------------
+def assignTask(task_id: int, user_id: int, current_user: User, db: Session) -> TaskResponse:
+    """Assign a task to a member of the organization"""
+    task_repo = TaskRepository(db)
+    user_repo = UserRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
+    task = task_repo.get_by_id(task_id, current_user.org_id)
+    if task is None:
+        raise _taskNotFound(task_id, current_user.org_id, db)
+    
+    # Only members of the same organization can be assigned
+    if not user_repo.check_user_in_organization(user_id, current_user.org_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found in your organization."
+        )
+    
+    task = task_repo.assign(task, user_id, commit=False)
+    
+    publish(db, current_user.org_id, "task.assigned", task_event_data(task))
+    db.commit()
+    db.refresh(task)
+    record_activity(current_user.org_id, current_user.id, "task.assigned", "task", task_id, {"assignee_id": user_id})
+    
+    return task
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def unassignTask(task_id: int, current_user: User, db: Session) -> TaskResponse:
+    """Remove the assignee of a task"""
+    task_repo = TaskRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    # Read what is about to be written from the primary, a replica may lag behind it
+    use_primary(db)
+    
+    task = task_repo.get_by_id(task_id, current_user.org_id)
+    if task is None:
+        raise _taskNotFound(task_id, current_user.org_id, db)
+    
+    previous_assignee_id = task.assignee_id
+    task = task_repo.assign(task, None, commit=False)
+    
+    publish(db, current_user.org_id, "task.unassigned", task_event_data(task))
+    db.commit()
+    db.refresh(task)
+    record_activity(current_user.org_id, current_user.id, "task.unassigned", "task", task_id, {"assignee_id": previous_assignee_id})
+    
+    return task
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getMyTasks(current_user: User, db: Session, status_filter: str = None, skip: int = 0, limit: int = 100, fields: tuple = None) -> list[TaskResponse]:
+    """Get the tasks assigned to the current user"""
+    task_repo = TaskRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    return task_repo.get_by_assignee(current_user.org_id, current_user.id, status_filter, skip, limit, fields)
+# --------------------------------------------------------------------------------
+
+
+# --------------------------------------------------------------------------------
+def getWorkload(current_user: User, db: Session) -> list[AssigneeWorkload]:
+    """Get task counts per assignee and status for user's organization"""
+    task_repo = TaskRepository(db)
+    
+    # Check if user has an organization
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You must belong to an organization."
+        )
+    
+    return [
+        {
+            "assignee_id": row.assignee_id,
+            "task_counts": {status_item: getattr(row, status_item) for status_item in TASK_STATUSES},
+            "total": row.total
+        }
+        for row in task_repo.count_by_assignee(current_user.org_id)
+    ]
+# --------------------------------------------------------------------------------
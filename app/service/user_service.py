@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from app.db.repository import UserRepository
+from app.db.repository import UserRepository, TaskRepository, ArchivedTaskRepository
 from app.db.schema import UserCreate, UserUpdate, UserResponse, UserLogin
 from app.core.security import hash_password, verify_password, create_access_token
 from fastapi import HTTPException, status
@@ -117,19 +117,35 @@ def getCurrentUserProfile(current_user: User, db: Session):
 
 # --------------------------------------------------------------------------------
 # Get all users in current user's organization with pagination
-def getAllUsersInOrganization(current_user: User, db: Session, skip: int = 0, limit: int = 10):
+def getAllUsersInOrganization(current_user: User, db: Session, skip: int = 0, limit: int = 10, fields: tuple = None):
     user_repo = UserRepository(db)
     
     # Get all users from the same organization
     users = user_repo.get_all_by_organization(
         org_id=current_user.org_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        fields=fields
     )
     
     return users
 # --------------------------------------------------------------------------------
 
+# --------------------------------------------------------------------------------
+# Get several users of current user's organization in one query
+def getUsersByIds(user_ids: list[int], current_user: User, db: Session, fields: tuple = None):
+    user_repo = UserRepository(db)
+    
+    if current_user.org_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="You don't belong to any organization"
+        )
+    
+    # Unknown ids and users of other organizations are simply left out
+    return user_repo.get_many_in_organization(user_ids, current_user.org_id, fields)
+# --------------------------------------------------------------------------------
+
 
 # ==== Update Functions ==== #
 
@@ -238,5 +254,9 @@ def deleteUser(target_user_id: int, current_user: User, db: Session):
             detail="Cannot delete organization owner"
         )
     
+    # the assignee column has no foreign key on tenant shards, clear it here
+    TaskRepository(db).unassign_user(target_user_id, current_user.org_id)
+    ArchivedTaskRepository(db).unassign_user(target_user_id, current_user.org_id)
+    
     return user_repo.delete(target_user_id)
 #---------------------------------------------------------------------------------
@@ -0,0 +1,122 @@
+"""Daily task rollups behind the trend endpoints.
+
+The worker runs roll_up() as the periodic "roll_up_daily_tasks" job. Each
+shard has a watermark, the start of its last run. A run only rebuilds the
+days from the watermark to today, moved back by ROLLUP_OVERLAP_SECONDS for
+transactions that were still open at the watermark. Rebuilding is idempotent,
+so the overlap costs nothing but time. A shard's first run seeds the history
+with the tasks older than it (app/utils/seed_status_history.py), then
+rebuilds all of it; on a large existing history, backfill it first, in
+parallel chunks of days (a backfill seeds first too):
+
+    python -m app.utils.daily_rollups                  # one incremental run
+    python -m app.utils.daily_rollups --backfill [--since 2025-01-01] [--until 2025-12-31] [--workers 4] [--chunk-days 30]
+
+Run the backfill while the job is not running, or the two may write the
+same day and one of them fails (the job is retried).
+"""
+import argparse
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from app.core.database import engine, shards
+from app.db.repository import DailyTaskRollupRepository, RollupWatermarkRepository, TaskStatusHistoryRepository
+from app.utils.seed_status_history import seed_shard
+
+# how far behind its watermark a run starts, longer than any transaction writing history
+ROLLUP_OVERLAP_SECONDS = float(os.getenv("ROLLUP_OVERLAP_SECONDS", "300"))
+
+
+def _utc(value: datetime) -> datetime:
+    # a database without time zones hands back naive UTC values
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def roll_up_shard(db: Session, directory: Session, shard: int, now: datetime) -> dict:
+    """Rebuild the days of one shard changed since its last run, returns what was done"""
+    watermarks = RollupWatermarkRepository(directory)
+    watermark = watermarks.get(shard)
+    if watermark is None:
+        # without their seeded rows, tasks older than the history would drive the open count negative
+        history_repo = TaskStatusHistoryRepository(db)
+        history_repo.seed()
+        first_day = history_repo.first_day()
+    else:
+        first_day = (_utc(watermark) - timedelta(seconds=ROLLUP_OVERLAP_SECONDS)).astimezone(timezone.utc).date()
+
+    rows = 0
+    if first_day is not None:
+        rows = DailyTaskRollupRepository(db).rebuild(first_day)
+        db.commit()
+    watermarks.set(shard, now)
+    return {"days": (now.date() - first_day).days + 1 if first_day else 0, "rows": rows}
+
+
+def roll_up(progress: Callable = None) -> dict:
+    """Bring every shard up to date"""
+    now = datetime.now(timezone.utc)
+    totals = defaultdict(int)
+    for index, cluster in enumerate(shards):
+        with Session(cluster.primary) as db, Session(engine) as directory:
+            for name, count in roll_up_shard(db, directory, index, now).items():
+                totals[name] += count
+        if progress:
+            progress(index + 1, len(shards))
+    return dict(totals)
+
+
+def _rebuild_chunk(shard: int, first_day: date, last_day: Optional[date]) -> int:
+    with Session(shards[shard].primary) as db:
+        rows = DailyTaskRollupRepository(db).rebuild(first_day, last_day)
+        db.commit()
+    return rows
+
+
+def backfill(since: Optional[date] = None, until: Optional[date] = None, workers: int = 4, chunk_days: int = 30) -> dict:
+    """Rebuild the rollups of since..until (the whole history by default) on every shard.
+
+    The range is cut into chunks of chunk_days, rebuilt by `workers` threads
+    at once, one transaction each. A backfill through today also moves the
+    watermarks, so the next job run picks up from there.
+    """
+    now = datetime.now(timezone.utc)
+    chunks = []
+    for index, cluster in enumerate(shards):
+        seed_shard(index)
+        with Session(cluster.primary) as db:
+            first_day = since or TaskStatusHistoryRepository(db).first_day()
+        if first_day is None:
+            continue
+        last_day = until or now.date()
+        start = first_day
+        while start <= last_day:
+            end = start + timedelta(days=chunk_days - 1)
+            # the last chunk of an open ended backfill also takes what is written meanwhile
+            chunks.append((index, start, None if until is None and end >= last_day else min(end, last_day)))
+            start = end + timedelta(days=1)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        rows = sum(pool.map(lambda chunk: _rebuild_chunk(*chunk), chunks))
+
+    if until is None:
+        with Session(engine) as directory:
+            for index in range(len(shards)):
+                RollupWatermarkRepository(directory).set(index, now)
+    return {"chunks": len(chunks), "rows": rows}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bring the daily task rollups up to date, or rebuild them")
+    parser.add_argument("--backfill", action="store_true", help="rebuild since..until instead of the days changed since the last run")
+    parser.add_argument("--since", type=date.fromisoformat, help="first day to rebuild (default: the oldest history)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last day to rebuild (default: today)")
+    parser.add_argument("--workers", type=int, default=4, help="chunks rebuilt at once")
+    parser.add_argument("--chunk-days", type=int, default=30, help="days per chunk (one transaction)")
+    args = parser.parse_args()
+    if args.backfill:
+        print(backfill(args.since, args.until, args.workers, args.chunk_days))
+    else:
+        print(roll_up())
@@ -0,0 +1,91 @@
+"""Scheduled scan for overdue and soon-due projects across every organization.
+
+The worker runs it as the periodic "scan_deadlines" job. Each shard is read in
+one pass over the partial index on deadline (active projects only), results are
+stored per organization in deadline_digests for dashboards, and projects that
+became overdue or due soon since the previous scan get a `project.overdue` or
+`project.due_soon` event. Can also be run by hand:
+
+    python -m app.utils.deadline_scanner
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from sqlalchemy.orm import Session
+from app.core.database import shards
+from app.core.events import publish, project_event_data
+from app.db.repository import ProjectRepository, DeadlineDigestRepository
+from app.db.soft_delete import deleted_organizations
+
+# projects whose deadline falls within this window are reported as due soon
+DEADLINE_DUE_SOON_HOURS = float(os.getenv("DEADLINE_DUE_SOON_HOURS", "48"))
+
+
+def _utc(value: datetime) -> datetime:
+    # rows written before deadlines became timezone-aware are UTC
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _entry(project) -> dict:
+    return {"id": project.id, "name": project.name, "deadline": _utc(project.deadline).isoformat()}
+
+
+def scan_shard(db: Session, now: datetime) -> dict:
+    """Refresh the digests of one shard, returns counts of what was found"""
+    project_repo = ProjectRepository(db)
+    digest_repo = DeadlineDigestRepository(db)
+    due_soon_until = now + timedelta(hours=DEADLINE_DUE_SOON_HOURS)
+
+    overdue, due_soon = defaultdict(list), defaultdict(list)
+    for project in project_repo.get_active_due_before(due_soon_until, deleted_organizations.ids()):
+        (overdue if _utc(project.deadline) <= now else due_soon)[project.org_id].append(project)
+
+    found = set(overdue) | set(due_soon)
+    previous = digest_repo.get_all()
+    newly = []
+    for org_id in found | set(previous):
+        digest = previous.get(org_id)
+        if not overdue[org_id] and not due_soon[org_id]:
+            digest_repo.remove(digest)
+            continue
+
+        # only what was not in the previous digest is announced
+        seen_overdue = {entry["id"] for entry in digest.overdue} if digest else set()
+        seen_due_soon = {entry["id"] for entry in digest.due_soon} if digest else set()
+        newly += [(org_id, "project.overdue", project_event_data(project)) for project in overdue[org_id] if project.id not in seen_overdue]
+        newly += [(org_id, "project.due_soon", project_event_data(project)) for project in due_soon[org_id] if project.id not in seen_due_soon]
+        digest_repo.save(
+            digest, org_id,
+            [_entry(project) for project in overdue[org_id]],
+            [_entry(project) for project in due_soon[org_id]],
+            now
+        )
+    # announced in the same transaction as the digests that remember them
+    for org_id, type, data in newly:
+        publish(db, org_id, type, data)
+    db.commit()
+
+    return {
+        "organizations": len(found),
+        "overdue": sum(len(projects) for projects in overdue.values()),
+        "due_soon": sum(len(projects) for projects in due_soon.values()),
+        "announced": len(newly),
+    }
+
+
+def scan_deadlines(progress: Callable = None) -> dict:
+    """Scan every shard"""
+    now = datetime.now(timezone.utc)
+    totals = defaultdict(int)
+    for index, cluster in enumerate(shards):
+        with Session(cluster.primary) as db:
+            for name, count in scan_shard(db, now).items():
+                totals[name] += count
+        if progress:
+            progress(index + 1, len(shards))
+    return dict(totals)
+
+
+if __name__ == "__main__":
+    print(scan_deadlines())
@@ -1,5 +1,127 @@
-from app.core.database import Base , engine
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable, CreateIndex, CreateSequence
+import hashlib
+import os
+from app.core.database import Base , engine, shards, change_seq
 from app.db.models import user
+from app.db.models.schema_fingerprint import SchemaFingerprint
+from app.core.sharding import sharded_tables
+from app.utils.partitioning import create_partitioned_tables, add_partitioned_foreign_keys
+
+# with several shards, ids of sharded tables are interleaved (shard i only hands out
+# ids = i + 1 modulo the stride) so a tenant can be moved without id collisions
+SHARD_ID_STRIDE = int(os.getenv("SHARD_ID_STRIDE", "16"))
+
+# what a process does about the schema when it starts:
+#   create       create missing tables (inspects every table of every shard)
+#   fingerprint  one read of the stored fingerprint, create only when the models changed
+#   skip         nothing, the schema is managed elsewhere
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "create")
+
+
+def create_shard_tables(shard_engine):
+    """Create the sharded tables on a tenant shard.
+
+    Foreign keys to directory tables (users, organizations) are left out since
+    those rows only exist on shard 0.
+    """
+    tables = sharded_tables()
+    names = {table.name for table in tables}
+    with shard_engine.begin() as conn:
+        conn.execute(CreateSequence(change_seq, if_not_exists=True))
+    partitioned = create_partitioned_tables(shard_engine)
+    with shard_engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for table in tables:
+            if table.name in existing:
+                continue
+            local_fks = {fk.constraint for fk in table.foreign_keys if fk.column.table.name in names}
+            conn.execute(CreateTable(table, include_foreign_key_constraints=list(local_fks)))
+            for index in table.indexes:
+                conn.execute(CreateIndex(index))
+    add_partitioned_foreign_keys(shard_engine, partitioned, local_tables=names)
+
+
+def align_id_sequences(shard_engine, shard_index: int):
+    """Make a shard hand out ids congruent to shard_index + 1 modulo SHARD_ID_STRIDE"""
+    residue = (shard_index + 1) % SHARD_ID_STRIDE
+    with shard_engine.begin() as conn:
+        for table in sharded_tables():
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table.name}).scalar()
+            if sequence is None:
+                continue
+            increment = conn.execute(
+                text("SELECT increment_by FROM pg_sequences WHERE format('%I.%I', schemaname, sequencename) = :seq"),
+                {"seq": sequence}
+            ).scalar()
+            if increment == SHARD_ID_STRIDE:
+                continue
+
+            max_id = conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table.name}")).scalar()
+            next_id = max_id + 1 + (residue - (max_id + 1)) % SHARD_ID_STRIDE
+            conn.execute(text(f"ALTER SEQUENCE {sequence} INCREMENT BY {SHARD_ID_STRIDE}"))
+            conn.execute(text("SELECT setval(:seq, :value, false)"), {"seq": sequence, "value": next_id})
+
 
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    # shard 0 holds the directory and its own tenants, so it gets every table;
+    # partitioned tables are created first so create_all leaves them alone
+    # (and need the change_seq sequence their defaults draw from)
+    change_seq.create(bind=engine, checkfirst=True)
+    partitioned = create_partitioned_tables(engine)
+    Base.metadata.create_all(bind=engine)
+    add_partitioned_foreign_keys(engine, partitioned)
+    for index, cluster in enumerate(shards):
+        if index > 0:
+            create_shard_tables(cluster.primary)
+        if len(shards) > 1:
+            align_id_sequences(cluster.primary, index)
+
+
+def schema_fingerprint() -> str:
+    """Hash of the DDL the models produce, plus the shard layout"""
+    from sqlalchemy.dialects import postgresql
+    dialect = postgresql.dialect()
+    statements = [str(CreateSequence(change_seq).compile(dialect=dialect))]
+    for _, table in sorted(Base.metadata.tables.items()):
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        statements += sorted(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes)
+    statements.append(f"shards={len(shards)} stride={SHARD_ID_STRIDE}")
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()
+
+
+def stored_fingerprint() -> str:
+    """Fingerprint recorded by the last create_tables, None on a fresh database"""
+    try:
+        with Session(engine) as db:
+            row = db.get(SchemaFingerprint, 1)
+            return row.fingerprint if row else None
+    except DBAPIError:
+        # the table itself does not exist yet
+        return None
+
+
+def store_fingerprint(fingerprint: str):
+    with Session(engine) as db:
+        row = db.get(SchemaFingerprint, 1)
+        if row is None:
+            db.add(SchemaFingerprint(id=1, fingerprint=fingerprint))
+        else:
+            row.fingerprint = fingerprint
+        db.commit()
+
+
+def ensure_schema(mode: str = SCHEMA_CHECK):
+    """Run the start-up schema check selected by SCHEMA_CHECK"""
+    if mode == "skip":
+        return
+    if mode not in ("create", "fingerprint"):
+        raise ValueError(f"SCHEMA_CHECK must be create, fingerprint or skip, not {mode!r}")
+
+    fingerprint = schema_fingerprint()
+    if mode == "fingerprint" and stored_fingerprint() == fingerprint:
+        return
+    create_tables()
+    store_fingerprint(fingerprint)
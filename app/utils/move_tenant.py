@@ -0,0 +1,156 @@
+"""Move an organization's data to another shard while it stays online.
+
+Usage: python -m app.utils.move_tenant ORG_ID TARGET_SHARD [--batch-size N]
+
+1. copy every sharded row of the org to the target (reads and writes continue)
+2. mark the tenant "moving": writes get a 503, reads keep working
+3. wait for every process to see the new state, then drop the rows deleted
+   during step 1 and re-sync the ones written meanwhile: rows stamped by a
+   transaction the copy may not have seen (change_txid / txid at or above the
+   source's horizon when it started), rows of append-only tables the target
+   lacks, and the deadline digests (rewritten in place, one row per org)
+4. flip the shard map to the target and make the tenant writable again (sync
+   cursors name their shard, clients of the org resync in full once)
+5. wait for the caches to expire, then delete the rows from the source
+"""
+import argparse
+import time
+from sqlalchemy import inspect, select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.core.database import engine, shards, txid_horizon
+from app.core.sharding import shard_map, sharded_tables, SHARD_MAP_TTL_SECONDS
+from app.db.repository.tenant_shard import TenantShardRepository
+from app.utils.init_db import create_shard_tables
+
+
+# columns stamped with the transaction that last wrote the row
+CHANGE_MARKERS = ("change_txid", "txid")
+# tables updated in place without a marker, re-synced in full
+REWRITTEN_TABLES = {"deadline_digests"}
+
+
+def _conflict_columns(conn, table) -> list:
+    # use the real primary key of the target (a partitioned table also keys on org_id)
+    return inspect(conn).get_pk_constraint(table.name)["constrained_columns"]
+
+
+def _ids(table, org_id: int, conn) -> set:
+    return set(conn.execute(select(table.c.id).where(table.c.org_id == org_id)).scalars())
+
+
+def copy_table(table, org_id: int, source, target, batch_size: int, only=None) -> int:
+    """Upsert the rows of the org (those matching `only` when given) from source into target, one transaction per batch"""
+    with target.connect() as dst:
+        conflict_columns = _conflict_columns(dst, table)
+
+    conditions = [table.c.org_id == org_id] if only is None else [table.c.org_id == org_id, only]
+    copied = 0
+    last_id = 0
+    while True:
+        with source.connect() as src:
+            rows = src.execute(
+                select(table).where(*conditions, table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+            ).mappings().all()
+        if not rows:
+            return copied
+
+        stmt = insert(table).values([dict(row) for row in rows])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_={column.name: stmt.excluded[column.name] for column in table.columns if column.name not in conflict_columns}
+        )
+        with target.begin() as dst:
+            dst.execute(stmt)
+        copied += len(rows)
+        last_id = rows[-1]["id"]
+
+
+def drop_missing(table, org_id: int, source, target) -> int:
+    """Delete rows on target that no longer exist on source"""
+    with source.connect() as src, target.begin() as dst:
+        missing = list(_ids(table, org_id, dst) - _ids(table, org_id, src))
+        if missing:
+            dst.execute(delete(table).where(table.c.org_id == org_id, table.c.id.in_(missing)))
+        return len(missing)
+
+
+def changed_rows(table, org_id: int, source, target, horizon: int):
+    """Condition on the rows that may have been written since the copy started, None for all of them"""
+    for name in CHANGE_MARKERS:
+        if name in table.c:
+            # transactions below the horizon had ended before the copy read anything
+            return table.c[name] >= horizon
+    if table.name in REWRITTEN_TABLES:
+        return None
+    # append-only (or rewritten as DELETE + INSERT, like the rollups): the rows the target lacks
+    with source.connect() as src, target.connect() as dst:
+        return table.c.id.in_(sorted(_ids(table, org_id, src) - _ids(table, org_id, dst)))
+
+
+def delete_tenant(table, org_id: int, shard_engine, batch_size: int) -> int:
+    """Delete the org's rows from a shard in bounded batches"""
+    deleted = 0
+    while True:
+        with shard_engine.begin() as conn:
+            batch = select(table.c.id).where(table.c.org_id == org_id).limit(batch_size).scalar_subquery()
+            count = conn.execute(delete(table).where(table.c.id.in_(batch))).rowcount
+        if not count:
+            return deleted
+        deleted += count
+
+
+def move_tenant(org_id: int, target_shard: int, batch_size: int = 1000):
+    with Session(engine) as db:
+        shard_repo = TenantShardRepository(db)
+        entry = shard_repo.get_by_org(org_id)
+        source_shard = entry.shard if entry else 0
+        if source_shard == target_shard:
+            print(f"Organization {org_id} already lives on shard {target_shard}")
+            return
+        if entry is None:
+            shard_repo.create(org_id, source_shard)
+
+        source = shards[source_shard].primary
+        target = shards[target_shard].primary
+        tables = sharded_tables()
+        create_shard_tables(target)
+
+        with source.connect() as src:
+            horizon = src.execute(select(txid_horizon())).scalar()
+        print(f"Copying organization {org_id} from shard {source_shard} to shard {target_shard}")
+        for table in tables:
+            print(f"  {table.name}: {copy_table(table, org_id, source, target, batch_size)} rows")
+
+        shard_repo.set_state(org_id, "moving")
+        try:
+            print(f"Tenant is read-only, waiting {SHARD_MAP_TTL_SECONDS}s for the shard map caches")
+            time.sleep(SHARD_MAP_TTL_SECONDS)
+
+            for table in reversed(tables):
+                drop_missing(table, org_id, source, target)
+            for table in tables:
+                changed = changed_rows(table, org_id, source, target, horizon)
+                print(f"  {table.name}: {copy_table(table, org_id, source, target, batch_size, changed)} rows re-synced")
+        except Exception:
+            # the source is still complete, just make the tenant writable again
+            shard_repo.set_state(org_id, "active")
+            raise
+
+        shard_repo.set_shard(org_id, target_shard)
+        shard_map.invalidate(org_id)
+        print(f"Shard map flipped, waiting {SHARD_MAP_TTL_SECONDS}s before cleaning up the source")
+        time.sleep(SHARD_MAP_TTL_SECONDS)
+
+    for table in reversed(tables):
+        print(f"  {table.name}: {delete_tenant(table, org_id, source, batch_size)} rows removed from shard {source_shard}")
+    print("Done")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move an organization to another shard")
+    parser.add_argument("org_id", type=int)
+    parser.add_argument("target_shard", type=int)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    move_tenant(args.org_id, args.target_shard, args.batch_size)
@@ -0,0 +1,269 @@
+"""Hash partitioning of org-scoped tables on org_id.
+
+Set TASKS_PARTITIONS (and optionally PROJECTS_PARTITIONS) to have create_tables()
+build those tables as `PARTITION BY HASH (org_id)` on a fresh database. The
+primary key becomes (id, org_id) in the database while the ORM keeps mapping
+`id` alone, so models, repositories and the id index keep working unchanged.
+Because `id` alone is no longer unique, foreign keys pointing at a partitioned
+table carry org_id as well, and new tables must not reference tasks.id or
+projects.id with a plain foreign key.
+
+Existing tables are moved online with:
+
+    python -m app.utils.partitioning tasks --partitions 16 [--shard N] [--batch-size N]
+
+which builds `<table>_partitioned`, mirrors live writes into it with a trigger,
+backfills it in id batches, then swaps the two tables in one short transaction.
+The old table is kept as `<table>_unpartitioned` until you drop it.
+"""
+import argparse
+import os
+from sqlalchemy import MetaData, PrimaryKeyConstraint, DefaultClause, inspect, text
+from sqlalchemy.schema import CreateTable, CreateIndex
+from app.core.database import Base, shards
+from app.db import models
+
+TASKS_PARTITIONS = int(os.getenv("TASKS_PARTITIONS", "0"))
+PROJECTS_PARTITIONS = int(os.getenv("PROJECTS_PARTITIONS", "0"))
+
+
+def configured_partitions() -> dict:
+    """Table name -> partition count, parents first"""
+    if PROJECTS_PARTITIONS and not TASKS_PARTITIONS:
+        # tasks has to point at projects with (project_id, org_id) once projects is partitioned
+        raise RuntimeError("PROJECTS_PARTITIONS requires TASKS_PARTITIONS")
+
+    partitions = {}
+    if PROJECTS_PARTITIONS:
+        partitions["projects"] = PROJECTS_PARTITIONS
+    if TASKS_PARTITIONS:
+        partitions["tasks"] = TASKS_PARTITIONS
+    return partitions
+
+
+def is_partitioned(conn, name: str) -> bool:
+    return conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"),
+        {"name": name}
+    ).scalar()
+
+
+def _index_key(index) -> tuple:
+    return tuple(column.name for column in index.columns), bool(index.unique)
+
+
+def partitioned_copy(table, name: str = None, sequence: str = None):
+    """Copy of a model table hash-partitioned on org_id with a (id, org_id) primary key"""
+    copy = table.to_metadata(MetaData(), name=name or table.name)
+    copy.c.org_id.primary_key = True
+    copy.append_constraint(PrimaryKeyConstraint("id", "org_id"))
+    copy.dialect_kwargs["postgresql_partition_by"] = "HASH (org_id)"
+    if sequence is None:
+        copy.c.id.autoincrement = True
+    else:
+        # keep handing out ids from the sequence of the table being replaced
+        copy.c.id.autoincrement = False
+        copy.c.id.server_default = DefaultClause(text(f"nextval('{sequence}')"))
+
+    if copy.name != table.name:
+        # index names are schema wide, give the copy temporary ones until the swap
+        originals = {_index_key(index): index.name for index in table.indexes}
+        for index in copy.indexes:
+            index.name = f"{originals[_index_key(index)]}_partitioned"
+    return copy
+
+
+def create_partitioned(conn, table, partitions: int, name: str = None, sequence: str = None):
+    """Create the partitioned parent, its partitions and its indexes (no foreign keys)"""
+    copy = partitioned_copy(table, name, sequence)
+    conn.execute(CreateTable(copy, include_foreign_key_constraints=[]))
+    for remainder in range(partitions):
+        conn.execute(text(
+            f"CREATE TABLE {copy.name}_p{remainder} PARTITION OF {copy.name} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        ))
+    # created on the parent, Postgres builds the matching index on every partition
+    for index in copy.indexes:
+        conn.execute(CreateIndex(index))
+    return copy
+
+
+def add_foreign_keys(
+    conn,
+    table,
+    name: str,
+    partitioned: set,
+    local_tables: set = None,
+    not_valid: bool = False,
+    targets: set = None
+) -> list:
+    """Add the model's foreign keys to `name`, keyed on org_id too when the target is partitioned"""
+    added = []
+    for fk in table.foreign_key_constraints:
+        target = fk.referred_table.name
+        if local_tables is not None and target not in local_tables:
+            continue
+        if targets is not None and target not in targets:
+            continue
+        columns = [column.name for column in fk.columns]
+        referred = [element.column.name for element in fk.elements]
+        if target in partitioned:
+            columns.append("org_id")
+            referred.append("org_id")
+
+        constraint = f"{table.name}_{'_'.join(columns)}_fkey"
+        conn.execute(text(
+            f"ALTER TABLE {name} ADD CONSTRAINT {constraint} FOREIGN KEY ({', '.join(columns)}) "
+            f"REFERENCES {target} ({', '.join(referred)})" + (" NOT VALID" if not_valid else "")
+        ))
+        added.append(constraint)
+    return added
+
+
+def create_partitioned_tables(shard_engine) -> list:
+    """Create the configured partitioned tables that do not exist yet, returns their names"""
+    created = []
+    with shard_engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for name, partitions in configured_partitions().items():
+            if name not in existing:
+                create_partitioned(conn, Base.metadata.tables[name], partitions)
+                created.append(name)
+    return created
+
+
+def add_partitioned_foreign_keys(shard_engine, created: list, local_tables: set = None):
+    """Foreign keys of freshly created partitioned tables, once their targets exist"""
+    partitioned = set(configured_partitions())
+    with shard_engine.begin() as conn:
+        for name in created:
+            add_foreign_keys(conn, Base.metadata.tables[name], name, partitioned, local_tables)
+
+
+# ===== Online migration ===== #
+
+
+def _install_mirror(conn, table, tmp: str):
+    columns = [column.name for column in table.columns]
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in ("id", "org_id"))
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION {tmp}_mirror() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {tmp} WHERE id = OLD.id AND org_id = OLD.org_id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {tmp} ({', '.join(columns)})
+                VALUES ({', '.join(f'NEW.{column}' for column in columns)})
+                ON CONFLICT (id, org_id) DO UPDATE SET {updates};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text(
+        f"CREATE TRIGGER {tmp}_mirror AFTER INSERT OR UPDATE OR DELETE ON {table.name} "
+        f"FOR EACH ROW EXECUTE FUNCTION {tmp}_mirror()"
+    ))
+
+
+def _backfill(shard_engine, table, tmp: str, batch_size: int):
+    columns = ", ".join(column.name for column in table.columns)
+    with shard_engine.connect() as conn:
+        max_id = conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {table.name}")).scalar()
+
+    low = 0
+    while low < max_id:
+        with shard_engine.begin() as conn:
+            # FOR SHARE makes concurrent updates/deletes of the batch wait for it,
+            # so their mirror trigger always runs after the row has been copied
+            conn.execute(text(
+                f"INSERT INTO {tmp} ({columns}) "
+                f"SELECT {columns} FROM {table.name} WHERE id > :low AND id <= :high FOR SHARE "
+                f"ON CONFLICT (id, org_id) DO NOTHING"
+            ), {"low": low, "high": low + batch_size})
+        low += batch_size
+        print(f"  backfilled {min(low, max_id)}/{max_id}")
+
+
+def _swap(shard_engine, table, tmp: str, partitions: int, sequence: str, local_tables: set) -> list:
+    name = table.name
+    partitioned = set(configured_partitions()) | {name}
+    with shard_engine.begin() as conn:
+        inspector = inspect(conn)
+        referencing = [
+            (other, fk["name"])
+            for other in inspector.get_table_names()
+            if other not in (name, tmp)
+            for fk in inspector.get_foreign_keys(other)
+            if fk["referred_table"] == name
+        ]
+
+        conn.execute(text("SET LOCAL lock_timeout = '10s'"))
+        conn.execute(text(f"LOCK TABLE {name} IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text(f"DROP TRIGGER {tmp}_mirror ON {name}"))
+        conn.execute(text(f"DROP FUNCTION {tmp}_mirror()"))
+
+        conn.execute(text(f"ALTER TABLE {name} RENAME TO {name}_unpartitioned"))
+        conn.execute(text(f"ALTER INDEX {name}_pkey RENAME TO {name}_unpartitioned_pkey"))
+        for index in table.indexes:
+            conn.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_unpartitioned"))
+
+        conn.execute(text(f"ALTER TABLE {tmp} RENAME TO {name}"))
+        conn.execute(text(f"ALTER INDEX {tmp}_pkey RENAME TO {name}_pkey"))
+        for index in table.indexes:
+            conn.execute(text(f"ALTER INDEX {index.name}_partitioned RENAME TO {index.name}"))
+        for remainder in range(partitions):
+            conn.execute(text(f"ALTER TABLE {tmp}_p{remainder} RENAME TO {name}_p{remainder}"))
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {name}.id"))
+
+        # NOT VALID keeps the lock short, the constraints are validated afterwards
+        validate = [(name, constraint) for constraint in add_foreign_keys(conn, table, name, partitioned, local_tables, not_valid=True)]
+        for other, constraint in referencing:
+            conn.execute(text(f"ALTER TABLE {other} DROP CONSTRAINT {constraint}"))
+        for other in {other for other, _ in referencing}:
+            added = add_foreign_keys(conn, Base.metadata.tables[other], other, partitioned, local_tables, not_valid=True, targets={name})
+            validate += [(other, constraint) for constraint in added]
+    return validate
+
+
+def migrate_online(shard_engine, name: str, partitions: int, batch_size: int = 10000, local_tables: set = None):
+    table = Base.metadata.tables[name]
+    tmp = f"{name}_partitioned"
+    if name == "projects" and not TASKS_PARTITIONS:
+        raise RuntimeError("Partition tasks first (and set TASKS_PARTITIONS), it references projects")
+
+    with shard_engine.begin() as conn:
+        if is_partitioned(conn, name):
+            print(f"{name} is already partitioned")
+            return
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": name}).scalar()
+        print(f"Creating {tmp} with {partitions} partitions")
+        create_partitioned(conn, table, partitions, name=tmp, sequence=sequence)
+        _install_mirror(conn, table, tmp)
+
+    print(f"Backfilling {tmp}")
+    _backfill(shard_engine, table, tmp, batch_size)
+
+    print(f"Swapping {tmp} in for {name}")
+    validate = _swap(shard_engine, table, tmp, partitions, sequence, local_tables)
+
+    with shard_engine.begin() as conn:
+        for owner, constraint in validate:
+            conn.execute(text(f"ALTER TABLE {owner} VALIDATE CONSTRAINT {constraint}"))
+    print(f"Done, drop {name}_unpartitioned once you are happy with the result")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hash-partition an existing table on org_id without downtime")
+    parser.add_argument("table", choices=["tasks", "projects"])
+    parser.add_argument("--partitions", type=int, required=True)
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    local_tables = None
+    if args.shard > 0:
+        # directory tables do not exist on the other shards
+        local_tables = {name for name, table in Base.metadata.tables.items() if table.info.get("sharded")}
+    migrate_online(shards[args.shard].primary, args.table, args.partitions, args.batch_size, local_tables)
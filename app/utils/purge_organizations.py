@@ -0,0 +1,69 @@
+"""Background purge of soft-deleted organizations.
+
+Deleting an organization queues a "purge_organization" job that the worker
+(python worker.py) runs. This module can also sweep every pending purge by hand:
+
+    python -m app.utils.purge_organizations [--once]
+
+Deletes the tasks and projects (every org-scoped table) of soft-deleted
+organizations in bounded batches, pausing between batches so the purge never
+holds locks for long or saturates the database.
+"""
+import argparse
+import os
+import time
+from typing import Callable
+from app.core.database import SessionLocal
+from app.core.sharding import bind_tenant, sharded_tables
+from app.db.repository import OrganizationRepository
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))
+PURGE_PAUSE_SECONDS = float(os.getenv("PURGE_PAUSE_SECONDS", "0.1"))
+PURGE_POLL_SECONDS = float(os.getenv("PURGE_POLL_SECONDS", "30"))
+
+
+def purge_organization(
+    org_id: int,
+    batch_size: int = PURGE_BATCH_SIZE,
+    pause: float = PURGE_PAUSE_SECONDS,
+    progress: Callable = None
+) -> int:
+    """Delete all org-scoped rows of an organization, children first"""
+    purged = 0
+    with SessionLocal() as db:
+        bind_tenant(db, org_id)
+        org_repo = OrganizationRepository(db)
+        tables = sharded_tables()
+        total = org_repo.count_tenant_rows(tables, org_id)
+        for table in reversed(tables):
+            while True:
+                deleted = org_repo.purge_batch(table, org_id, batch_size)
+                if not deleted:
+                    break
+                org_repo.add_purged_rows(org_id, deleted)
+                purged += deleted
+                if progress:
+                    progress(purged, total)
+                time.sleep(pause)
+        org_repo.mark_purged(org_id)
+    return purged
+
+
+def purge_pending():
+    with SessionLocal() as db:
+        pending = [org.id for org in OrganizationRepository(db).get_pending_purge()]
+    for org_id in pending:
+        print(f"Purging organization {org_id}")
+        print(f"  {purge_organization(org_id)} rows deleted")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purge the data of soft-deleted organizations")
+    parser.add_argument("--once", action="store_true", help="purge what is pending and exit")
+    args = parser.parse_args()
+
+    while True:
+        purge_pending()
+        if args.once:
+            break
+        time.sleep(PURGE_POLL_SECONDS)
@@ -0,0 +1,36 @@
+"""Seed task_status_history with the tasks that existed before it.
+
+Usage: python -m app.utils.seed_status_history
+
+Tasks created before the history have no "created" row, so the flow analytics
+would count a todo -> in_progress move of one as -1 todo. This gives each of
+them a "seeded" row with its status when the history began (see
+TaskStatusHistoryRepository.seed). Run it once after deploying the history;
+running it again adds nothing.
+"""
+from typing import Callable
+from sqlalchemy.orm import Session
+from app.core.database import shards
+from app.db.repository import TaskStatusHistoryRepository
+
+
+def seed_shard(shard: int) -> int:
+    """Seed one shard in one transaction, returns how many rows were added"""
+    with Session(shards[shard].primary) as db:
+        rows = TaskStatusHistoryRepository(db).seed()
+        db.commit()
+    return rows
+
+
+def seed(progress: Callable = None) -> dict:
+    """Seed every shard"""
+    rows = 0
+    for index in range(len(shards)):
+        rows += seed_shard(index)
+        if progress:
+            progress(index + 1, len(shards))
+    return {"rows": rows}
+
+
+if __name__ == "__main__":
+    print(seed())
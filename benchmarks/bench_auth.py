@@ -0,0 +1,98 @@
+"""Microbenchmark: per-request cost of token verification with and without the token cache.
+
+Run with: python -m benchmarks.bench_auth [--clients 100] [--requests 20000] [--rounds 5] [--no-db]
+`--clients` distinct tokens are sent round robin, as many clients reusing their
+token would. A read request verifies its token once (get_current_user); a write
+with an Idempotency-Key verifies it twice (the middleware, then the dependency).
+
+The whole get_current_user dependency (a fresh session, the verification and
+the user lookup) is timed too, so the cache's win can be read against the
+query it does not save. That part uses DATABASE_URL: one user per client is
+created and deleted at the end. `--no-db` skips it.
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from app.core import security
+from app.core.database import SessionLocal, engine
+from app.core.dependencies import get_current_user
+from app.db.models import User
+
+EMAIL_PREFIX = "bench-auth-"
+
+
+def run(tokens: list, requests: int) -> float:
+    """Seconds per decode_access_token call over `requests` calls"""
+    start = time.perf_counter()
+    for i in range(requests):
+        claims = security.decode_access_token(tokens[i % len(tokens)])
+        assert claims is not None and claims.get("user_id") is not None
+    return (time.perf_counter() - start) / requests
+
+
+def run_dependency(tokens: list, requests: int) -> float:
+    """Seconds per get_current_user call over `requests` calls, each with its own session as in a request"""
+    start = time.perf_counter()
+    for i in range(requests):
+        with SessionLocal() as db:
+            assert get_current_user(tokens[i % len(tokens)], db) is not None
+    return (time.perf_counter() - start) / requests
+
+
+def seed(clients: int) -> list:
+    """Tokens of `clients` new users"""
+    with Session(engine) as db:
+        users = [User(name=f"bench auth {i}", email=f"{EMAIL_PREFIX}{i}@example.com", password="x", role="member") for i in range(clients)]
+        db.add_all(users)
+        db.commit()
+        return [security.create_access_token({"user_id": user.id}) for user in users]
+
+
+def cleanup():
+    with Session(engine) as db:
+        db.execute(delete(User).where(User.email.like(f"{EMAIL_PREFIX}%@example.com")))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--no-db", action="store_true", help="only time the token verification")
+    args = parser.parse_args()
+
+    tokens = [security.create_access_token({"user_id": i + 1}) for i in range(args.clients)]
+    run(tokens, len(tokens))  # import jose before timing
+
+    results = {}
+    for name, size in (("off", 0), ("on", max(args.clients, 1))):
+        security.token_cache = security.TokenCache(size)
+        run(tokens, len(tokens))  # the first request of each client always verifies
+        results[name] = statistics.median(run(tokens, args.requests) for _ in range(args.rounds))
+
+    dependency = {}
+    if not args.no_db:
+        cleanup()
+        try:
+            user_tokens = seed(args.clients)
+            for name, size in (("off", 0), ("on", max(args.clients, 1))):
+                security.token_cache = security.TokenCache(size)
+                run_dependency(user_tokens, len(user_tokens))  # warm the cache and the pool
+                dependency[name] = statistics.median(run_dependency(user_tokens, args.requests) for _ in range(args.rounds))
+        finally:
+            cleanup()
+
+    print(f"{args.clients} clients, {args.requests} requests x {args.rounds} rounds")
+    print(f"  {'cache':<6} {'read (1 decode)':>16} {'write (2 decodes)':>18} {'get_current_user':>17}")
+    for name, seconds in results.items():
+        total = f"{dependency[name] * 1e6:14.1f} us" if dependency else f"{'-':>17}"
+        print(f"  {name:<6} {seconds * 1e6:13.1f} us {seconds * 2e6:15.1f} us {total}")
+    print(f"  speedup {results['off'] / results['on']:.1f}x (verification)", end="")
+    print(f", {dependency['off'] / dependency['on']:.1f}x (get_current_user)" if dependency else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: task list query time and response size per sparse field set.
+
+Run with: python -m benchmarks.bench_fieldsets [--tasks 1000] [--content-bytes 4000] [--rounds 50]
+Uses DATABASE_URL. Seeds an organization, a project and its tasks inside a
+transaction that is rolled back at the end, so nothing is left behind.
+"""
+import argparse
+import statistics
+import time
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.core.serialization import render, TaskFields
+from app.db.models import Organization, Project, Task
+from app.db.repository import TaskRepository
+
+FIELD_SETS = {
+    "all": "all",
+    "default": None,
+    "board": "id,title,status",
+}
+
+
+def seed(db: Session, tasks: int, content_bytes: int) -> tuple:
+    org = Organization(name="bench fieldsets", invite_code="BENCH-FIELDSETS")
+    db.add(org)
+    db.flush()
+    project = Project(name="bench", description="x" * content_bytes, org_id=org.id)
+    db.add(project)
+    db.flush()
+    db.add_all([
+        Task(title=f"Task {i}", content="lorem ipsum " * (content_bytes // 12), status="todo",
+             project_id=project.id, org_id=org.id)
+        for i in range(tasks)
+    ])
+    db.flush()
+    return org.id, project.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--content-bytes", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        db = Session(bind=conn)
+        try:
+            org_id, project_id = seed(db, args.tasks, args.content_bytes)
+            repo = TaskRepository(db)
+
+            print(f"{'field set':<12}{'query (ms)':>12}{'render (ms)':>13}{'bytes':>12}")
+            for name, spec in FIELD_SETS.items():
+                fields = TaskFields.parse(spec)
+                adapter = TaskFields.list_adapter(fields)
+                query_times, render_times = [], []
+                for _ in range(args.rounds):
+                    db.expunge_all()
+                    start = time.perf_counter()
+                    rows = repo.get_all_by_project(project_id, org_id, 0, args.tasks, fields)
+                    query_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    body = render(adapter, rows).body
+                    render_times.append(time.perf_counter() - start)
+                print(f"{name:<12}{statistics.median(query_times) * 1000:>12.2f}"
+                      f"{statistics.median(render_times) * 1000:>13.2f}{len(body):>12}")
+        finally:
+            db.close()
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Microbenchmark: flow metrics over millions of status transitions.
+
+Run with: python -m benchmarks.bench_flow_metrics [--transitions 2000000] [--points 91] [--rounds 5]
+No database is needed, transitions are generated: tasks created over 90 days
+walk todo -> in_progress (-> blocked -> in_progress) -> done. Prints the
+median time of each step of an analytics request after the rows are loaded.
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+from app.core import flow_metrics
+from app.db.models.task import TASK_STATUSES
+
+DAY = 86400.0
+
+
+def generate(transitions: int, seed: int = 0) -> flow_metrics.Transitions:
+    rng = np.random.default_rng(seed)
+    todo, in_progress, done, blocked = (TASK_STATUSES.index(s) for s in ("todo", "in_progress", "done", "blocked"))
+    path = [(-1, todo), (todo, in_progress), (in_progress, blocked), (blocked, in_progress), (in_progress, done)]
+    tasks = transitions // len(path)
+    created = rng.uniform(0, 90 * DAY, tasks)
+    steps = np.cumsum(rng.exponential(DAY, (tasks, len(path))), axis=1) - DAY
+    at = (created[:, None] + np.maximum(steps, 0)).ravel()
+    task_id = np.repeat(np.arange(1, tasks + 1), len(path))
+    from_status = np.tile([f for f, _ in path], tasks).astype(np.int8)
+    to_status = np.tile([t for _, t in path], tasks).astype(np.int8)
+    order = np.argsort(at, kind="stable")
+    return flow_metrics.Transitions(task_id[order], from_status[order], to_status[order], at[order])
+
+
+def timed(fn, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=2_000_000)
+    parser.add_argument("--points", type=int, default=91)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    transitions = generate(args.transitions)
+    since, until = 60 * DAY, 90 * DAY
+    edges = flow_metrics.time_edges(0, until, args.points)
+    print(f"{len(transitions.at):,} transitions, {args.points} points")
+
+    rows = list(zip(*(column.tolist() for column in transitions)))
+    chunks = [rows[i:i + 50000] for i in range(0, len(rows), 50000)]
+    seconds, _ = timed(lambda: flow_metrics.to_columns(chunks), args.rounds)
+    print(f"  {'to_columns':<18} {seconds * 1000:9.1f} ms")
+    seconds, flow = timed(lambda: flow_metrics.cumulative_flow(transitions, edges), args.rounds)
+    print(f"  {'cumulative_flow':<18} {seconds * 1000:9.1f} ms")
+    seconds, _ = timed(lambda: flow_metrics.burndown(flow), args.rounds)
+    print(f"  {'burndown':<18} {seconds * 1000:9.1f} ms")
+    seconds, cycle = timed(lambda: flow_metrics.completion_times(transitions, since, until), args.rounds)
+    print(f"  {'cycle time':<18} {seconds * 1000:9.1f} ms  {flow_metrics.summarize(cycle)}")
+    seconds, lead = timed(lambda: flow_metrics.completion_times(transitions, since, until, start_status=None), args.rounds)
+    print(f"  {'lead time':<18} {seconds * 1000:9.1f} ms  {flow_metrics.summarize(lead)}")
+
+
+if __name__ == "__main__":
+    main()
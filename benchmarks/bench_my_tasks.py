@@ -0,0 +1,112 @@
+"""Benchmark: "my tasks" and workload queries in a large organization.
+
+Run with: python -m benchmarks.bench_my_tasks [--tasks 100000] [--members 200] [--rounds 50]
+Uses DATABASE_URL. Seeds an organization with members and tasks spread over
+them inside a transaction that is rolled back at the end, so nothing is left
+behind. Times the repository calls behind the endpoints, with the default task
+fieldset, and prints the median of each and, on PostgreSQL, the plan node
+serving the exact statement it sent (an Index Only Scan on
+ix_tasks_org_id_assignee_id_status when the covering index is in place).
+"""
+import argparse
+import random
+import statistics
+import time
+from sqlalchemy import event, insert, text
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.db.models import Organization, Project, Task, User
+from app.db.models.task import TASK_STATUSES
+from app.core.serialization import TaskFields
+from app.db.repository import TaskRepository
+
+
+def seed(db: Session, tasks: int, members: int) -> tuple:
+    org = Organization(name="bench my tasks", invite_code="BENCH-MY-TASKS")
+    db.add(org)
+    db.flush()
+    users = [User(name=f"member {i}", email=f"bench-my-tasks-{i}@example.com", password="x", role="member", org_id=org.id) for i in range(members)]
+    project = Project(name="bench", org_id=org.id)
+    db.add_all(users + [project])
+    db.flush()
+    # one in ten tasks is left unassigned
+    assignees = [user.id for user in users] + [None] * (members // 9 + 1)
+    for start in range(0, tasks, 10000):
+        db.execute(insert(Task), [
+            {"title": f"Task {i}", "status": random.choice(TASK_STATUSES), "project_id": project.id,
+             "org_id": org.id, "assignee_id": random.choice(assignees)}
+            for i in range(start, min(start + 10000, tasks))
+        ])
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("ANALYZE tasks"))
+    return org.id, users[0].id
+
+
+def timed(rounds: int, query) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        query()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def sent(db: Session, query) -> tuple:
+    """The SQL statement and parameters a repository call sends to the database (its last one)"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    conn = db.connection()
+    event.listen(conn, "before_cursor_execute", capture)
+    try:
+        query()
+    finally:
+        event.remove(conn, "before_cursor_execute", capture)
+    return statements[-1]
+
+
+def plan(db: Session, query) -> str:
+    """Plan of the statement the repository call actually sends"""
+    if db.bind.dialect.name != "postgresql":
+        return "-"
+    statement, parameters = sent(db, query)
+    lines = [row[0] for row in db.connection().exec_driver_sql(f"EXPLAIN {statement}", parameters)]
+    scans = [line.strip().lstrip("-> ") for line in lines if "Scan" in line]
+    return scans[0] if scans else lines[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        db = Session(bind=conn)
+        try:
+            org_id, user_id = seed(db, args.tasks, args.members)
+            repo = TaskRepository(db)
+            # what GET /tasks/mine loads without ?fields=
+            fields = TaskFields.default
+            queries = {
+                "my tasks": lambda: repo.get_by_assignee(org_id, user_id, fields=fields),
+                "my todo": lambda: repo.get_by_assignee(org_id, user_id, "todo", fields=fields),
+                "workload": lambda: repo.count_by_assignee(org_id),
+            }
+
+            print(f"fields: {', '.join(fields)}")
+            print(f"{'query':<10}{'median (ms)':>13}  plan")
+            for name, query in queries.items():
+                db.expunge_all()
+                print(f"{name:<10}{timed(args.rounds, query):>13.2f}  {plan(db, query)}")
+        finally:
+            db.close()
+            transaction.rollback()
+
+
+if __name__ == "__main__":
+    main()
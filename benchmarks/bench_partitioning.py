@@ -0,0 +1,126 @@
+"""Benchmark: plain tasks table vs tasks hash-partitioned on org_id.
+
+Run with: python -m benchmarks.bench_partitioning [--rows 50000000] [--orgs 10000] [--partitions 16]
+Uses DATABASE_URL and creates/drops its own bench_* tables, it never touches `tasks`.
+Reports index size, VACUUM time and org-scoped query latency for both layouts.
+"""
+import argparse
+import random
+import statistics
+import time
+from sqlalchemy import text
+from app.core.database import engine
+
+LAYOUTS = {
+    "plain": "",
+    "hash": "PARTITION BY HASH (org_id)",
+}
+
+QUERIES = {
+    "list by org": "SELECT id, title, status FROM {table} WHERE org_id = :org ORDER BY id LIMIT 100",
+    "count by status": "SELECT count(*) FROM {table} WHERE org_id = :org AND status = 'todo'",
+    "get by id": "SELECT * FROM {table} WHERE id = :id AND org_id = :org",
+}
+
+
+def create(conn, layout: str, partitions: int) -> str:
+    table = f"bench_tasks_{layout}"
+    conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    primary_key = "PRIMARY KEY (id, org_id)" if LAYOUTS[layout] else "PRIMARY KEY (id)"
+    conn.execute(text(f"""
+        CREATE TABLE {table} (
+            id INTEGER NOT NULL,
+            title VARCHAR NOT NULL,
+            content VARCHAR,
+            status VARCHAR,
+            project_id INTEGER NOT NULL,
+            org_id INTEGER NOT NULL,
+            {primary_key}
+        ) {LAYOUTS[layout]}
+    """))
+    if LAYOUTS[layout]:
+        for remainder in range(partitions):
+            conn.execute(text(
+                f"CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+            ))
+    # same index the model declares (Column(index=True) on id)
+    conn.execute(text(f"CREATE INDEX ix_{table}_id ON {table} (id)"))
+    return table
+
+
+def load(table: str, rows: int, orgs: int, chunk: int = 1_000_000):
+    for start in range(0, rows, chunk):
+        stop = min(start + chunk, rows)
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO {table} (id, title, content, status, project_id, org_id)
+                SELECT i, 'Task ' || i, repeat('x', 200),
+                       (ARRAY['todo', 'in_progress', 'done', 'blocked'])[1 + i % 4],
+                       1 + i % (:orgs * 10), 1 + (i * 7919) % :orgs
+                FROM generate_series(:start, :stop) AS i
+            """), {"start": start + 1, "stop": stop, "orgs": orgs})
+        print(f"  {table}: {stop}/{rows} rows")
+
+
+def index_size(conn, table: str) -> int:
+    return conn.execute(text(
+        "SELECT COALESCE(SUM(pg_indexes_size(relid)), 0) FROM pg_partition_tree(:table)"
+    ), {"table": table}).scalar()
+
+
+def vacuum_seconds(table: str) -> float:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        start = time.perf_counter()
+        conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+        return time.perf_counter() - start
+
+
+def latencies(table: str, orgs: int, rows: int, samples: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for name, sql in QUERIES.items():
+            timings = []
+            for _ in range(samples):
+                params = {"org": random.randint(1, orgs), "id": random.randint(1, rows)}
+                start = time.perf_counter()
+                conn.execute(text(sql.format(table=table)), params).all()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = (statistics.median(timings), timings[int(len(timings) * 0.95) - 1])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--orgs", type=int, default=10_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the bench tables afterwards")
+    args = parser.parse_args()
+
+    report = {}
+    for layout in LAYOUTS:
+        with engine.begin() as conn:
+            table = create(conn, layout, args.partitions)
+        load(table, args.rows, args.orgs)
+        vacuum = vacuum_seconds(table)
+        with engine.connect() as conn:
+            size = index_size(conn, table)
+        report[layout] = (size, vacuum, latencies(table, args.orgs, args.rows, args.samples))
+
+    print(f"\n{args.rows} rows, {args.orgs} orgs, {args.partitions} partitions")
+    print(f"{'layout':<8}{'index MB':>10}{'vacuum s':>10}" + "".join(f"{name + ' p50/p95 ms':>32}" for name in QUERIES))
+    for layout, (size, vacuum, timings) in report.items():
+        cells = "".join(f"{f'{p50:.2f} / {p95:.2f}':>32}" for p50, p95 in timings.values())
+        print(f"{layout:<8}{size / 1024 / 1024:>10.1f}{vacuum:>10.1f}{cells}")
+
+    if not args.keep:
+        with engine.begin() as conn:
+            for layout in LAYOUTS:
+                conn.execute(text(f"DROP TABLE IF EXISTS bench_tasks_{layout}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Microbenchmark: default FastAPI response encoding vs the precompiled adapter path.
+
+Run with: python -m benchmarks.bench_serialization [rows] [rounds]
+No database is needed, rows are transient ORM objects.
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+from app.db.models import Task, Project, User, Organization
+from app.db.schema import TaskResponse, ProjectResponse, UserResponse, OrganizationResponse
+from app.core.serialization import render, TaskListAdapter, ProjectListAdapter, UserListAdapter
+from pydantic import TypeAdapter
+
+
+def make_rows(n: int) -> dict:
+    return {
+        "task": [
+            Task(id=i, title=f"Task {i}", content="lorem ipsum " * 20, status="todo", project_id=1, org_id=1)
+            for i in range(n)
+        ],
+        "project": [
+            Project(id=i, name=f"Project {i}", description="lorem ipsum " * 20, org_id=1,
+                    is_archived=False, deadline=datetime(2026, 3, 1))
+            for i in range(n)
+        ],
+        "user": [
+            User(id=i, name=f"User {i}", email=f"user{i}@example.com", password="x", role="member", org_id=1)
+            for i in range(n)
+        ],
+        "organization": [
+            Organization(id=i, name=f"Org {i}", description="lorem ipsum", owner_id=1, invite_code="ABC-DEF-123")
+            for i in range(n)
+        ],
+    }
+
+
+SCHEMAS = {
+    "task": (TaskResponse, TaskListAdapter),
+    "project": (ProjectResponse, ProjectListAdapter),
+    "user": (UserResponse, UserListAdapter),
+    "organization": (OrganizationResponse, TypeAdapter(list[OrganizationResponse])),
+}
+
+
+def fastapi_default(schema, rows) -> bytes:
+    # what FastAPI does for response_model=list[Schema]: validate, jsonable_encoder, json.dumps
+    validated = [schema.model_validate(row) for row in rows]
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rows = make_rows(n)
+
+    print(f"{'schema':<14}{'default (ms)':>14}{'adapter (ms)':>14}{'speedup':>10}")
+    for name, (schema, adapter) in SCHEMAS.items():
+        default = timeit.timeit(lambda: fastapi_default(schema, rows[name]), number=rounds) / rounds
+        fast = timeit.timeit(lambda: render(adapter, rows[name]), number=rounds) / rounds
+        print(f"{name:<14}{default * 1000:>14.3f}{fast * 1000:>14.3f}{default / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
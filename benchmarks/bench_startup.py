@@ -0,0 +1,90 @@
+"""Benchmark: process start-up cost per SCHEMA_CHECK mode.
+
+Run with: python -m benchmarks.bench_startup [--modes create,fingerprint,skip] [--runs 5] [--token JWT]
+Uses DATABASE_URL (run the app once first so the schema and its fingerprint exist).
+For each mode reports, as medians over the runs:
+  - import time of `main` in a fresh interpreter
+  - time from spawning a single uvicorn worker to its first /test response
+    (and to the first authenticated /users/me with --token)
+  - resident memory of that worker after the first request
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PORT = 8798
+
+
+def import_time(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def get(path: str, headers: dict = None) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=5)
+    conn.request("GET", path, headers=headers or {})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def rss_mb(pid: int) -> float:
+    # Linux only
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def first_request(env: dict, token: str = None) -> tuple:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise SystemExit("server exited, check DATABASE_URL")
+            try:
+                if get("/test") == 200:
+                    break
+            except OSError:
+                time.sleep(0.01)
+        ready = time.perf_counter() - start
+        authenticated = None
+        if token:
+            get("/users/me", {"Authorization": f"Bearer {token}"})
+            authenticated = time.perf_counter() - start
+        return ready, authenticated, rss_mb(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default="create,fingerprint,skip")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--token")
+    args = parser.parse_args()
+
+    print(f"{'mode':<13}{'import (ms)':>12}{'first /test (ms)':>18}{'first auth (ms)':>17}{'RSS (MB)':>10}")
+    for mode in args.modes.split(","):
+        env = dict(os.environ, SCHEMA_CHECK=mode)
+        imports = [import_time(env) for _ in range(args.runs)]
+        runs = [first_request(env, args.token) for _ in range(args.runs)]
+        authenticated = f"{statistics.median(run[1] for run in runs) * 1000:>17.0f}" if args.token else f"{'-':>17}"
+        print(f"{mode:<13}{statistics.median(imports) * 1000:>12.0f}"
+              f"{statistics.median(run[0] for run in runs) * 1000:>18.0f}{authenticated}"
+              f"{statistics.median(run[2] for run in runs):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: API throughput against the number of serve.py workers.
+
+Run with: python -m benchmarks.bench_workers [--workers 1,2,4,8] [--clients 64] [--seconds 10]
+          [--path /tasks/] [--token JWT]
+Starts `python serve.py` once per worker count (same DB_CONNECTION_BUDGET, so
+pools shrink as workers grow), drives it with keep-alive clients for a fixed
+time and reports requests/s and latency percentiles. Use --token with an
+authenticated path to include database work, the default /test measures the
+server alone. The clients are threads of this process, run it on another
+machine (--url) when they become the bottleneck.
+"""
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def wait_ready(host: str, port: int, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/test")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("server did not come up")
+
+
+def client(host: str, port: int, path: str, headers: dict, stop: threading.Event, latencies: list, errors: list):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append("connection")
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(host: str, port: int, args) -> tuple:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    stop = threading.Event()
+    results = [([], []) for _ in range(args.clients)]
+    threads = [
+        threading.Thread(target=client, args=(host, port, args.path, headers, stop, latencies, errors))
+        for latencies, errors in results
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies = sorted(latency for latencies, _ in results for latency in latencies)
+    errors = sum(len(errors) for _, errors in results)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--path", default="/test")
+    parser.add_argument("--token")
+    parser.add_argument("--url", default="http://127.0.0.1:8799", help="address serve.py binds to")
+    args = parser.parse_args()
+    url = urlsplit(args.url)
+
+    print(f"{'workers':>8}{'req/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}{'errors':>8}")
+    for workers in [int(count) for count in args.workers.split(",")]:
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--bind", url.netloc, "--no-init-db"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        try:
+            wait_ready(url.hostname, url.port)
+            latencies, errors = run(url.hostname, url.port, args)
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+        if not latencies:
+            print(f"{workers:>8}{'-':>10}{'-':>10}{'-':>10}{errors:>8}")
+            continue
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{workers:>8}{len(latencies) / args.seconds:>10.0f}{statistics.median(latencies) * 1000:>10.1f}"
+              f"{p99 * 1000:>10.1f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
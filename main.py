@@ -1,20 +1,48 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
 from app.router.auth_router import router as auth_router
 from app.router.user_router import router as user_router
 from app.router.organization_router import router as organization_router
 from app.router.project_router import router as project_router
 from app.router.task_router import router as task_router
-from app.utils.init_db import create_tables
+from app.router.job_router import router as job_router
+from app.router.event_router import router as event_router
+from app.router.sync_router import router as sync_router
+from app.router.batch_router import router as batch_router
+from app.router.activity_router import router as activity_router
+from app.router.analytics_router import router as analytics_router
+from app.utils.init_db import ensure_schema
+from app.core.database import TenantReadOnlyError, THREADPOOL_SIZE
+from sqlalchemy.orm.exc import StaleDataError
+from app.core.activity import activity_log
+from app.core.idempotency import IdempotencyMiddleware
 from contextlib import asynccontextmanager
+import anyio.to_thread
 
 @asynccontextmanager
 async def lifespan(app : FastAPI):
-     # instialize DB at Start
-     create_tables()
+     # instialize DB at Start (SCHEMA_CHECK=create|fingerprint|skip, serve.py workers skip it)
+     ensure_schema()
+     anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+     activity_log.start()
      yield # sepration point 
+     # write the buffered activity entries before the process exits
+     activity_log.close()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# retried POST/PUT/PATCH/DELETE carrying an Idempotency-Key get the first response back
+app.add_middleware(IdempotencyMiddleware)
+
+@app.exception_handler(TenantReadOnlyError)
+def tenant_read_only_handler(request: Request, exc: TenantReadOnlyError):
+    # the organization is being moved to another shard, writes resume in a few seconds
+    return ORJSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "30"})
+
+@app.exception_handler(StaleDataError)
+def stale_data_handler(request: Request, exc: StaleDataError):
+    # a task or project changed between this request's read and its write
+    return ORJSONResponse(status_code=409, content={"detail": "The resource was changed by another request, reload it and retry."})
 
 # Include routers
 app.include_router(auth_router)
@@ -22,6 +50,12 @@ app.include_router(user_router)
 app.include_router(organization_router)
 app.include_router(project_router)
 app.include_router(task_router)
+app.include_router(job_router)
+app.include_router(event_router)
+app.include_router(sync_router)
+app.include_router(batch_router)
+app.include_router(activity_router)
+app.include_router(analytics_router)
 
 @app.get("/test")
 def check():
@@ -0,0 +1,89 @@
+"""Production launcher: a gunicorn pre-fork master managing uvicorn workers.
+
+Run with: python serve.py [--workers N] [--bind 0.0.0.0:8000] [--no-init-db]
+
+- one worker per core by default (WEB_CONCURRENCY overrides it)
+- DB_CONNECTION_BUDGET is the number of connections all workers together may
+  open to each database; every worker gets an equal share as its pool, split
+  into BATCH_LANE_CONNECTIONS for the extra lanes of /batch, one connection
+  for the event listener and a threadpool of the rest
+- the schema check (SCHEMA_CHECK) runs once here, before forking; workers
+  skip it and run no DDL
+- the app is loaded before forking, so each worker drops the inherited
+  connection pools right after fork
+- SIGTERM drains: the listening socket closes, in-flight requests get
+  GRACEFUL_TIMEOUT seconds to finish. Live streams still open then are cut
+  and clients resume with Last-Event-ID
+"""
+import argparse
+import os
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "100"))
+# same default as app/service/batch_service.py, which is not imported before the split
+BATCH_LANE_CONNECTIONS = int(os.getenv("BATCH_LANE_CONNECTIONS", str(max(int(os.getenv("BATCH_CONCURRENCY", "4")) - 1, 0))))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+BIND = os.getenv("BIND", "0.0.0.0:8000")
+
+
+def worker_settings(workers: int, budget: int) -> dict:
+    """Per-worker pool and threadpool sizes sharing one connection budget"""
+    per_worker = budget // workers
+    if per_worker < 2:
+        raise SystemExit(f"DB_CONNECTION_BUDGET={budget} is too small for {workers} workers (2 connections each at least)")
+    # at least one request thread stays
+    lanes = max(min(BATCH_LANE_CONNECTIONS, per_worker - 2), 0)
+    return {
+        "DB_POOL_SIZE": per_worker,
+        "DB_MAX_OVERFLOW": 0,
+        "THREADPOOL_SIZE": per_worker - 1 - lanes,
+        "BATCH_LANE_CONNECTIONS": lanes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with a pre-fork process manager")
+    parser.add_argument("--workers", type=int, default=WEB_CONCURRENCY)
+    parser.add_argument("--bind", default=BIND)
+    parser.add_argument("--no-init-db", action="store_true", help="skip the schema check before forking")
+    args = parser.parse_args()
+
+    # explicitly set pool sizes win over the budget
+    for name, value in worker_settings(args.workers, DB_CONNECTION_BUDGET).items():
+        os.environ.setdefault(name, str(value))
+    schema_check = os.getenv("SCHEMA_CHECK", "create")
+    os.environ["SCHEMA_CHECK"] = "skip"
+
+    # imported only now, the app modules read the settings above at import
+    from gunicorn.app.base import BaseApplication
+    from app.core.database import dispose_engines
+    from app.utils.init_db import ensure_schema
+    import main as api
+
+    if not args.no_init_db:
+        ensure_schema(schema_check)
+    # nothing pooled may be shared with the workers
+    dispose_engines()
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", args.bind)
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("graceful_timeout", GRACEFUL_TIMEOUT)
+            self.cfg.set("post_fork", lambda server, worker: dispose_engines())
+
+        def load(self):
+            return api.app
+
+    print(
+        f"Serving on {args.bind} with {args.workers} workers, "
+        f"{os.environ['DB_POOL_SIZE']} connections, {os.environ['THREADPOOL_SIZE']} threads "
+        f"and {os.environ['BATCH_LANE_CONNECTIONS']} batch lanes each"
+    )
+    Server().run()
+
+
+if __name__ == "__main__":
+    main()
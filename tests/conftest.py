@@ -0,0 +1,51 @@
+"""Fixtures of the request-level tests.
+
+They run the app against DATABASE_URL, which has to be PostgreSQL (the
+modules using them are skipped otherwise). Every test gets its own users and
+organization, so nothing has to be cleaned up between them.
+"""
+import uuid
+from types import SimpleNamespace
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def register(client, name: str) -> dict:
+    """Auth headers of a new user"""
+    email = f"{name}-{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/auth/register", json={"name": name, "email": email, "password": "pw123456"})
+    assert response.status_code == 201, response.text
+    response = client.post("/auth/login", json={"email": email, "password": "pw123456"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def owner(client):
+    """A new user owning a new organization with one project"""
+    headers = register(client, "owner")
+    response = client.post("/organizations/create", json={"name": "test org"}, headers=headers)
+    assert response.status_code == 201, response.text
+    response = client.post("/projects/create", json={"name": "test project", "description": "d"}, headers=headers)
+    assert response.status_code == 201, response.text
+    return SimpleNamespace(headers=headers, org_id=response.json()["org_id"], project_id=response.json()["id"])
+
+
+@pytest.fixture
+def task(client, owner):
+    """A todo task of the owner's project, as returned by its creation"""
+    response = client.post(
+        "/tasks/create",
+        json={"title": "a task", "content": "c", "status": "todo", "project_id": owner.project_id},
+        headers=owner.headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
@@ -0,0 +1,66 @@
+"""Task writes are conditional on the version they read.
+
+Needs PostgreSQL: run with
+DATABASE_URL=postgresql://... python -m pytest tests/test_concurrent_edits.py
+"""
+import os
+import pytest
+from sqlalchemy import event, update
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("DATABASE_URL", "").startswith("postgresql"),
+    reason="needs a PostgreSQL DATABASE_URL"
+)
+
+
+def _write_in_between(task_id: int):
+    """Make another transaction change the task between the request's read and its UPDATE"""
+    from app.core.database import engine
+    from app.db.models.task import Task
+
+    def bump(mapper, connection, target):
+        tasks = Task.__table__
+        with engine.begin() as other:
+            other.execute(update(tasks).where(tasks.c.id == task_id).values(title="theirs", version=tasks.c.version + 1))
+
+    event.listen(Task, "before_update", bump, once=True)
+
+
+def test_update_increments_version(client, owner, task):
+    response = client.put(f"/tasks/{task['id']}", json={"title": "renamed"}, headers=owner.headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == task["version"] + 1
+    assert response.headers["ETag"] == f'"{task["version"] + 1}"'
+
+    response = client.get(f"/tasks/{task['id']}", headers=owner.headers)
+    assert response.json()["title"] == "renamed"
+    assert response.json()["version"] == task["version"] + 1
+
+
+def test_update_losing_a_race_is_a_conflict(client, owner, task):
+    _write_in_between(task["id"])
+    response = client.put(f"/tasks/{task['id']}", json={"title": "mine"}, headers=owner.headers)
+    assert response.status_code == 409, response.text
+    current = response.json()["detail"]["current"]
+    assert current["title"] == "theirs"
+    assert current["version"] == task["version"] + 1
+    assert response.headers["ETag"] == f'"{task["version"] + 1}"'
+
+
+def test_update_of_an_older_version_fails_its_precondition(client, owner, task):
+    headers = {**owner.headers, "If-Match": f'"{task["version"]}"'}
+    assert client.put(f"/tasks/{task['id']}", json={"title": "first"}, headers=headers).status_code == 200
+
+    response = client.put(f"/tasks/{task['id']}", json={"title": "second"}, headers=headers)
+    assert response.status_code == 412, response.text
+    assert response.json()["detail"]["current"]["title"] == "first"
+
+
+def test_other_writes_losing_a_race_get_the_global_conflict(client, owner, task):
+    _write_in_between(task["id"])
+    response = client.patch(f"/tasks/{task['id']}/status", json={"status": "done"}, headers=owner.headers)
+    assert response.status_code == 409, response.text
+    assert response.json() == {"detail": "The resource was changed by another request, reload it and retry."}
+
+    response = client.get(f"/tasks/{task['id']}", headers=owner.headers)
+    assert (response.json()["title"], response.json()["status"]) == ("theirs", "todo")
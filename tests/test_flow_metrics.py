@@ -0,0 +1,126 @@
+"""Cycle time, lead time and throughput of a small hand-built history.
+
+No database is needed: the transitions are the rows
+TaskStatusHistoryRepository.iter_columns would stream, written out by hand.
+"""
+import numpy as np
+import pytest
+from app.core import flow_metrics
+from app.db.models.task import TASK_STATUSES
+from app.db.repository.task_status_history import BEFORE_HISTORY, NO_STATUS
+
+TODO, IN_PROGRESS, DONE = (TASK_STATUSES.index(status) for status in ("todo", "in_progress", "done"))
+NONE, SEEDED = NO_STATUS, BEFORE_HISTORY
+T0 = 1_750_000_000.0
+HOUR = 3600.0
+
+# (task, from, to, hours after T0), in time order
+HISTORY = [
+    (3, SEEDED, IN_PROGRESS, -0.01),  # already started when the history began
+    (4, SEEDED, TODO, -0.01),
+    (1, NONE, TODO, 0),
+    (2, NONE, NONE, 0),  # created without a status
+    (9, NONE, IN_PROGRESS, 0),
+    (2, NONE, TODO, 1),
+    (5, NONE, TODO, 1),
+    (8, NONE, NONE, 1),
+    (9, IN_PROGRESS, TODO, 1),
+    (1, TODO, IN_PROGRESS, 2),
+    (5, TODO, DONE, 2),  # never in progress
+    (6, NONE, IN_PROGRESS, 2),
+    (8, NONE, NONE, 2),  # deleted without ever having a status
+    (4, TODO, IN_PROGRESS, 3),
+    (7, NONE, TODO, 3),
+    (9, TODO, IN_PROGRESS, 3),
+    (2, TODO, IN_PROGRESS, 4),
+    (7, TODO, IN_PROGRESS, 4),
+    (1, IN_PROGRESS, DONE, 5),
+    (7, IN_PROGRESS, DONE, 5),
+    (3, IN_PROGRESS, DONE, 6),
+    (7, DONE, NONE, 6),  # deleted once done
+    (4, IN_PROGRESS, DONE, 7),
+    (6, IN_PROGRESS, DONE, 8),
+    (6, DONE, IN_PROGRESS, 9),  # reopened
+    (2, IN_PROGRESS, DONE, 10),
+    (9, IN_PROGRESS, DONE, 12),
+]
+
+
+@pytest.fixture
+def transitions() -> flow_metrics.Transitions:
+    rows = [(task, source, target, T0 + hours * HOUR) for task, source, target, hours in HISTORY]
+    # streamed in chunks, as iter_columns yields them
+    return flow_metrics.to_columns([rows[:10], rows[10:20], rows[20:]])
+
+
+def _hours(seconds: np.ndarray) -> list:
+    return sorted((seconds / HOUR).round(6).tolist())
+
+
+def test_columns(transitions):
+    assert len(transitions.task_id) == len(HISTORY)
+    assert transitions.from_status[:2].tolist() == [SEEDED, SEEDED]
+    assert transitions.to_status[3] == NONE
+    assert np.all(np.diff(transitions.at) >= 0)
+
+
+def test_cycle_time(transitions):
+    # from the first time in progress: tasks 1, 2, 4, and 9 which went back to todo
+    # in between; 3 started before the history, 5 never started, 6 was reopened, 7 deleted
+    cycle = flow_metrics.completion_times(transitions, T0, T0 + 12 * HOUR)
+    assert _hours(cycle) == [3, 4, 6, 12]
+
+
+def test_lead_time(transitions):
+    # from the creation: task 4 (seeded) has none, task 5 counts although it never started
+    lead = flow_metrics.completion_times(transitions, T0, T0 + 12 * HOUR, start_status=None)
+    assert _hours(lead) == [1, 5, 10, 12]
+
+
+def test_window(transitions):
+    # finished in (6h, 8h]: task 3 at 6h is out, task 6 is done as of 8h, its reopening comes later
+    assert _hours(flow_metrics.completion_times(transitions, T0 + 6 * HOUR, T0 + 8 * HOUR)) == [4, 6]
+    assert _hours(flow_metrics.completion_times(transitions, T0 + 6 * HOUR, T0 + 8 * HOUR, start_status=None)) == [6]
+    assert len(flow_metrics.completion_times(transitions, T0 + 12 * HOUR, T0 + 24 * HOUR)) == 0
+
+
+def test_throughput(transitions):
+    # tasks finished per window add up to those finished over the whole range
+    edges = flow_metrics.time_edges(T0, T0 + 12 * HOUR, 5)
+    finished = [len(flow_metrics.completion_times(transitions, since, until, start_status=None)) for since, until in zip(edges, edges[1:])]
+    # task 6, done at 8h, is reopened by the end of its window (9h)
+    assert finished == [1, 1, 0, 2]
+    assert flow_metrics.summarize(flow_metrics.completion_times(transitions, T0, T0 + 12 * HOUR, start_status=None))["count"] == sum(finished)
+
+
+def test_cumulative_flow_and_burndown(transitions):
+    edges = np.array([T0 - HOUR, T0, T0 + 6 * HOUR, T0 + 12 * HOUR])
+    flow = flow_metrics.cumulative_flow(transitions, edges)
+    counts = {status: flow[code].tolist() for code, status in enumerate(TASK_STATUSES)}
+    # tasks without a status (2 at first, 8) and deleted ones (7, 8) are in no column;
+    # seeded tasks are there from the start of the history
+    assert counts == {
+        "todo": [0, 2, 0, 0],
+        "in_progress": [0, 2, 4, 1],
+        "done": [0, 0, 3, 6],
+        "blocked": [0, 0, 0, 0],
+    }
+    series = flow_metrics.burndown(flow)
+    assert series["scope"].tolist() == [0, 4, 7, 7]
+    assert series["remaining"].tolist() == [0, 4, 4, 1]
+    assert series["done"].tolist() == counts["done"]
+
+
+def test_summarize(transitions):
+    stats = flow_metrics.summarize(flow_metrics.completion_times(transitions, T0, T0 + 12 * HOUR))
+    assert stats["count"] == 4
+    assert stats["mean"] == pytest.approx(6.25)
+    assert stats["p50"] == pytest.approx(5.0)
+    assert stats["p95"] == pytest.approx(11.1)
+
+
+def test_empty_history():
+    transitions = flow_metrics.to_columns([])
+    assert len(flow_metrics.completion_times(transitions, T0, T0 + HOUR)) == 0
+    assert flow_metrics.summarize(np.empty(0)) == {"count": 0, "mean": None, "p50": None, "p75": None, "p85": None, "p95": None}
+    assert flow_metrics.cumulative_flow(transitions, flow_metrics.time_edges(T0, T0 + HOUR, 3)).sum() == 0
@@ -0,0 +1,77 @@
+"""A write retried with the same Idempotency-Key runs once and gets the first response back.
+
+Needs PostgreSQL: run with
+DATABASE_URL=postgresql://... python -m pytest tests/test_idempotency.py
+"""
+import os
+import uuid
+import pytest
+from fastapi import HTTPException
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("DATABASE_URL", "").startswith("postgresql"),
+    reason="needs a PostgreSQL DATABASE_URL"
+)
+
+
+def _keyed(owner, key: str = None) -> dict:
+    return {**owner.headers, "Idempotency-Key": key or uuid.uuid4().hex}
+
+
+def test_retry_replays_the_first_response(client, owner, task):
+    headers = _keyed(owner)
+    first = client.put(f"/tasks/{task['id']}", json={"title": "once"}, headers=headers)
+    assert first.status_code == 200, first.text
+    assert "Idempotent-Replayed" not in first.headers
+
+    retry = client.put(f"/tasks/{task['id']}", json={"title": "once"}, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.content == first.content
+    assert retry.headers["ETag"] == first.headers["ETag"] == f'"{task["version"] + 1}"'
+    assert retry.headers["content-type"] == first.headers["content-type"]
+
+    # the update ran once
+    assert client.get(f"/tasks/{task['id']}", headers=owner.headers).json()["version"] == task["version"] + 1
+
+
+def test_retried_create_makes_one_task(client, owner):
+    headers = _keyed(owner)
+    body = {"title": "created once", "status": "todo", "project_id": owner.project_id}
+    first = client.post("/tasks/create", json=body, headers=headers)
+    retry = client.post("/tasks/create", json=body, headers=headers)
+    assert (first.status_code, retry.status_code) == (201, 201)
+    assert retry.json()["id"] == first.json()["id"]
+
+    titles = [item["title"] for item in client.get(f"/tasks/project/{owner.project_id}", headers=owner.headers).json()]
+    assert titles.count("created once") == 1
+
+
+def test_key_reused_with_another_body_is_rejected(client, owner, task):
+    headers = _keyed(owner)
+    assert client.put(f"/tasks/{task['id']}", json={"title": "first"}, headers=headers).status_code == 200
+
+    response = client.put(f"/tasks/{task['id']}", json={"title": "second"}, headers=headers)
+    assert response.status_code == 422, response.text
+    assert client.get(f"/tasks/{task['id']}", headers=owner.headers).json()["title"] == "first"
+
+
+def test_server_error_releases_the_key(client, owner, monkeypatch):
+    from app.service import task_service
+
+    create = task_service.createTask
+
+    def failing(*args, **kwargs):
+        raise HTTPException(status_code=503, detail="try again")
+
+    headers = _keyed(owner)
+    body = {"title": "after a failure", "status": "todo", "project_id": owner.project_id}
+    monkeypatch.setattr(task_service, "createTask", failing)
+    assert client.post("/tasks/create", json=body, headers=headers).status_code == 503
+
+    # not stored: the retry runs the endpoint again
+    monkeypatch.setattr(task_service, "createTask", create)
+    retry = client.post("/tasks/create", json=body, headers=headers)
+    assert retry.status_code == 201, retry.text
+    assert "Idempotent-Replayed" not in retry.headers
+    assert retry.json()["title"] == "after a failure"
@@ -0,0 +1,87 @@
+"""Rank keys sort where they are inserted and stay short enough to be respaced.
+
+The key tests need no database. The last one moves a card through the API and
+needs PostgreSQL: run it with
+DATABASE_URL=postgresql://... python -m pytest tests/test_ranking.py
+"""
+import os
+import random
+import pytest
+from app.core.ranking import RANK_REBALANCE_LENGTH, rank_between, spread_ranks
+
+
+def _check(ranks: list):
+    assert ranks == sorted(ranks)
+    assert len(set(ranks)) == len(ranks)
+    assert not any(rank.endswith("0") for rank in ranks)
+
+
+def test_random_inserts_sort_in_place():
+    rng = random.Random(62)
+    ranks = []
+    for _ in range(2000):
+        index = rng.randint(0, len(ranks))
+        before = ranks[index - 1] if index else None
+        after = ranks[index] if index < len(ranks) else None
+        rank = rank_between(before, after)
+        assert (before or "") < rank and (after is None or rank < after)
+        ranks.insert(index, rank)
+    _check(ranks)
+
+
+@pytest.mark.parametrize("at_top", [True, False])
+def test_inserts_at_one_end_sort_in_place(at_top):
+    ranks = [rank_between(None, None)]
+    for _ in range(500):
+        if at_top:
+            ranks.insert(0, rank_between(None, ranks[0]))
+        else:
+            ranks.append(rank_between(ranks[-1], None))
+    _check(ranks)
+
+
+@pytest.mark.parametrize("before, after", [("b", "a"), ("a", "a"), ("Vz", "V"), (None, "")])
+def test_inverted_bounds_are_rejected(before, after):
+    with pytest.raises(ValueError):
+        rank_between(before, after)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 61, 62, 500, 5000])
+def test_spread_ranks_are_unique_and_leave_room(count):
+    ranks = spread_ranks(count)
+    assert len(ranks) == count
+    _check(ranks)
+    for before, after in zip([None] + ranks, ranks + [None]):
+        rank = rank_between(before, after)
+        assert (before or "") < rank and (after is None or rank < after)
+
+
+def test_repeated_moves_into_one_gap_cross_the_rebalance_length():
+    low, high = spread_ranks(2)
+    moves = 0
+    while len(high) <= RANK_REBALANCE_LENGTH:
+        high = rank_between(low, high)
+        moves += 1
+    # about one digit every six moves, so a card dragged to the same place keeps
+    # a short key for a long while; a respaced column starts well below the limit
+    assert moves > 5 * (RANK_REBALANCE_LENGTH - 1)
+    assert max(len(rank) for rank in spread_ranks(5000)) < RANK_REBALANCE_LENGTH
+
+
+@pytest.mark.skipif(
+    not os.getenv("DATABASE_URL", "").startswith("postgresql"),
+    reason="needs a PostgreSQL DATABASE_URL"
+)
+def test_long_rank_queues_a_rebalance_of_its_column(client, owner, task, monkeypatch):
+    from sqlalchemy import select
+    from app.core.database import SessionLocal
+    from app.db.models.job import Job
+    from app.service import task_service
+
+    monkeypatch.setattr(task_service, "RANK_REBALANCE_LENGTH", 0)
+    response = client.patch(f"/tasks/{task['id']}/move", json={"status": "in_progress"}, headers=owner.headers)
+    assert response.status_code == 200, response.text
+
+    with SessionLocal() as db:
+        payloads = db.scalars(select(Job.payload).where(Job.org_id == owner.org_id, Job.kind == "rebalance_ranks")).all()
+    assert payloads == [{"project_id": owner.project_id, "status": "in_progress"}]
@@ -0,0 +1,93 @@
+"""Reads go to a replica that keeps up, writes and the reads after them to the primary.
+
+No database server is needed: replicas are engines that are never connected,
+their lag comes from a stub probe, and writes go to an in-memory SQLite primary.
+"""
+import pytest
+from sqlalchemy import Column, Integer, create_engine, select
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
+from app.core import database
+from app.core.database import Cluster, ReplicaPool, SessionLocal, use_primary
+
+Base = declarative_base()
+
+
+class Entry(Base):
+    __tablename__ = "entries"
+    id = Column(Integer, primary_key=True)
+
+
+def _pool(lags: dict) -> ReplicaPool:
+    """Replicas named after the keys of `lags`, lagging that many seconds (None: unreachable)"""
+    def probe(replica):
+        lag = lags[replica.url.database]
+        if lag is None:
+            raise ConnectionError(replica.url.database)
+        return lag
+    return ReplicaPool([create_engine(f"sqlite:///{name}") for name in lags], max_lag=10, check_interval=0, lag_probe=probe)
+
+
+@pytest.fixture
+def lags() -> dict:
+    return {"fresh": 0.5, "behind": 60}
+
+
+@pytest.fixture
+def cluster(monkeypatch, lags):
+    """Shard 0 made of an in-memory primary and two replicas, lagging as `lags` says"""
+    primary = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(primary)
+    cluster = Cluster(primary, _pool(lags))
+    monkeypatch.setattr(database, "shards", [cluster])
+    monkeypatch.setattr(database, "_sticky_users", {})
+    return cluster
+
+
+def _read_bind(db):
+    return db.get_bind(clause=select(Entry))
+
+
+def test_lagging_replica_is_skipped(cluster):
+    for _ in range(20):
+        assert cluster.replicas.choose().url.database == "fresh"
+    assert cluster.replicas.lags == {"sqlite:///fresh": 0.5, "sqlite:///behind": 60}
+
+
+def test_all_replicas_lagging_falls_back_to_the_primary(cluster, lags):
+    lags.update({"fresh": 30, "behind": None})
+    assert cluster.replicas.choose() is None
+    with SessionLocal() as db:
+        assert _read_bind(db) is cluster.primary
+
+    # and reads move back once a replica catches up
+    lags["fresh"] = 0
+    with SessionLocal() as db:
+        assert _read_bind(db).url.database == "fresh"
+
+
+def test_reads_after_a_write_stay_on_the_primary(cluster):
+    with SessionLocal() as db:
+        db.info["user_id"] = 1
+        assert _read_bind(db).url.database == "fresh"
+        db.add(Entry())
+        db.flush()
+        assert _read_bind(db) is cluster.primary
+        db.commit()
+        assert _read_bind(db) is cluster.primary
+
+    # the writer's next requests too, for READ_YOUR_WRITES_SECONDS; other users still read a replica
+    with SessionLocal() as db:
+        db.info["user_id"] = 1
+        assert _read_bind(db) is cluster.primary
+    with SessionLocal() as db:
+        db.info["user_id"] = 2
+        assert _read_bind(db).url.database == "fresh"
+
+
+def test_use_primary_and_locking_reads_skip_the_replicas(cluster):
+    with SessionLocal() as db:
+        assert db.get_bind(clause=select(Entry).with_for_update()) is cluster.primary
+        assert _read_bind(db).url.database == "fresh"
+        use_primary(db)
+        assert _read_bind(db) is cluster.primary
@@ -0,0 +1,78 @@
+"""Delta sync must not skip a change that commits after a later one.
+
+Needs PostgreSQL (transaction ids and snapshots): run with
+DATABASE_URL=postgresql://... python -m pytest tests/test_sync_cursor.py
+"""
+import os
+from types import SimpleNamespace
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("DATABASE_URL", "").startswith("postgresql"),
+    reason="needs a PostgreSQL DATABASE_URL"
+)
+
+
+@pytest.fixture
+def board():
+    from app.core.database import SessionLocal
+    from app.db.models.organization import Organization
+    from app.db.models.project import Project
+    from app.db.models.task import Task
+    from app.utils.init_db import create_tables
+
+    create_tables()
+    with SessionLocal() as db:
+        org = Organization(name="sync cursor test")
+        db.add(org)
+        db.flush()
+        project = Project(name="board", org_id=org.id)
+        db.add(project)
+        db.flush()
+        tasks = [Task(title=title, status="todo", project_id=project.id, org_id=org.id) for title in ("a", "b", "c")]
+        db.add_all(tasks)
+        db.commit()
+        yield org.id, [task.id for task in tasks]
+
+
+def _sync(org_id: int, since):
+    from app.core.database import SessionLocal
+    from app.service import sync_service
+
+    with SessionLocal() as db:
+        changes = sync_service.getChanges(SimpleNamespace(org_id=org_id), since, 500, db)
+        return changes["cursor"], {task.title for task in changes["tasks"]}
+
+
+def test_change_committed_late_is_not_skipped(board):
+    from app.core.database import SessionLocal
+    from app.db.models.task import Task
+
+    org_id, (a, b, c) = board
+    cursor, _ = _sync(org_id, None)
+
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        # second gets its transaction id first, then first draws a change_seq
+        # below the one second draws next: second's rows commit ahead of it
+        second.get(Task, b).title = "b2"
+        second.flush()
+        first.get(Task, a).title = "a2"
+        first.flush()
+        second.get(Task, c).title = "c2"
+        second.flush()
+        assert first.get(Task, a).change_seq < second.get(Task, c).change_seq
+        second.commit()
+
+        cursor, titles = _sync(org_id, cursor)
+        assert titles == {"b2", "c2"}
+
+        first.commit()
+        cursor, titles = _sync(org_id, cursor)
+        assert titles == {"a2"}
+
+        # and nothing is sent twice
+        assert _sync(org_id, cursor)[1] == set()
+    finally:
+        first.close()
+        second.close()